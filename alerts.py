@@ -0,0 +1,436 @@
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+import asyncio
+import itertools
+import json
+import os
+import threading
+import traceback
+
+import numpy as np
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+MAX_HORIZON_DAYS = 7
+RULES_FILE = "rules.jsonl"
+
+
+@dataclass
+class AlertRule:
+    subscriber: str
+    threshold: float
+    hysteresis: float = 10.0
+    horizon_days: int = 0
+    city: Optional[str] = None
+    polygon: Optional[List[List[float]]] = None
+    sink: str = "file"
+    webhook_url: Optional[str] = None
+    id: Optional[int] = None
+    cities: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Shallow: asdict() deep-copies and dominates the cost of adding a rule.
+        return dict(vars(self))
+
+
+def points_in_polygon(lons: np.ndarray, lats: np.ndarray, ring: List[List[float]]) -> np.ndarray:
+    # Even-odd ray casting for many points against one ring of [lon, lat].
+    ring = np.asarray(ring, dtype=float)
+    x1, y1 = ring[:, 0], ring[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    px, py = np.asarray(lons, dtype=float)[:, None], np.asarray(lats, dtype=float)[:, None]
+    crosses = (y1 > py) != (y2 > py)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_at = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+    return np.count_nonzero(crosses & (px < x_at), axis=1) % 2 == 1
+
+
+class AlertGroup:
+    # All rule entries for one (city, horizon), sorted twice: by the level
+    # that fires them and by the level that re-arms them. A new value only
+    # touches entries whose level lies between the old and the new value.
+    __slots__ = ("thresholds", "rearms", "value")
+
+    def __init__(self):
+        self.thresholds: List[Tuple[float, int]] = []
+        self.rearms: List[Tuple[float, int]] = []
+        self.value: Optional[float] = None
+
+
+class AlertEngine:
+    def __init__(self, cities: List[Dict[str, Any]], directory: str = None,
+                 categorize: Callable[[float], Tuple[str, str]] = None):
+        self.cities = {c["name"]: c for c in cities}
+        self.city_lats = np.array([c["lat"] for c in cities], dtype=float)
+        self.city_lons = np.array([c["lon"] for c in cities], dtype=float)
+        self.directory = directory
+        self.categorize = categorize
+        self.rules: Dict[int, AlertRule] = {}
+        self.by_subscriber: Dict[str, set] = {}
+        self.groups: Dict[Tuple[str, int], AlertGroup] = {}
+        # entry id -> (rule id, city, horizon); one entry per city a rule covers.
+        self.entries: Dict[int, Tuple[int, str, int]] = {}
+        self.rule_entries: Dict[int, List[int]] = {}
+        self.fired: set = set()
+        # Entries whose alert could not be delivered; retried while still above.
+        self.undelivered: set = set()
+        # A sink takes a batch of alerts and returns the ones it failed to deliver.
+        self.sinks: Dict[str, Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]] = {}
+        self._ids = itertools.count(1)
+        self._entry_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.metrics = {"evaluations": 0, "entries_checked": 0, "fired": 0, "rearmed": 0,
+                        "delivered": 0, "delivery_errors": 0}
+        self._load()
+
+    def _log(self, record: Dict[str, Any]):
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, RULES_FILE), "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def _load(self):
+        if self.directory is None:
+            return
+        try:
+            with open(os.path.join(self.directory, RULES_FILE)) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        # Replay the log unsorted and sort each group once at the end;
+        # inserting hundreds of thousands of rules one by one is quadratic.
+        rules = {}
+        for line in lines:
+            record = json.loads(line)
+            if record["op"] == "add":
+                rules[record["rule"]["id"]] = AlertRule(**record["rule"])
+            elif record["op"] == "delete":
+                rules.pop(record["id"], None)
+        for rule in rules.values():
+            self._index(rule, presorted=False)
+        for group in self.groups.values():
+            group.thresholds.sort()
+            group.rearms.sort()
+        self._ids = itertools.count(max(self.rules, default=0) + 1)
+
+    def resolve_targets(self, rule: AlertRule) -> List[str]:
+        if rule.polygon is not None:
+            inside = points_in_polygon(self.city_lons, self.city_lats, rule.polygon)
+            names = list(self.cities)
+            return [names[i] for i in np.flatnonzero(inside)]
+        return [rule.city] if rule.city in self.cities else []
+
+    def _index(self, rule: AlertRule, presorted: bool = True) -> List[Dict[str, Any]]:
+        self.rules[rule.id] = rule
+        self.by_subscriber.setdefault(rule.subscriber, set()).add(rule.id)
+        alerts = []
+        entry_ids = []
+        for city in rule.cities:
+            entry_id = next(self._entry_ids)
+            entry_ids.append(entry_id)
+            self.entries[entry_id] = (rule.id, city, rule.horizon_days)
+            group = self.groups.setdefault((city, rule.horizon_days), AlertGroup())
+            if presorted:
+                insort(group.thresholds, (rule.threshold, entry_id))
+                insort(group.rearms, (rule.threshold - rule.hysteresis, entry_id))
+            else:
+                group.thresholds.append((rule.threshold, entry_id))
+                group.rearms.append((rule.threshold - rule.hysteresis, entry_id))
+            # Already above the threshold: tell the subscriber now rather
+            # than waiting for a crossing that has already happened.
+            if group.value is not None and group.value > rule.threshold:
+                self.fired.add(entry_id)
+                alerts.append(self._alert(entry_id, group.value, None))
+        self.rule_entries[rule.id] = entry_ids
+        return alerts
+
+    def _unindex(self, rule_id: int) -> bool:
+        rule = self.rules.pop(rule_id, None)
+        if rule is None:
+            return False
+        self.by_subscriber[rule.subscriber].discard(rule_id)
+        if not self.by_subscriber[rule.subscriber]:
+            del self.by_subscriber[rule.subscriber]
+        for entry_id in self.rule_entries.pop(rule_id):
+            _, city, horizon = self.entries.pop(entry_id)
+            group = self.groups[(city, horizon)]
+            for keys, level in ((group.thresholds, rule.threshold), (group.rearms, rule.threshold - rule.hysteresis)):
+                del keys[bisect_left(keys, (level, entry_id))]
+            self.fired.discard(entry_id)
+            self.undelivered.discard(entry_id)
+            if not group.thresholds:
+                del self.groups[(city, horizon)]
+        return True
+
+    def add_rule(self, rule: AlertRule) -> Tuple[AlertRule, List[Dict[str, Any]]]:
+        if not 0 <= rule.horizon_days <= MAX_HORIZON_DAYS:
+            raise ValueError(f"horizon_days must be between 0 and {MAX_HORIZON_DAYS}")
+        if rule.hysteresis < 0:
+            raise ValueError("hysteresis must not be negative")
+        if (rule.city is None) == (rule.polygon is None):
+            raise ValueError("Give either a city or a polygon")
+        if rule.sink not in self.sinks:
+            raise ValueError(f"Unknown sink '{rule.sink}'; available: {', '.join(sorted(self.sinks))}")
+        validate = getattr(self.sinks[rule.sink], "validate", None)
+        if validate is not None:
+            validate(rule)
+        cities = self.resolve_targets(rule)
+        if not cities:
+            raise ValueError("The rule does not cover any known city")
+
+        with self._lock:
+            rule.id = next(self._ids)
+            rule.cities = cities
+            unseen = any((city, rule.horizon_days) not in self.groups for city in cities)
+            alerts = self._index(rule)
+            self._log({"op": "add", "rule": rule.to_dict()})
+        # A city nobody watched before has no value yet; evaluate it early.
+        if unseen:
+            self.wake()
+        return rule, alerts
+
+    def remove_rule(self, rule_id: int) -> bool:
+        with self._lock:
+            removed = self._unindex(rule_id)
+            if removed:
+                self._log({"op": "delete", "id": rule_id})
+        return removed
+
+    def rules_for(self, subscriber: str) -> List[AlertRule]:
+        return [self.rules[i] for i in sorted(self.by_subscriber.get(subscriber, ()))]
+
+    def watched(self) -> Dict[str, List[int]]:
+        # City -> the horizons its rules need, as one consistent snapshot.
+        with self._lock:
+            horizons = {}
+            for city, horizon in self.groups:
+                horizons.setdefault(city, []).append(horizon)
+        return {city: sorted(h) for city, h in horizons.items()}
+
+    def _alert(self, entry_id: int, value: float, previous: Optional[float]) -> Dict[str, Any]:
+        rule_id, city, horizon = self.entries[entry_id]
+        rule = self.rules[rule_id]
+        alert = {
+            "entry_id": entry_id,
+            "rule_id": rule_id,
+            "subscriber": rule.subscriber,
+            "city": city,
+            "kind": "forecast" if horizon else "current",
+            "horizon_days": horizon,
+            "threshold": rule.threshold,
+            "pm25": round(value, 1),
+            "previous_pm25": None if previous is None else round(previous, 1),
+            "sink": rule.sink,
+            "webhook_url": rule.webhook_url,
+            "time": datetime.now().isoformat(timespec="seconds"),
+        }
+        if self.categorize is not None:
+            alert["aqi_category"], alert["aqi_color"] = self.categorize(value)
+        return alert
+
+    def update(self, city: str, horizon: int, value: float) -> List[Dict[str, Any]]:
+        with self._lock:
+            group = self.groups.get((city, horizon))
+            if group is None:
+                return []
+            previous, group.value = group.value, value
+            self.metrics["evaluations"] += 1
+            alerts = []
+
+            # Fire entries whose threshold was crossed upwards: previous <= t < value.
+            low = float("-inf") if previous is None else previous
+            if value > low:
+                start = bisect_left(group.thresholds, (low, -1))
+                stop = bisect_left(group.thresholds, (value, -1))
+                self.metrics["entries_checked"] += stop - start
+                for _, entry_id in group.thresholds[start:stop]:
+                    if entry_id not in self.fired:
+                        self.fired.add(entry_id)
+                        alerts.append(self._alert(entry_id, value, previous))
+
+            # Re-arm entries whose threshold - hysteresis was crossed downwards.
+            if previous is not None and value < previous:
+                start = bisect_right(group.rearms, (value, float("inf")))
+                stop = bisect_right(group.rearms, (previous, float("inf")))
+                self.metrics["entries_checked"] += stop - start
+                for _, entry_id in group.rearms[start:stop]:
+                    if entry_id in self.fired:
+                        self.fired.discard(entry_id)
+                        self.metrics["rearmed"] += 1
+
+            self.metrics["fired"] += len(alerts)
+            return alerts
+
+    def retry_undelivered(self) -> List[Dict[str, Any]]:
+        # Fire failed entries again if their value is still above threshold;
+        # the others stay re-armed and wait for the next crossing.
+        with self._lock:
+            alerts = []
+            for entry_id in list(self.undelivered):
+                self.undelivered.discard(entry_id)
+                if entry_id not in self.entries or entry_id in self.fired:
+                    continue
+                rule_id, city, horizon = self.entries[entry_id]
+                value = self.groups[(city, horizon)].value
+                if value is not None and value > self.rules[rule_id].threshold:
+                    self.fired.add(entry_id)
+                    alerts.append(self._alert(entry_id, value, None))
+            return alerts
+
+    def _undeliverable(self, alerts: Iterable[Dict[str, Any]]):
+        # Re-arm entries whose alert was lost so the subscriber is not left
+        # silent until the value dips below the re-arm level and comes back.
+        with self._lock:
+            for alert in alerts:
+                if alert["entry_id"] in self.entries:
+                    self.fired.discard(alert["entry_id"])
+                    self.undelivered.add(alert["entry_id"])
+                self.metrics["delivery_errors"] += 1
+
+    def deliver(self, alerts: List[Dict[str, Any]]):
+        by_sink = {}
+        for alert in alerts:
+            by_sink.setdefault(alert["sink"], []).append(alert)
+        for name, batch in by_sink.items():
+            try:
+                failed = self.sinks[name](batch) or []
+            except Exception as e:
+                print(f"Alert sink {name} failed: {e}")
+                failed = batch
+            self.metrics["delivered"] += len(batch) - len(failed)
+            self._undeliverable(failed)
+
+    def start(self, evaluate: Callable[[], List[Dict[str, Any]]], interval: float = 60):
+        # evaluate() feeds fresh values through update() and returns the alerts.
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run(evaluate, interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def wake(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self, evaluate, interval: float):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                alerts = await asyncio.to_thread(evaluate)
+                alerts += self.retry_undelivered()
+                if alerts:
+                    await asyncio.to_thread(self.deliver, alerts)
+            except Exception:
+                traceback.print_exc()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rules": len(self.rules),
+            "subscribers": len(self.by_subscriber),
+            "entries": len(self.entries),
+            "groups": len(self.groups),
+            "disarmed": len(self.fired),
+            "undelivered": len(self.undelivered),
+            "sinks": sorted(self.sinks),
+            **self.metrics
+        }
+
+
+class FileSink:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, alerts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock, open(self.path, "a") as f:
+            f.writelines(json.dumps(alert) + "\n" for alert in alerts)
+        return []
+
+
+class WebhookSink:
+    # Alerts are POSTed as one JSON array per URL: the rule's webhook_url,
+    # or default_url for rules that have none. The server makes these
+    # requests itself, so a rule's own URL must be http(s) on one of
+    # allowed_hosts; without an allowlist only default_url is used.
+    def __init__(self, default_url: str = None, allowed_hosts: Iterable[str] = (), timeout: float = 5):
+        self.default_url = default_url
+        self.allowed_hosts = {host.lower() for host in allowed_hosts}
+        self.timeout = timeout
+
+    def url_allowed(self, url: str) -> bool:
+        parts = urlsplit(url)
+        return parts.scheme in ("http", "https") and (parts.hostname or "").lower() in self.allowed_hosts
+
+    def validate(self, rule: AlertRule):
+        if httpx is None:
+            raise ValueError("Webhook alerts need httpx installed")
+        if rule.webhook_url is None:
+            if self.default_url is None:
+                raise ValueError("Give a webhook_url; no default webhook is configured")
+        elif not self.url_allowed(rule.webhook_url):
+            raise ValueError("webhook_url must be an http(s) URL on an allowed host")
+
+    def __call__(self, alerts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        by_url = {}
+        failed = []
+        for alert in alerts:
+            url = alert.get("webhook_url") or self.default_url
+            if url is None or (url != self.default_url and not self.url_allowed(url)):
+                failed.append(alert)
+            else:
+                by_url.setdefault(url, []).append(alert)
+        if failed:
+            print(f"Webhook sink: {len(failed)} alert(s) have no allowed URL")
+        # One unreachable subscriber must not hold up the others.
+        with httpx.Client(timeout=self.timeout) as client:
+            for url, batch in by_url.items():
+                try:
+                    client.post(url, json=batch).raise_for_status()
+                except httpx.HTTPError as e:
+                    print(f"Webhook {url} failed: {e}")
+                    failed.extend(batch)
+        return failed
+
+
+def create_webhook_stub_app(limit: int = 1000):
+    # Local webhook receiver for testing: POST /alerts stores the alerts,
+    # GET /alerts lists the most recent ones.
+    from collections import deque
+    from fastapi import FastAPI, Request
+
+    received = deque(maxlen=limit)
+    app = FastAPI(title="Alert webhook stub")
+
+    @app.post("/alerts")
+    async def receive_alerts(request: Request):
+        alerts = await request.json()
+        for alert in alerts:
+            received.append(alert)
+            print(f"Alert for {alert.get('subscriber')}: {alert.get('city')} at {alert.get('pm25')}")
+        return {"received": len(alerts)}
+
+    @app.get("/alerts")
+    def list_alerts():
+        return list(received)
+
+    return app
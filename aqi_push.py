@@ -0,0 +1,119 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+import asyncio
+import traceback
+
+
+class Subscription:
+    # Pending updates are kept per city and replaced by newer ones, so a
+    # slow client never builds a backlog; it just gets the latest value.
+    def __init__(self, cities: Iterable[str]):
+        self.cities: Set[str] = set(cities)
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._ready = asyncio.Event()
+
+    def offer(self, city: str, update: Dict[str, Any]):
+        self._pending[city] = update
+        self._ready.set()
+
+    async def next(self, timeout: float) -> List[Dict[str, Any]]:
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        updates, self._pending = list(self._pending.values()), {}
+        return updates
+
+
+class AQIBroadcaster:
+    # One producer recomputes every subscribed city in a single batch each
+    # interval and fans out only the cities whose PM2.5 or AQI category
+    # changed, so the cost does not grow with the number of subscribers.
+    def __init__(self, compute: Callable[[List[str]], Dict[str, Dict[str, Any]]], interval: float = 15):
+        self.compute = compute
+        self.interval = interval
+        self.subscriptions: Set[Subscription] = set()
+        self.latest: Dict[str, Dict[str, Any]] = {}
+        self._signatures: Dict[str, tuple] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.metrics = {"refreshes": 0, "cities_computed": 0, "changes": 0, "pushes": 0}
+
+    def start(self):
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def subscribed_cities(self) -> Set[str]:
+        return set().union(*(s.cities for s in self.subscriptions))
+
+    def subscribe(self, cities: Iterable[str]) -> Subscription:
+        subscription = Subscription(())
+        self.subscriptions.add(subscription)
+        self.add_cities(subscription, cities)
+        return subscription
+
+    def add_cities(self, subscription: Subscription, cities: Iterable[str]):
+        cities = set(cities) - subscription.cities
+        subscription.cities |= cities
+        # Known values go out at once; unknown cities get an early refresh.
+        for city in cities:
+            if city in self.latest:
+                subscription.offer(city, self.latest[city])
+        if self._wake is not None and any(city not in self.latest for city in cities):
+            self._wake.set()
+
+    def remove_cities(self, subscription: Subscription, cities: Iterable[str]):
+        subscription.cities -= set(cities)
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscriptions.discard(subscription)
+
+    async def refresh(self):
+        cities = self.subscribed_cities()
+        for city in set(self.latest) - cities:
+            self.latest.pop(city)
+            self._signatures.pop(city, None)
+        if not cities:
+            return
+
+        updates = await asyncio.to_thread(self.compute, sorted(cities))
+        self.metrics["refreshes"] += 1
+        self.metrics["cities_computed"] += len(updates)
+
+        for city, update in updates.items():
+            signature = (update["pm25"], update["aqi_category"])
+            if self._signatures.get(city) == signature:
+                continue
+            self._signatures[city] = signature
+            self.latest[city] = update
+            self.metrics["changes"] += 1
+            for subscription in list(self.subscriptions):
+                if city in subscription.cities:
+                    subscription.offer(city, update)
+                    self.metrics["pushes"] += 1
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.refresh()
+            except Exception:
+                traceback.print_exc()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self.subscriptions),
+            "cities": len(self.subscribed_cities()),
+            "interval_s": self.interval,
+            **self.metrics
+        }
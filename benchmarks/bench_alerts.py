@@ -0,0 +1,84 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alerts import AlertEngine, AlertRule
+from main import UNIQUE_CITIES, get_aqi_category
+
+
+def brute_force(rules, armed, values, previous):
+    # Reference: check every rule against every refresh.
+    fired = set()
+    for rule_id, (city, horizon, threshold, hysteresis) in rules.items():
+        value, before = values[(city, horizon)], previous.get((city, horizon))
+        if armed[rule_id] and value > threshold:
+            armed[rule_id] = False
+            fired.add(rule_id)
+        elif not armed[rule_id] and value < threshold - hysteresis:
+            armed[rule_id] = True
+    return fired
+
+
+def main():
+    n_rules, refreshes = 300_000, 50
+    rng = np.random.default_rng(0)
+    names = [c["name"] for c in UNIQUE_CITIES]
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = AlertEngine(UNIQUE_CITIES, directory, get_aqi_category)
+        engine.sinks["file"] = lambda alerts: None
+        cities = rng.integers(0, len(names), n_rules)
+        horizons = rng.choice([0, 0, 0, 1, 3, 7], n_rules)
+        thresholds = np.round(rng.uniform(30, 300, n_rules), 1)
+        hysteresis = np.round(rng.uniform(0, 20, n_rules), 1)
+
+        start = time.perf_counter()
+        reference = {}
+        for i in range(n_rules):
+            rule, _ = engine.add_rule(AlertRule(subscriber=f"user{i % 50000}", city=names[cities[i]],
+                                                threshold=float(thresholds[i]), hysteresis=float(hysteresis[i]),
+                                                horizon_days=int(horizons[i])))
+            reference[rule.id] = (names[cities[i]], int(horizons[i]), float(thresholds[i]), float(hysteresis[i]))
+        print(f"added {n_rules} rules in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        reloaded = AlertEngine(UNIQUE_CITIES, directory)
+        print(f"reloaded {len(reloaded.rules)} rules in {time.perf_counter() - start:.1f}s")
+
+        groups = list(engine.groups)
+        armed = {rule_id: True for rule_id in reference}
+        values = {key: float(rng.uniform(30, 200)) for key in groups}
+        previous = {}
+        indexed_s = brute_s = 0.0
+        checked = fired = 0
+        for _ in range(refreshes):
+            # A refresh moves every watched value by a few percent.
+            previous, values = values, {key: max(10.0, v * rng.normal(1.0, 0.08)) for key, v in values.items()}
+
+            start = time.perf_counter()
+            checked_before = engine.metrics["entries_checked"]
+            alerts = []
+            for (city, horizon), value in values.items():
+                alerts.extend(engine.update(city, horizon, value))
+            indexed_s += time.perf_counter() - start
+            checked += engine.metrics["entries_checked"] - checked_before
+
+            start = time.perf_counter()
+            expected = brute_force(reference, armed, values, previous)
+            brute_s += time.perf_counter() - start
+
+            assert {a["rule_id"] for a in alerts} == expected
+            fired += len(alerts)
+
+        print(f"{refreshes} refreshes of {len(groups)} city/horizon groups, {fired} alerts")
+        print(f"indexed:     {indexed_s / refreshes * 1000:8.2f} ms/refresh, {checked / refreshes:9.0f} rules checked")
+        print(f"brute force: {brute_s / refreshes * 1000:8.2f} ms/refresh, {n_rules:9d} rules checked")
+
+
+if __name__ == "__main__":
+    main()
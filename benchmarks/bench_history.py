@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import HistoryStore
+from main import UNIQUE_CITIES
+
+
+def make_history(store, n_stations, days, seed=0):
+    rng = np.random.default_rng(seed)
+    # Half the stations sit near a city, the rest anywhere in India.
+    cities = rng.integers(0, len(UNIQUE_CITIES), n_stations)
+    lats = np.where(np.arange(n_stations) % 2 == 0,
+                    [UNIQUE_CITIES[c]["lat"] for c in cities] + rng.normal(0, 0.1, n_stations),
+                    rng.uniform(6.5, 37.5, n_stations))
+    lons = np.where(np.arange(n_stations) % 2 == 0,
+                    [UNIQUE_CITIES[c]["lon"] for c in cities] + rng.normal(0, 0.1, n_stations),
+                    rng.uniform(68, 97.5, n_stations))
+    stations = pd.DataFrame({"station": [f"s{i}" for i in range(n_stations)], "lat": lats, "lon": lons})
+
+    frames = []
+    for day in pd.date_range("2023-01-01", periods=days, freq="D"):
+        hours = day + pd.to_timedelta(np.repeat(np.arange(24), n_stations), unit="h")
+        frame = pd.concat([stations] * 24, ignore_index=True)
+        frame["timestamp"] = hours
+        frame["pm25_value"] = rng.uniform(10, 300, len(frame)).astype(np.float32)
+        store.append(frame)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def pandas_history(history, store, city, start, end, agg):
+    in_city = store.station_city[history["station"].map(store.station_ids).to_numpy()] == store.city_ids[city]
+    rows = history[in_city & (history["timestamp"] >= start.replace(minute=0, second=0)) & (history["timestamp"] <= end)]
+    grouped = rows.groupby(rows["timestamp"].dt.floor("D" if agg == "daily" else "h"))["pm25_value"]
+    return grouped.mean().round(1).tolist()
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    n_stations, days = 400, 730
+    with tempfile.TemporaryDirectory() as directory:
+        store = HistoryStore(directory, UNIQUE_CITIES)
+        start = time.perf_counter()
+        history = make_history(store, n_stations, days)
+        print(f"ingested {len(history)} readings in {time.perf_counter() - start:.1f}s")
+
+        queries = [
+            ("Delhi", datetime(2024, 6, 1), datetime(2024, 6, 7, 23, 59), "hourly"),
+            ("Delhi", datetime(2024, 1, 1), datetime(2024, 12, 31, 23, 59), "hourly"),
+            ("Mumbai", datetime(2024, 1, 1), datetime(2024, 12, 31, 23, 59), "daily"),
+            ("Mumbai", datetime(2023, 1, 1), datetime(2024, 12, 30, 23, 59), "daily"),
+        ]
+        print(f"{'query':<32} {'pandas (ms)':>12} {'cold (ms)':>10} {'warm (ms)':>10} {'points':>7}")
+        for city, query_start, query_end, agg in queries:
+            pandas_time, expected = best_of(lambda: pandas_history(history, store, city, query_start, query_end, agg), 1)
+            store._rollups.clear()
+            cold_time, _ = best_of(lambda: store.query(city, query_start, query_end, agg), 1)
+            warm_time, points = best_of(lambda: store.query(city, query_start, query_end, agg), 5)
+
+            assert np.allclose([p["pm25"] for p in points], expected, atol=0.051)
+            label = f"{city} {(query_end - query_start).days + 1}d {agg}"
+            print(f"{label:<32} {pandas_time * 1000:>12.1f} {cold_time * 1000:>10.1f} {warm_time * 1000:>10.1f} {len(points):>7}")
+
+
+if __name__ == "__main__":
+    main()
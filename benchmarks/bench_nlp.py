@@ -0,0 +1,112 @@
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nlp_engine import INTENT_PATTERNS, LAYER_KEYWORDS, normalize_query, parse_normalized_query, parse_query
+from gazetteer import LOCATION_ALIASES
+
+
+CITIES = ["Delhi", "new delhi", "Mumbai", "Bombay", "Bangalore", "vizag", "Chennai", "Kolkata",
+          "Hyderabad", "Pune", "Lucknow", "Ahmedabad", "Jaipur", "Patna"]
+
+TEMPLATES = [
+    "Show flood risk in {city}",
+    "show me air quality in {city}",
+    "What is the AQI at {city} right now",
+    "what's the temperature in {city}",
+    "display rivers for {city}",
+    "find highways near {city}",
+    "Go to {city}",
+    "fly to {city}",
+    "take me to {city} please",
+    "how bad is the smog in {city} today",
+    "pm2.5 levels {city}",
+    "zoom in",
+    "zoom out a bit",
+    "reset the map",
+    "um so I was wondering if you could show me the rainfall and monsoon data for {city} "
+    "because I am planning a trip there next week and I want to know whether it will be wet",
+]
+
+
+def legacy_parse(query):
+    query_lower = query.lower().strip()
+
+    def location_in(text):
+        text = text.lower().strip()
+        for alias, data in LOCATION_ALIASES.items():
+            if alias in text:
+                return data
+        return None
+
+    def layer_in(text):
+        text = text.lower()
+        for layer_id, keywords in LAYER_KEYWORDS.items():
+            for keyword in keywords:
+                if keyword in text:
+                    return layer_id
+        return None
+
+    for intent_name, patterns in INTENT_PATTERNS.items():
+        for pattern in patterns:
+            match = re.search(pattern, query_lower)
+            if match:
+                location = location_in(query)
+                layer = layer_in(query)
+                groups = match.groups()
+                if intent_name == "navigate" and not location and groups:
+                    location = location_in(groups[0])
+                if intent_name == "show_layer" and groups:
+                    if not layer and groups[0]:
+                        layer = layer_in(groups[0])
+                    if not location and len(groups) > 1 and groups[1]:
+                        location = location_in(groups[1])
+                return intent_name, location, layer
+
+    location = location_in(query)
+    layer = layer_in(query)
+    if location or layer:
+        return ("show_layer" if layer else "navigate"), location, layer
+    return "unknown", None, None
+
+
+def make_corpus():
+    return [template.format(city=city) for template in TEMPLATES for city in CITIES]
+
+
+def throughput(fn, queries, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in queries:
+            fn(query)
+        best = min(best, time.perf_counter() - start)
+    return len(queries) / best
+
+
+def main():
+    corpus = make_corpus()
+
+    for query in corpus:
+        assert legacy_parse(query)[0] == parse_query(query).intent, query
+
+    def cold_parse(query):
+        return parse_normalized_query.__wrapped__(normalize_query(query))
+
+    # Chatbot traffic repeats itself: replay the corpus several times.
+    traffic = corpus * 20
+
+    print(f"{len(corpus)} distinct queries, {len(traffic)} requests")
+    print(f"{'parser':>22} {'queries/s':>12}")
+    legacy = throughput(legacy_parse, traffic, 3)
+    print(f"{'legacy':>22} {legacy:>12.0f}")
+    for name, fn in [("compiled, no cache", cold_parse), ("compiled, LRU cache", parse_query)]:
+        rate = throughput(fn, traffic, 3)
+        print(f"{name:>22} {rate:>12.0f} {rate / legacy:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import build_station_features
+
+
+def legacy_station_features(stations_df, daily_mean, merra_vars):
+    records = []
+    for _, row in stations_df.iterrows():
+        lat, lon = row['lat'], row['lon']
+        feat = {
+            'lat': lat, 'lon': lon, 'pm25_value': row['pm25_value'],
+            'lat_norm': (lat - 6.5) / 31, 'lon_norm': (lon - 68) / 29.5,
+            'dist_delhi': np.sqrt((lat - 28.6139)**2 + (lon - 77.209)**2),
+            'indo_gangetic': int((24 < lat < 31) and (74 < lon < 88)),
+            'coastal': int((lat < 15) or ((lon < 74) and (lat < 25)))
+        }
+
+        if daily_mean is not None:
+            try:
+                point = daily_mean.sel(lat=lat, lon=lon, method='nearest')
+                for var in merra_vars:
+                    try:
+                        val = float(point[var].values)
+                        if not np.isnan(val):
+                            feat[var] = val
+                    except:
+                        pass
+            except:
+                pass
+
+        records.append(feat)
+
+    return pd.DataFrame(records)
+
+
+def make_inputs(n_stations, seed=0):
+    rng = np.random.default_rng(seed)
+    stations_df = pd.DataFrame({
+        'lat': rng.uniform(6.5, 37.5, n_stations),
+        'lon': rng.uniform(68, 97.5, n_stations),
+        'pm25_value': rng.uniform(10, 300, n_stations),
+    })
+
+    # MERRA-2 M2T1NXAER native resolution: 0.5 x 0.625 degrees.
+    lats = np.arange(-90, 90.5, 0.5)
+    lons = np.arange(-180, 180, 0.625)
+    merra_vars = ['BCSMASS', 'DUSMASS25', 'OCSMASS', 'SO4SMASS', 'SSSMASS25',
+                  'TOTEXTTAU', 'BCCMASS', 'DUCMASS25', 'OCCMASS', 'SO4CMASS']
+    daily_mean = xr.Dataset(
+        {var: (('lat', 'lon'), rng.random((len(lats), len(lons)))) for var in merra_vars},
+        coords={'lat': lats, 'lon': lons}
+    )
+    return stations_df, daily_mean, merra_vars
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    print(f"{'stations':>10} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for n_stations in [100, 1000, 5000]:
+        stations_df, daily_mean, merra_vars = make_inputs(n_stations)
+
+        legacy_time, legacy = best_of(lambda: legacy_station_features(stations_df, daily_mean, merra_vars), 1)
+        fast_time, fast = best_of(lambda: build_station_features(stations_df, daily_mean, merra_vars), 5)
+
+        pd.testing.assert_frame_equal(legacy, fast, check_dtype=False)
+        print(f"{n_stations:>10} {legacy_time:>12.4f} {fast_time:>15.4f} {legacy_time / fast_time:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import re
+
+
+CITIES = {
+    "delhi": {"lat": 28.6139, "lon": 77.2090, "display_name": "Delhi"},
+    "new delhi": {"lat": 28.6139, "lon": 77.2090, "display_name": "New Delhi"},
+    "mumbai": {"lat": 19.0760, "lon": 72.8777, "display_name": "Mumbai"},
+    "kolkata": {"lat": 22.5726, "lon": 88.3639, "display_name": "Kolkata"},
+    "chennai": {"lat": 13.0827, "lon": 80.2707, "display_name": "Chennai"},
+    "bengaluru": {"lat": 12.9716, "lon": 77.5946, "display_name": "Bengaluru"},
+    "bangalore": {"lat": 12.9716, "lon": 77.5946, "display_name": "Bangalore"},
+    "hyderabad": {"lat": 17.3850, "lon": 78.4867, "display_name": "Hyderabad"},
+    "pune": {"lat": 18.5204, "lon": 73.8567, "display_name": "Pune"},
+    "ahmedabad": {"lat": 23.0225, "lon": 72.5714, "display_name": "Ahmedabad"},
+    "jaipur": {"lat": 26.9124, "lon": 75.7873, "display_name": "Jaipur"},
+    "lucknow": {"lat": 26.8467, "lon": 80.9462, "display_name": "Lucknow"},
+    "kanpur": {"lat": 26.4499, "lon": 80.3319, "display_name": "Kanpur"},
+    "nagpur": {"lat": 21.1458, "lon": 79.0882, "display_name": "Nagpur"},
+    "patna": {"lat": 25.5941, "lon": 85.1376, "display_name": "Patna"},
+    "indore": {"lat": 22.7196, "lon": 75.8577, "display_name": "Indore"},
+    "bhopal": {"lat": 23.2599, "lon": 77.4126, "display_name": "Bhopal"},
+    "visakhapatnam": {"lat": 17.6868, "lon": 83.2185, "display_name": "Visakhapatnam"},
+    "vadodara": {"lat": 22.3072, "lon": 73.1812, "display_name": "Vadodara"},
+    "ludhiana": {"lat": 30.9010, "lon": 75.8573, "display_name": "Ludhiana"},
+    "agra": {"lat": 27.1767, "lon": 78.0081, "display_name": "Agra"},
+    "varanasi": {"lat": 25.3176, "lon": 82.9739, "display_name": "Varanasi"},
+    "surat": {"lat": 21.1702, "lon": 72.8311, "display_name": "Surat"},
+    "chandigarh": {"lat": 30.7333, "lon": 76.7794, "display_name": "Chandigarh"},
+    "gurgaon": {"lat": 28.4595, "lon": 77.0266, "display_name": "Gurgaon"},
+    "gurugram": {"lat": 28.4595, "lon": 77.0266, "display_name": "Gurugram"},
+    "noida": {"lat": 28.5355, "lon": 77.3910, "display_name": "Noida"},
+    "ghaziabad": {"lat": 28.6692, "lon": 77.4538, "display_name": "Ghaziabad"},
+    "faridabad": {"lat": 28.4089, "lon": 77.3178, "display_name": "Faridabad"},
+    "amritsar": {"lat": 31.6340, "lon": 74.8723, "display_name": "Amritsar"},
+    "ranchi": {"lat": 23.3441, "lon": 85.3096, "display_name": "Ranchi"},
+    "coimbatore": {"lat": 11.0168, "lon": 76.9558, "display_name": "Coimbatore"},
+    "guwahati": {"lat": 26.1445, "lon": 91.7362, "display_name": "Guwahati"},
+    "bhubaneswar": {"lat": 20.2961, "lon": 85.8245, "display_name": "Bhubaneswar"},
+    "thiruvananthapuram": {"lat": 8.5241, "lon": 76.9366, "display_name": "Thiruvananthapuram"},
+    "kochi": {"lat": 9.9312, "lon": 76.2673, "display_name": "Kochi"},
+    "mysuru": {"lat": 12.2958, "lon": 76.6394, "display_name": "Mysuru"},
+    "mysore": {"lat": 12.2958, "lon": 76.6394, "display_name": "Mysore"},
+    "jodhpur": {"lat": 26.2389, "lon": 73.0243, "display_name": "Jodhpur"},
+    "raipur": {"lat": 21.2514, "lon": 81.6296, "display_name": "Raipur"},
+    "dehradun": {"lat": 30.3165, "lon": 78.0322, "display_name": "Dehradun"},
+    "shimla": {"lat": 31.1048, "lon": 77.1734, "display_name": "Shimla"},
+    "srinagar": {"lat": 34.0837, "lon": 74.7973, "display_name": "Srinagar"},
+}
+
+LOCATION_ALIASES = {
+    "vizag": {"name": "Visakhapatnam", "lat": 17.6868, "lon": 83.2185},
+    "visakhapatnam": {"name": "Visakhapatnam", "lat": 17.6868, "lon": 83.2185},
+    "delhi": {"name": "Delhi", "lat": 28.6139, "lon": 77.2090},
+    "new delhi": {"name": "Delhi", "lat": 28.6139, "lon": 77.2090},
+    "mumbai": {"name": "Mumbai", "lat": 19.0760, "lon": 72.8777},
+    "bombay": {"name": "Mumbai", "lat": 19.0760, "lon": 72.8777},
+    "kolkata": {"name": "Kolkata", "lat": 22.5726, "lon": 88.3639},
+    "calcutta": {"name": "Kolkata", "lat": 22.5726, "lon": 88.3639},
+    "chennai": {"name": "Chennai", "lat": 13.0827, "lon": 80.2707},
+    "madras": {"name": "Chennai", "lat": 13.0827, "lon": 80.2707},
+    "bengaluru": {"name": "Bengaluru", "lat": 12.9716, "lon": 77.5946},
+    "bangalore": {"name": "Bengaluru", "lat": 12.9716, "lon": 77.5946},
+    "hyderabad": {"name": "Hyderabad", "lat": 17.3850, "lon": 78.4867},
+    "ahmedabad": {"name": "Ahmedabad", "lat": 23.0225, "lon": 72.5714},
+    "pune": {"name": "Pune", "lat": 18.5204, "lon": 73.8567},
+    "jaipur": {"name": "Jaipur", "lat": 26.9124, "lon": 75.7873},
+    "lucknow": {"name": "Lucknow", "lat": 26.8467, "lon": 80.9462},
+    "kanpur": {"name": "Kanpur", "lat": 26.4499, "lon": 80.3319},
+    "nagpur": {"name": "Nagpur", "lat": 21.1458, "lon": 79.0882},
+    "patna": {"name": "Patna", "lat": 25.5941, "lon": 85.1376},
+    "indore": {"name": "Indore", "lat": 22.7196, "lon": 75.8577},
+    "bhopal": {"name": "Bhopal", "lat": 23.2599, "lon": 77.4126},
+    "surat": {"name": "Surat", "lat": 21.1702, "lon": 72.8311},
+    "varanasi": {"name": "Varanasi", "lat": 25.3176, "lon": 82.9739},
+    "agra": {"name": "Agra", "lat": 27.1767, "lon": 78.0081},
+    "goa": {"name": "Goa", "lat": 15.2993, "lon": 74.1240},
+    "kochi": {"name": "Kochi", "lat": 9.9312, "lon": 76.2673},
+    "cochin": {"name": "Kochi", "lat": 9.9312, "lon": 76.2673},
+    "thiruvananthapuram": {"name": "Thiruvananthapuram", "lat": 8.5241, "lon": 76.9366},
+    "trivandrum": {"name": "Thiruvananthapuram", "lat": 8.5241, "lon": 76.9366},
+    "guwahati": {"name": "Guwahati", "lat": 26.1445, "lon": 91.7362},
+    "chandigarh": {"name": "Chandigarh", "lat": 30.7333, "lon": 76.7794},
+    "shimla": {"name": "Shimla", "lat": 31.1048, "lon": 77.1734},
+    "dehradun": {"name": "Dehradun", "lat": 30.3165, "lon": 78.0322},
+    "srinagar": {"name": "Srinagar", "lat": 34.0837, "lon": 74.7973},
+    "amritsar": {"name": "Amritsar", "lat": 31.6340, "lon": 74.8723},
+    "ranchi": {"name": "Ranchi", "lat": 23.3441, "lon": 85.3096},
+    "bhubaneswar": {"name": "Bhubaneswar", "lat": 20.2961, "lon": 85.8245},
+    "raipur": {"name": "Raipur", "lat": 21.2514, "lon": 81.6296},
+    "coimbatore": {"name": "Coimbatore", "lat": 11.0168, "lon": 76.9558},
+    "mysore": {"name": "Mysuru", "lat": 12.2958, "lon": 76.6394},
+    "mysuru": {"name": "Mysuru", "lat": 12.2958, "lon": 76.6394},
+    "noida": {"name": "Noida", "lat": 28.5355, "lon": 77.3910},
+    "gurgaon": {"name": "Gurugram", "lat": 28.4595, "lon": 77.0266},
+    "gurugram": {"name": "Gurugram", "lat": 28.4595, "lon": 77.0266},
+    "faridabad": {"name": "Faridabad", "lat": 28.4089, "lon": 77.3178},
+    "ghaziabad": {"name": "Ghaziabad", "lat": 28.6692, "lon": 77.4538},
+}
+
+MAX_COMPLETIONS = 20
+FUZZY_CACHE_SIZE = 4096
+
+
+def normalize_name(text: str) -> str:
+    return re.sub(r"\s+", " ", text.lower().strip())
+
+
+def bounded_edit_distance(a: str, b: str, max_distance: int) -> int:
+    # Optimal string alignment distance (adjacent transpositions cost 1),
+    # abandoned as soon as every cell in a row exceeds max_distance.
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + cost)
+            if prev_prev is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], prev_prev[j - 2] + 1)
+        if min(row) > max_distance:
+            return max_distance + 1
+        prev_prev, prev = prev, row
+    return prev[-1]
+
+
+class Gazetteer:
+    def __init__(self, cities: Dict[str, Dict[str, Any]], aliases: Dict[str, Dict[str, Any]]):
+        # Every name for a place resolves to one display name: the alias
+        # table's name where it has one ("bangalore" is Bengaluru), else the
+        # first city entry at those coordinates.
+        canonical = {}
+        for data in aliases.values():
+            canonical.setdefault((data["lat"], data["lon"]), data["name"])
+        for data in cities.values():
+            canonical.setdefault((data["lat"], data["lon"]), data["display_name"])
+
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        for key, data in list(cities.items()) + list(aliases.items()):
+            self.entries.setdefault(normalize_name(key), {
+                "key": normalize_name(key), "display_name": canonical[(data["lat"], data["lon"])],
+                "lat": data["lat"], "lon": data["lon"]
+            })
+
+        # Shorter names first, so "delhi" completes before "new delhi".
+        self._ranked_keys = sorted(self.entries, key=lambda k: (len(k), k))
+        self._trie: Dict[str, Any] = {"children": {}, "completions": []}
+        for key in self._ranked_keys:
+            node = self._trie
+            for char in key:
+                node = node["children"].setdefault(char, {"children": {}, "completions": []})
+                if len(node["completions"]) < MAX_COMPLETIONS:
+                    node["completions"].append(key)
+
+        self._keys_by_length: Dict[int, List[str]] = {}
+        for key in self._ranked_keys:
+            self._keys_by_length.setdefault(len(key), []).append(key)
+        self._fuzzy_keys = lru_cache(maxsize=FUZZY_CACHE_SIZE)(self._fuzzy_keys_uncached)
+
+        # Longest names first, so "new delhi" wins over "delhi" inside a phrase.
+        self._contained_pattern = re.compile(
+            r"\b(" + "|".join(re.escape(k) for k in sorted(self.entries, key=len, reverse=True)) + r")\b"
+        )
+
+    def lookup(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(normalize_name(name))
+
+    def complete(self, prefix: str, k: int = 10) -> List[Dict[str, Any]]:
+        node = self._trie
+        for char in normalize_name(prefix):
+            node = node["children"].get(char)
+            if node is None:
+                return []
+        return [self.entries[key] for key in node["completions"][:k]]
+
+    def _fuzzy_keys_uncached(self, name: str, max_distance: int) -> Tuple[str, ...]:
+        matches = []
+        for length in range(len(name) - max_distance, len(name) + max_distance + 1):
+            for key in self._keys_by_length.get(length, []):
+                distance = bounded_edit_distance(name, key, max_distance)
+                if distance <= max_distance:
+                    matches.append((distance, len(key), key))
+        return tuple(key for _, _, key in sorted(matches))
+
+    def fuzzy(self, name: str, max_distance: int = None, k: int = 10) -> List[Dict[str, Any]]:
+        name = normalize_name(name)
+        if max_distance is None:
+            max_distance = 1 if len(name) <= 5 else 2
+        return [self.entries[key] for key in self._fuzzy_keys(name, max_distance)[:k]]
+
+    def contained(self, text: str) -> Optional[Dict[str, Any]]:
+        match = self._contained_pattern.search(normalize_name(text))
+        return self.entries[match.group(1)] if match else None
+
+    def resolve(self, name: str) -> Optional[Dict[str, Any]]:
+        # Exact name, then a whole name inside the text, then a close typo.
+        # Prefixes are left to search(): "d" should not resolve to Delhi.
+        name = normalize_name(name)
+        if not name:
+            return None
+
+        entry = self.entries.get(name) or self.contained(name)
+        if entry is not None:
+            return entry
+
+        matches = self.fuzzy(name, k=1)
+        return matches[0] if matches else None
+
+    def search(self, query: str, k: int = 10) -> List[Dict[str, Any]]:
+        query = normalize_name(query)
+        if not query:
+            return []
+
+        results = []
+        seen = set()
+        exact = self.entries.get(query)
+        candidates = [(exact, "exact")] if exact else []
+        candidates += [(entry, "prefix") for entry in self.complete(query, k)]
+        if not candidates:
+            candidates = [(entry, "fuzzy") for entry in self.fuzzy(query, k=k)]
+
+        for entry, match in candidates:
+            if entry["key"] in seen:
+                continue
+            seen.add(entry["key"])
+            results.append({**entry, "match": match})
+            if len(results) == k:
+                break
+        return results
+
+
+GAZETTEER = Gazetteer(CITIES, LOCATION_ALIASES)
+
+
+def resolve_city(name: str) -> Optional[Dict[str, Any]]:
+    return GAZETTEER.resolve(name)
+
+
+def search_cities(query: str, k: int = 10) -> List[Dict[str, Any]]:
+    return GAZETTEER.search(query, k)
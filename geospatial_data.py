@@ -1,6 +1,23 @@
-from typing import Dict, List, Any
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+import hashlib
+import os
 import random
 
+from gazetteer import LOCATION_ALIASES
+from layer_provider import LayerProvider, geometry_bounds
+
+LAYER_DATA_DIR = os.environ.get(
+    "AQ_LAYER_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "layer_data")
+)
+# Half-width of the box queried around a city from file-backed layers.
+CITY_BBOX_DEGREES = 0.25
+INDIA_BBOX = (68.0, 6.5, 97.5, 37.5)
+GENERIC_LAYER_CACHE_SIZE = 1024
+
+layer_provider = LayerProvider(LAYER_DATA_DIR)
+
 
 DEMO_LAYERS = {
     "flood": {
@@ -223,7 +240,39 @@ def get_layer_info(layer_id: str) -> Dict[str, Any]:
     return DEMO_LAYERS.get(layer_id)
 
 
-def get_layer_data(layer_id: str, city_name: str = None) -> Dict[str, Any]:
+def city_center(city_name: str = None) -> Tuple[float, float]:
+    if city_name and city_name.lower() in LOCATION_ALIASES:
+        data = LOCATION_ALIASES[city_name.lower()]
+        return data["lat"], data["lon"]
+    return 20.5937, 78.9629
+
+
+def city_bbox(city_name: str) -> Tuple[float, float, float, float]:
+    lat, lon = city_center(city_name)
+    return (lon - CITY_BBOX_DEGREES, lat - CITY_BBOX_DEGREES, lon + CITY_BBOX_DEGREES, lat + CITY_BBOX_DEGREES)
+
+
+def bbox_intersects(bounds, bbox) -> bool:
+    return bounds is not None and bounds[0] <= bbox[2] and bounds[2] >= bbox[0] and bounds[1] <= bbox[3] and bounds[3] >= bbox[1]
+
+
+def get_layer_data(layer_id: str, city_name: str = None, bbox: Optional[Tuple[float, float, float, float]] = None) -> Dict[str, Any]:
+    if layer_provider.has_layer(layer_id):
+        if bbox is None:
+            bbox = city_bbox(city_name) if city_name else INDIA_BBOX
+        collection = layer_provider.query(layer_id, bbox)
+        if collection is not None:
+            return collection
+
+    if bbox is not None:
+        return {
+            "type": "FeatureCollection",
+            "features": [
+                f for f in get_layer_features(layer_id)
+                if bbox_intersects(geometry_bounds(f.get("geometry")), bbox)
+            ]
+        }
+
     if city_name and city_name in CITY_FEATURES:
         city_data = CITY_FEATURES[city_name]
         if layer_id in city_data:
@@ -232,32 +281,46 @@ def get_layer_data(layer_id: str, city_name: str = None) -> Dict[str, Any]:
     return generate_generic_layer(layer_id, city_name)
 
 
+def get_layer_features(layer_id: str) -> List[Dict[str, Any]]:
+    features = []
+    for city_name in sorted({data["name"] for data in LOCATION_ALIASES.values()}):
+        features.extend(get_layer_data(layer_id, city_name)["features"])
+    return features
+
+
+def layer_seed(layer_id: str, city_name: Optional[str]) -> int:
+    # hash() of a str changes from process to process, so every worker would
+    # draw different geometry for the same city.
+    digest = hashlib.sha256(f"{layer_id}:{city_name or ''}".encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
 def generate_generic_layer(layer_id: str, city_name: str = None) -> Dict[str, Any]:
-    from nlp_engine import LOCATION_ALIASES
-    
-    center_lat, center_lon = 20.5937, 78.9629
-    
-    if city_name:
-        city_lower = city_name.lower()
-        if city_lower in LOCATION_ALIASES:
-            center_lat = LOCATION_ALIASES[city_lower]["lat"]
-            center_lon = LOCATION_ALIASES[city_lower]["lon"]
+    # Aliases of the same city share one layer.
+    if city_name and city_name.lower() in LOCATION_ALIASES:
+        city_name = LOCATION_ALIASES[city_name.lower()]["name"]
+    return build_generic_layer(layer_id, city_name)
+
+
+@lru_cache(maxsize=GENERIC_LAYER_CACHE_SIZE)
+def build_generic_layer(layer_id: str, city_name: Optional[str]) -> Dict[str, Any]:
+    center_lat, center_lon = city_center(city_name)
     
-    random.seed(hash(f"{layer_id}{city_name}"))
+    rng = random.Random(layer_seed(layer_id, city_name))
     
     features = []
     
     if layer_id == "flood":
         for i in range(2):
-            offset_lat = random.uniform(-0.05, 0.05)
-            offset_lon = random.uniform(-0.05, 0.05)
-            size = random.uniform(0.02, 0.05)
+            offset_lat = rng.uniform(-0.05, 0.05)
+            offset_lon = rng.uniform(-0.05, 0.05)
+            size = rng.uniform(0.02, 0.05)
             
             features.append({
                 "type": "Feature",
                 "properties": {
                     "name": f"Flood Zone {i+1}",
-                    "risk": random.choice(["low", "medium", "high"])
+                    "risk": rng.choice(["low", "medium", "high"])
                 },
                 "geometry": {
                     "type": "Polygon",
@@ -289,8 +352,8 @@ def generate_generic_layer(layer_id: str, city_name: str = None) -> Dict[str, An
     
     elif layer_id == "roads":
         for i in range(3):
-            start_lat = center_lat + random.uniform(-0.1, 0.1)
-            start_lon = center_lon + random.uniform(-0.1, 0.1)
+            start_lat = center_lat + rng.uniform(-0.1, 0.1)
+            start_lon = center_lon + rng.uniform(-0.1, 0.1)
             
             features.append({
                 "type": "Feature",
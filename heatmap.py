@@ -0,0 +1,90 @@
+from typing import Any, Dict, List, Tuple
+import math
+
+import numpy as np
+
+
+# Largest grid a single heatmap request evaluates; bigger boxes are sampled
+# at a coarser multiple of the base resolution instead.
+MAX_HEATMAP_CELLS = 250_000
+
+
+def heatmap_axes(bbox: Tuple[float, float, float, float], origin: Tuple[float, float],
+                 resolution: float, max_cells: int = MAX_HEATMAP_CELLS) -> Tuple[np.ndarray, np.ndarray, float]:
+    min_lon, min_lat, max_lon, max_lat = bbox
+    n_lat = (max_lat - min_lat) / resolution + 1
+    n_lon = (max_lon - min_lon) / resolution + 1
+
+    # Cell centres stay on the prediction grid's lattice (origin plus a whole
+    # number of steps), so interpolating them reads grid nodes exactly.
+    step = resolution * max(1, math.ceil(math.sqrt(n_lat * n_lon / max_cells)))
+    lat_start = origin[0] + math.ceil((min_lat - origin[0]) / step - 1e-9) * step
+    lon_start = origin[1] + math.ceil((min_lon - origin[1]) / step - 1e-9) * step
+    lats = lat_start + step * np.arange(max(1, int(math.floor((max_lat - lat_start) / step + 1e-9)) + 1))
+    lons = lon_start + step * np.arange(max(1, int(math.floor((max_lon - lon_start) / step + 1e-9)) + 1))
+    return np.round(lats, 6), np.round(lons, 6), step
+
+
+def band_rectangles(classes: np.ndarray) -> List[Tuple[int, int, int, int, int]]:
+    # Runs of equal class along each row, stacked with identical runs in the
+    # rows below into rectangles of (class, row0, col0, row1, col1), end-exclusive.
+    n_cols = classes.shape[1]
+    starts = np.ones(classes.shape, dtype=bool)
+    starts[:, 1:] = classes[:, 1:] != classes[:, :-1]
+    rows, cols = np.nonzero(starts)
+
+    ends = np.append(cols[1:], n_cols)
+    ends[np.append(rows[1:] != rows[:-1], True)] = n_cols
+
+    rectangles = []
+    open_runs, next_runs = {}, {}
+    current_row = -1
+    for row, col0, col1, cls in zip(rows.tolist(), cols.tolist(), ends.tolist(), classes[rows, cols].tolist()):
+        # Every row starts a run at column 0, so rows arrive consecutively.
+        if row != current_row:
+            open_runs, next_runs = next_runs, {}
+            current_row = row
+        rectangle = open_runs.get((col0, col1, cls))
+        if rectangle is None:
+            rectangle = [cls, row, col0, row + 1, col1]
+            rectangles.append(rectangle)
+        else:
+            rectangle[3] = row + 1
+        next_runs[(col0, col1, cls)] = rectangle
+
+    return [tuple(r) for r in rectangles]
+
+
+def band_features(values: np.ndarray, lats: np.ndarray, lons: np.ndarray, step: float,
+                  breaks: List[float], bands: List[Dict[str, Any]], merge: bool = True) -> List[Dict[str, Any]]:
+    # values[i, j] is the reading at (lats[i], lons[j]); each cell covers half
+    # a step either side of its centre. With merge, every band is a single
+    # MultiPolygon feature; otherwise each rectangle is its own Polygon.
+    classes = np.digitize(values, breaks, right=True)
+    lats, lons = np.asarray(lats).tolist(), np.asarray(lons).tolist()
+    half = step / 2
+    rings = {}
+    for cls, row0, col0, row1, col1 in band_rectangles(classes):
+        west, east = round(lons[col0] - half, 6), round(lons[col1 - 1] + half, 6)
+        south, north = round(lats[row0] - half, 6), round(lats[row1 - 1] + half, 6)
+        rings.setdefault(cls, []).append([[west, south], [east, south], [east, north], [west, north], [west, south]])
+
+    features = []
+    for cls in sorted(rings):
+        if merge:
+            features.append({
+                "type": "Feature",
+                "properties": dict(bands[cls]),
+                "geometry": {"type": "MultiPolygon", "coordinates": [[ring] for ring in rings[cls]]}
+            })
+        else:
+            features.extend(
+                {"type": "Feature", "properties": dict(bands[cls]), "geometry": {"type": "Polygon", "coordinates": [ring]}}
+                for ring in rings[cls]
+            )
+    return features
+
+
+def encode_grid(values: np.ndarray) -> bytes:
+    # Rows run north to south, like an image, as little-endian float32.
+    return np.ascontiguousarray(values[::-1], dtype="<f4").tobytes()
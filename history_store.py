@@ -0,0 +1,248 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from spatial_index import SpatialIndex
+
+
+RECORD_DTYPE = np.dtype([("time", "<i8"), ("station", "<i4"), ("pm25", "<f4")])
+STATIONS_FILE = "stations.csv"
+DAY_SECONDS = 86400
+HOURS = 24
+# Stations further than this from every city are kept but belong to no city.
+CITY_RADIUS_KM = 50.0
+ROLLUP_CACHE_SIZE = 4096
+# Snapshots without a station column key stations by rounded coordinates.
+STATION_KEY_DECIMALS = 4
+
+
+def to_epoch_seconds(values) -> np.ndarray:
+    return np.asarray(pd.to_datetime(values)).astype("datetime64[s]").astype(np.int64)
+
+
+def from_epoch_seconds(seconds: int) -> str:
+    return np.datetime64(int(seconds), "s").astype(datetime).isoformat()
+
+
+def station_keys(frame: pd.DataFrame) -> pd.Series:
+    # The station column where there is one, else "lat,lon" rounded.
+    if "station" in frame.columns and frame["station"].notna().all():
+        return frame["station"]
+    lats = pd.to_numeric(frame["lat"], errors="coerce").round(STATION_KEY_DECIMALS)
+    lons = pd.to_numeric(frame["lon"], errors="coerce").round(STATION_KEY_DECIMALS)
+    fmt = f"{{:.{STATION_KEY_DECIMALS}f}}".format
+    keys = lats.map(fmt) + "," + lons.map(fmt)
+    keys[lats.isna() | lons.isna()] = None
+    if "station" not in frame.columns:
+        return keys
+    return frame["station"].where(frame["station"].notna(), keys)
+
+
+class HistoryStore:
+    # One append-only file of fixed-size records per day, read through
+    # memmaps. Queries never scan raw records twice: each day is reduced
+    # once to per-city hourly sum/count/min/max and that rollup is cached
+    # until the day's file grows.
+    def __init__(self, directory: str, cities: List[Dict[str, Any]]):
+        self.directory = directory
+        self.city_names = [c["name"] for c in cities]
+        self.city_ids = {name: i for i, name in enumerate(self.city_names)}
+        self.city_index = SpatialIndex(cities)
+        self._lock = threading.Lock()
+        self._rollups: "OrderedDict[int, tuple]" = OrderedDict()
+        self._load_stations()
+
+    def _load_stations(self):
+        try:
+            stations = pd.read_csv(os.path.join(self.directory, STATIONS_FILE))
+        except FileNotFoundError:
+            stations = pd.DataFrame({"station": [], "lat": [], "lon": []})
+        self.station_ids = {str(name): i for i, name in enumerate(stations["station"])}
+        self.station_city = self._assign_cities(stations["lat"].to_numpy(float), stations["lon"].to_numpy(float))
+
+    def _assign_cities(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        if len(lats) == 0 or len(self.city_index) == 0:
+            return np.full(len(lats), -1, dtype=np.int32)
+        dist, idx = self.city_index.nearest(lats, lons, 1)
+        return np.where(dist[:, 0] <= CITY_RADIUS_KM, idx[:, 0], -1).astype(np.int32)
+
+    def _register_stations(self, frame: pd.DataFrame) -> np.ndarray:
+        names = frame["station"].astype(str)
+        new = frame.loc[~names.isin(self.station_ids)].drop_duplicates("station")
+        if len(new):
+            new = new[["station", "lat", "lon"]].astype({"station": str})
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, STATIONS_FILE)
+            new.to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+            for name in new["station"]:
+                self.station_ids[name] = len(self.station_ids)
+            self.station_city = np.concatenate([
+                self.station_city,
+                self._assign_cities(new["lat"].to_numpy(float), new["lon"].to_numpy(float))
+            ])
+        return names.map(self.station_ids).to_numpy(np.int32)
+
+    def day_path(self, day: int) -> str:
+        return os.path.join(self.directory, "days", f"{from_epoch_seconds(day * DAY_SECONDS)[:10]}.bin")
+
+    def read_day(self, day: int) -> np.ndarray:
+        path = self.day_path(day)
+        # A torn write at the end of the file is ignored.
+        n_records = os.path.getsize(path) // RECORD_DTYPE.itemsize if os.path.exists(path) else 0
+        if n_records == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(path, dtype=RECORD_DTYPE, mode="r", shape=(n_records,))
+
+    def append(self, frame: pd.DataFrame, timestamp: datetime = None) -> int:
+        # frame has lat, lon and pm25_value columns, and optionally station
+        # and timestamp columns; otherwise rows are keyed by station_keys()
+        # and stamped with timestamp. Rows already stored for the same
+        # station and time are skipped, so ingesting the same snapshot twice
+        # is harmless.
+        frame = frame.assign(station=station_keys(frame)).dropna(subset=["station", "lat", "lon", "pm25_value"])
+        if "timestamp" in frame.columns:
+            times = to_epoch_seconds(frame["timestamp"])
+        else:
+            times = np.full(len(frame), to_epoch_seconds([timestamp or datetime.now()])[0])
+
+        with self._lock:
+            stations = self._register_stations(frame)
+            records = np.empty(len(frame), dtype=RECORD_DTYPE)
+            records["time"] = times
+            records["station"] = stations
+            records["pm25"] = frame["pm25_value"].to_numpy(np.float32)
+
+            written = 0
+            days = records["time"] // DAY_SECONDS
+            for day in np.unique(days).tolist():
+                batch = records[days == day]
+                existing = self.read_day(day)
+                if len(existing):
+                    keys = existing["time"] * (1 << 20) + existing["station"]
+                    batch = batch[~np.isin(batch["time"] * (1 << 20) + batch["station"], keys)]
+                if not len(batch):
+                    continue
+                path = self.day_path(day)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "ab") as f:
+                    f.write(batch.tobytes())
+                written += len(batch)
+        return written
+
+    def append_csv(self, path: str, timestamp: datetime = None) -> int:
+        if timestamp is None:
+            timestamp = datetime.fromtimestamp(int(os.path.getmtime(path)))
+        return self.append(pd.read_csv(path), timestamp)
+
+    def rollup(self, day: int) -> Optional[tuple]:
+        path = self.day_path(day)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            cached = self._rollups.get(day)
+            if cached is not None and cached[0] == size:
+                self._rollups.move_to_end(day)
+                return cached[1]
+
+        # Stations are registered before their records are written, so the
+        # city map read after the records covers every station in them.
+        records = self.read_day(day)
+        station_city = self.station_city
+        n_cells = len(self.city_names) * HOURS
+        city = station_city[records["station"]]
+        keep = (city >= 0) & np.isfinite(records["pm25"])
+        cells = city[keep] * HOURS + (records["time"][keep] % DAY_SECONDS) // 3600
+        values = records["pm25"][keep].astype(np.float64)
+
+        # Sorting by cell and reducing each run is much faster than ufunc.at.
+        minimum = np.full(n_cells, np.inf)
+        maximum = np.full(n_cells, -np.inf)
+        if len(cells):
+            order = np.argsort(cells)
+            cells_sorted, values_sorted = cells[order], values[order]
+            starts = np.flatnonzero(np.r_[True, cells_sorted[1:] != cells_sorted[:-1]])
+            minimum[cells_sorted[starts]] = np.minimum.reduceat(values_sorted, starts)
+            maximum[cells_sorted[starts]] = np.maximum.reduceat(values_sorted, starts)
+        shape = (len(self.city_names), HOURS)
+        result = (
+            np.bincount(cells, weights=values, minlength=n_cells).reshape(shape),
+            np.bincount(cells, minlength=n_cells).reshape(shape),
+            minimum.reshape(shape),
+            maximum.reshape(shape),
+        )
+
+        with self._lock:
+            self._rollups[day] = (size, result)
+            self._rollups.move_to_end(day)
+            while len(self._rollups) > ROLLUP_CACHE_SIZE:
+                self._rollups.popitem(last=False)
+        return result
+
+    def city_at(self, lat: float, lon: float) -> Optional[str]:
+        city_id = int(self._assign_cities(np.array([lat]), np.array([lon]))[0])
+        return self.city_names[city_id] if city_id >= 0 else None
+
+    def city_stations(self, city: str) -> int:
+        return int(np.count_nonzero(self.station_city == self.city_ids[city]))
+
+    def query(self, city: str, start: datetime, end: datetime, agg: str = "hourly") -> List[Dict[str, Any]]:
+        city_id = self.city_ids[city]
+        start_s, end_s = to_epoch_seconds([start, end]).tolist()
+        first_day, last_day = start_s // DAY_SECONDS, end_s // DAY_SECONDS
+
+        n_days = last_day - first_day + 1
+        sums = np.zeros((n_days, HOURS))
+        counts = np.zeros((n_days, HOURS), dtype=np.int64)
+        mins = np.full((n_days, HOURS), np.inf)
+        maxs = np.full((n_days, HOURS), -np.inf)
+        for i, day in enumerate(range(first_day, last_day + 1)):
+            rolled = self.rollup(day)
+            if rolled is not None:
+                sums[i], counts[i], mins[i], maxs[i] = (a[city_id] for a in rolled)
+
+        if agg == "daily":
+            sums, counts = sums.sum(axis=1), counts.sum(axis=1)
+            mins, maxs = mins.min(axis=1), maxs.max(axis=1)
+            starts = (first_day + np.arange(n_days)) * DAY_SECONDS
+        else:
+            sums, counts, mins, maxs = sums.ravel(), counts.ravel(), mins.ravel(), maxs.ravel()
+            starts = first_day * DAY_SECONDS + np.arange(n_days * HOURS) * 3600
+            # Hours partly inside the range are included.
+            in_range = (starts + 3600 > start_s) & (starts <= end_s)
+            sums, counts, mins, maxs, starts = sums[in_range], counts[in_range], mins[in_range], maxs[in_range], starts[in_range]
+
+        present = np.flatnonzero(counts)
+        means = sums[present] / counts[present]
+        return [
+            {
+                "time": from_epoch_seconds(starts[i]),
+                "pm25": round(mean, 1),
+                "pm25_min": round(low, 1),
+                "pm25_max": round(high, 1),
+                "count": count,
+            }
+            for i, mean, low, high, count in zip(
+                present.tolist(), means.tolist(), mins[present].tolist(), maxs[present].tolist(),
+                counts[present].tolist()
+            )
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        days_dir = os.path.join(self.directory, "days")
+        files = sorted(os.listdir(days_dir)) if os.path.isdir(days_dir) else []
+        return {
+            "stations": len(self.station_ids),
+            "days": len(files),
+            "first_day": files[0][:10] if files else None,
+            "last_day": files[-1][:10] if files else None,
+            "records": sum(os.path.getsize(os.path.join(days_dir, f)) for f in files) // RECORD_DTYPE.itemsize,
+            "cached_rollups": len(self._rollups),
+        }
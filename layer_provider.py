@@ -0,0 +1,267 @@
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import hashlib
+import importlib.util
+import json
+import os
+import threading
+
+import numpy as np
+
+from spatial_index import BoxIndex
+
+
+# Checked in this order when several files exist for the same layer.
+LAYER_FILE_FORMATS = (
+    (".geojsonl", "geojsonseq"),
+    (".geojsons", "geojsonseq"),
+    (".geojsonseq", "geojsonseq"),
+    (".ndjson", "geojsonseq"),
+    (".geojson", "geojson"),
+    (".json", "geojson"),
+    (".fgb", "ogr"),
+    (".gpkg", "ogr"),
+)
+
+READ_CHUNK = 1 << 20
+MAX_FEATURES = 10000
+
+# GeoPackage and FlatGeobuf files are ignored unless fiona is installed.
+HAS_FIONA = importlib.util.find_spec("fiona") is not None
+
+
+def geometry_bounds(geometry: Optional[Dict[str, Any]]) -> Optional[Tuple[float, float, float, float]]:
+    if not geometry:
+        return None
+
+    kind = geometry.get("type")
+    if kind == "GeometryCollection":
+        bounds = [b for b in (geometry_bounds(g) for g in geometry.get("geometries", [])) if b]
+        if not bounds:
+            return None
+        return (min(b[0] for b in bounds), min(b[1] for b in bounds),
+                max(b[2] for b in bounds), max(b[3] for b in bounds))
+
+    coords = geometry.get("coordinates")
+    if kind == "Point":
+        points = [coords]
+    elif kind in ("LineString", "MultiPoint"):
+        points = coords
+    elif kind in ("Polygon", "MultiLineString"):
+        points = [point for part in coords for point in part]
+    elif kind == "MultiPolygon":
+        points = [point for polygon in coords for ring in polygon for point in ring]
+    else:
+        return None
+
+    if not points:
+        return None
+    xs = [point[0] for point in points]
+    ys = [point[1] for point in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _scan_geojson_seq(path: str) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    offset = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip(b"\x1e \t\r\n"):
+                yield offset, len(line), json.loads(line.strip(b"\x1e \t\r\n"))
+            offset += len(line)
+
+
+def _scan_feature_collection(path: str) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    # Walks the top-level object member by member and decodes one feature
+    # at a time, so only the current feature is ever held in memory. The
+    # file is read as latin-1 so character offsets are byte offsets; the
+    # features are decoded again as UTF-8 when they are read back.
+    decoder = json.JSONDecoder()
+
+    with open(path, "rb") as f:
+        state = {"buffer": "", "base": 0, "pos": 0, "eof": False}
+
+        def fill() -> bool:
+            data = f.read(READ_CHUNK)
+            if not data:
+                state["eof"] = True
+                return False
+            # Drop what has been consumed before growing the buffer.
+            state["base"] += state["pos"]
+            state["buffer"] = state["buffer"][state["pos"]:] + data.decode("latin-1")
+            state["pos"] = 0
+            return True
+
+        def peek() -> str:
+            while True:
+                buffer, pos = state["buffer"], state["pos"]
+                while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                    pos += 1
+                state["pos"] = pos
+                if pos < len(buffer):
+                    return buffer[pos]
+                if not fill():
+                    return ""
+
+        def expect(char: str):
+            if peek() != char:
+                raise ValueError(f"{path}: expected '{char}' at byte {state['base'] + state['pos']}")
+            state["pos"] += 1
+
+        def value() -> Tuple[int, int, Any]:
+            peek()
+            while True:
+                start = state["pos"]
+                try:
+                    obj, end = decoder.raw_decode(state["buffer"], start)
+                    # A value that runs to the end of the buffer may continue.
+                    if end < len(state["buffer"]) or state["eof"]:
+                        state["pos"] = end
+                        return state["base"] + start, end - start, obj
+                except json.JSONDecodeError:
+                    if state["eof"]:
+                        raise
+                fill()
+
+        expect("{")
+        while peek() not in ("}", ""):
+            _, _, key = value()
+            expect(":")
+            if key != "features":
+                value()
+            else:
+                expect("[")
+                while peek() not in ("]", ""):
+                    offset, length, feature = value()
+                    yield offset, length, feature
+                    if peek() == ",":
+                        state["pos"] += 1
+                expect("]")
+            if peek() == ",":
+                state["pos"] += 1
+
+
+class GeoJSONSource:
+    def __init__(self, path: str, sequence: bool):
+        self.path = path
+        offsets, lengths, boxes = [], [], []
+
+        scan = _scan_geojson_seq if sequence else _scan_feature_collection
+        for offset, length, feature in scan(path):
+            bounds = geometry_bounds(feature.get("geometry"))
+            if bounds is None:
+                continue
+            offsets.append(offset)
+            lengths.append(length)
+            boxes.append(bounds)
+
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.lengths = np.array(lengths, dtype=np.int64)
+        self.index = BoxIndex(boxes)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def query(self, bbox, limit: Optional[int], min_size: float = 0.0) -> Iterator[Dict[str, Any]]:
+        ids = self.index.query(bbox, min_size)
+        if limit is not None:
+            ids = ids[:limit + 1]
+        with open(self.path, "rb") as f:
+            for i in ids:
+                f.seek(self.offsets[i])
+                yield json.loads(f.read(self.lengths[i]).strip(b"\x1e \t\r\n,"))
+
+
+class OGRSource:
+    # GeoPackage and FlatGeobuf carry their own R-tree, which OGR uses for
+    # bbox filters, so nothing is indexed or kept in memory here.
+    def __init__(self, path: str):
+        import fiona
+
+        self.path = path
+        with fiona.open(path) as src:
+            self.count = len(src)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def query(self, bbox, limit: Optional[int], min_size: float = 0.0) -> Iterator[Dict[str, Any]]:
+        import fiona
+
+        with fiona.open(self.path) as src:
+            matches = src.filter(bbox=tuple(bbox))
+            if limit is not None:
+                matches = islice(matches, limit + 1)
+            for feature in matches:
+                feature = json.loads(json.dumps(getattr(feature, "__geo_interface__", feature)))
+                if min_size > 0:
+                    bounds = geometry_bounds(feature.get("geometry"))
+                    if bounds and 0 < max(bounds[2] - bounds[0], bounds[3] - bounds[1]) < min_size:
+                        continue
+                yield feature
+
+
+class LayerProvider:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._sources: Dict[str, Tuple[tuple, Any]] = {}
+        self._lock = threading.Lock()
+
+    def find_file(self, layer_id: str) -> Optional[Tuple[str, str]]:
+        for extension, file_format in LAYER_FILE_FORMATS:
+            if file_format == "ogr" and not HAS_FIONA:
+                continue
+            path = os.path.join(self.directory, layer_id + extension)
+            if os.path.isfile(path):
+                return path, file_format
+        return None
+
+    def has_layer(self, layer_id: str) -> bool:
+        return self.find_file(layer_id) is not None
+
+    def _signature(self, path: str) -> tuple:
+        stat = os.stat(path)
+        return path, stat.st_mtime, stat.st_size
+
+    def source(self, layer_id: str):
+        found = self.find_file(layer_id)
+        if found is None:
+            return None
+        path, file_format = found
+        signature = self._signature(path)
+
+        cached = self._sources.get(layer_id)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        with self._lock:
+            cached = self._sources.get(layer_id)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+            if file_format == "ogr":
+                source = OGRSource(path)
+            else:
+                source = GeoJSONSource(path, sequence=(file_format == "geojsonseq"))
+
+            print(f"Indexed {len(source)} features from {path}")
+            self._sources[layer_id] = (signature, source)
+            return source
+
+    def version(self, layer_id: str) -> Optional[str]:
+        found = self.find_file(layer_id)
+        if found is None:
+            return None
+        return hashlib.sha1(repr(self._signature(found[0])).encode()).hexdigest()[:12]
+
+    def query(self, layer_id: str, bbox, limit: Optional[int] = MAX_FEATURES,
+              min_size: float = 0.0) -> Optional[Dict[str, Any]]:
+        source = self.source(layer_id)
+        if source is None:
+            return None
+
+        features: List[Dict[str, Any]] = list(source.query(bbox, limit, min_size))
+        collection = {"type": "FeatureCollection", "features": features}
+        if limit is not None and len(features) > limit:
+            collection["features"] = features[:limit]
+            collection["truncated"] = True
+        return collection
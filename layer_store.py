@@ -0,0 +1,139 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List
+import gzip
+import hashlib
+import json
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Server preference when the client accepts several encodings equally.
+ENCODING_PREFERENCE = ("br", "gzip", "identity")
+
+
+def dumps(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    accepted = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored.
+    for tag in (if_none_match or "").split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@dataclass
+class StoredLayer:
+    variants: Dict[str, bytes]
+    etags: Dict[str, str]
+    media_type: str = "application/json"
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    def select_encoding(self, accept_encoding: str) -> str:
+        accepted = parse_accept_encoding(accept_encoding)
+
+        # Identity is the fallback whenever no compressed variant is accepted.
+        best, best_q = "identity", 0.0
+        for encoding in ENCODING_PREFERENCE:
+            if encoding == "identity" or encoding not in self.variants:
+                continue
+            q = accepted.get(encoding, accepted.get("*", 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+
+def build_stored_layer(payload: Any, media_type: str = "application/json", headers: Dict[str, str] = None) -> StoredLayer:
+    body = payload if isinstance(payload, bytes) else dumps(payload)
+    variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+
+    # Strong ETags differ per content-coding since the bytes differ.
+    digest = hashlib.sha1(body).hexdigest()
+    etags = {
+        encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+        for encoding in variants
+    }
+    return StoredLayer(variants=variants, etags=etags, media_type=media_type, headers=dict(headers or {}))
+
+
+class LayerStore:
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, StoredLayer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any], media_type: str = "application/json",
+                     headers: Dict[str, str] = None) -> StoredLayer:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry
+            self._counters["misses"] += 1
+
+        entry = build_stored_layer(build(), media_type, headers)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sizes: List[Dict[str, int]] = [
+                {encoding: len(body) for encoding, body in entry.variants.items()}
+                for entry in self._entries.values()
+            ]
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "bytes": {
+                    encoding: sum(s.get(encoding, 0) for s in sizes)
+                    for encoding in ENCODING_PREFERENCE
+                },
+                "encoder": "orjson" if orjson is not None else "json",
+                "brotli": brotli is not None,
+                **self._counters
+            }
@@ -0,0 +1,298 @@
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import csv
+import json
+import threading
+import time
+import traceback
+
+import numpy as np
+
+from spatial_index import haversine_km
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+PM25_RANGE = (0.0, 1000.0)
+# Readings stamped further ahead than this are rejected as clock errors.
+MAX_CLOCK_SKEW_S = 300
+LAG_WINDOW = 1000
+CONSUMER_BATCH = 500
+
+
+@dataclass
+class Reading:
+    station: str
+    lat: float
+    lon: float
+    pm25: float
+    time: float
+    feed: str
+    received: float
+
+
+def parse_time(value: Any) -> Optional[float]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+def validate_reading(record: Dict[str, Any], feed: str, bounds: Dict[str, float], received: float) -> Reading:
+    station = str(record.get("station") or record.get("id") or "").strip()
+    if not station:
+        raise ValueError("missing station")
+    lat, lon = float(record["lat"]), float(record["lon"])
+    if not (bounds["lat_min"] <= lat <= bounds["lat_max"] and bounds["lon_min"] <= lon <= bounds["lon_max"]):
+        raise ValueError("coordinates outside bounds")
+    pm25 = float(record.get("pm25", record.get("pm25_value")))
+    if not PM25_RANGE[0] <= pm25 <= PM25_RANGE[1]:
+        raise ValueError("pm25 out of range")
+    observed = parse_time(record.get("time", record.get("timestamp")))
+    if observed is None:
+        observed = received
+    if observed > received + MAX_CLOCK_SKEW_S:
+        raise ValueError("reading is from the future")
+    return Reading(station, lat, lon, pm25, observed, feed, received)
+
+
+class LatestReadings:
+    # Newest reading per station. Lookups go through flat numpy arrays that
+    # are rebuilt lazily after updates, so a query is one vectorized
+    # distance computation however many stations there are.
+    def __init__(self):
+        self._readings: Dict[str, Reading] = {}
+        self._lock = threading.Lock()
+        self._arrays = None
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._readings)
+
+    def update(self, readings: List[Reading]) -> int:
+        applied = 0
+        with self._lock:
+            for reading in readings:
+                current = self._readings.get(reading.station)
+                if current is None or reading.time > current.time:
+                    self._readings[reading.station] = reading
+                    applied += 1
+            if applied:
+                self._arrays = None
+                self.version += 1
+        return applied
+
+    def _get_arrays(self):
+        with self._lock:
+            if self._arrays is None:
+                readings = list(self._readings.values())
+                self._arrays = (
+                    readings,
+                    np.array([r.lat for r in readings], dtype=float),
+                    np.array([r.lon for r in readings], dtype=float),
+                    np.array([r.pm25 for r in readings], dtype=float),
+                    np.array([r.time for r in readings], dtype=float),
+                )
+            return self._arrays
+
+    def nearby(self, lat: float, lon: float, radius_km: float, max_age_s: float) -> List[Tuple[Reading, float]]:
+        readings, lats, lons, _, times = self._get_arrays()
+        if not readings:
+            return []
+        dist = haversine_km(lat, lon, lats, lons)
+        idx = np.flatnonzero((dist <= radius_km) & (times >= time.time() - max_age_s))
+        idx = idx[np.argsort(dist[idx])]
+        return [(readings[i], float(dist[i])) for i in idx]
+
+
+class LiveFeedService:
+    # One polling task per feed shares a pooled AsyncClient and streams
+    # each response line by line into a bounded queue. A single consumer
+    # drains it into the latest-reading table. When the consumer falls
+    # behind, put() blocks the pollers, and that wait is reported as
+    # backpressure.
+    def __init__(self, feeds: List[str], table: LatestReadings, bounds: Dict[str, float],
+                 interval: float = 60, queue_size: int = 10000, timeout: float = 10,
+                 on_batch: Callable[[List[Reading]], None] = None):
+        self.feeds = feeds
+        self.table = table
+        self.bounds = bounds
+        self.interval = interval
+        self.timeout = timeout
+        self.on_batch = on_batch
+        self.queue: Optional[asyncio.Queue] = None
+        self.queue_size = queue_size
+        self._client = None
+        self._tasks: List[asyncio.Task] = []
+        self._lags = deque(maxlen=LAG_WINDOW)
+        self.metrics = {
+            "received": 0, "accepted": 0, "rejected": 0, "applied": 0, "stale": 0,
+            "queue_max_depth": 0, "backpressure_waits": 0, "backpressure_s": 0.0,
+        }
+        self.feed_status = {feed: {"polls": 0, "errors": 0, "last_error": None, "last_poll": None,
+                                   "last_duration_s": None, "last_readings": 0} for feed in feeds}
+
+    def start(self):
+        if httpx is None:
+            print("Live feeds disabled: httpx is not installed")
+            return
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=max(4, len(self.feeds)), max_keepalive_connections=len(self.feeds))
+        )
+        self._tasks = [asyncio.create_task(self._poll_loop(feed)) for feed in self.feeds]
+        self._tasks.append(asyncio.create_task(self._consume()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _put(self, reading: Reading):
+        if self.queue.full():
+            self.metrics["backpressure_waits"] += 1
+            start = time.perf_counter()
+            await self.queue.put(reading)
+            self.metrics["backpressure_s"] += time.perf_counter() - start
+        else:
+            self.queue.put_nowait(reading)
+        self.metrics["queue_max_depth"] = max(self.metrics["queue_max_depth"], self.queue.qsize())
+
+    async def poll(self, feed: str) -> int:
+        status = self.feed_status[feed]
+        start = time.perf_counter()
+        count = 0
+        try:
+            async with self._client.stream("GET", feed) as response:
+                response.raise_for_status()
+                is_csv = "csv" in response.headers.get("content-type", "") or feed.endswith(".csv")
+                header = None
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    if is_csv and header is None:
+                        header = next(csv.reader([line]))
+                        continue
+                    received = time.time()
+                    self.metrics["received"] += 1
+                    try:
+                        record = dict(zip(header, next(csv.reader([line])))) if is_csv else json.loads(line)
+                        reading = validate_reading(record, feed, self.bounds, received)
+                    except (ValueError, KeyError, TypeError, AttributeError):
+                        self.metrics["rejected"] += 1
+                        continue
+                    self.metrics["accepted"] += 1
+                    count += 1
+                    await self._put(reading)
+            status["last_error"] = None
+        except (httpx.HTTPError, UnicodeDecodeError) as e:
+            status["errors"] += 1
+            status["last_error"] = f"{type(e).__name__}: {e}"
+        status["polls"] += 1
+        status["last_poll"] = datetime.now().isoformat(timespec="seconds")
+        status["last_duration_s"] = round(time.perf_counter() - start, 4)
+        status["last_readings"] = count
+        return count
+
+    async def _poll_loop(self, feed: str):
+        while True:
+            start = time.perf_counter()
+            try:
+                await self.poll(feed)
+            except Exception:
+                traceback.print_exc()
+            await asyncio.sleep(max(0.0, self.interval - (time.perf_counter() - start)))
+
+    async def _consume(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < CONSUMER_BATCH and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            applied = self.table.update(batch)
+            self.metrics["applied"] += applied
+            self.metrics["stale"] += len(batch) - applied
+            now = time.time()
+            self._lags.extend((now - r.time, now - r.received) for r in batch)
+
+            if self.on_batch is not None:
+                try:
+                    await asyncio.to_thread(self.on_batch, batch)
+                except Exception as e:
+                    print(f"Live feed batch handler failed: {e}")
+            for _ in batch:
+                self.queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        lags = np.array(self._lags, dtype=float).reshape(-1, 2)
+
+        def percentiles(values):
+            if not len(values):
+                return None
+            p50, p95, high = np.percentile(values, [50, 95, 100])
+            return {"p50": round(float(p50), 3), "p95": round(float(p95), 3), "max": round(float(high), 3)}
+
+        return {
+            "feeds": self.feed_status,
+            "stations": len(self.table),
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "queue_size": self.queue_size,
+            **{k: round(v, 4) if isinstance(v, float) else v for k, v in self.metrics.items()},
+            # Observation lag: reading time to table; pipeline lag: receipt to table.
+            "observation_lag_s": percentiles(lags[:, 0]),
+            "pipeline_lag_s": percentiles(lags[:, 1]),
+        }
+
+
+def create_stub_feed_app(n_stations: int = 50, seed: int = 0, bounds: Dict[str, float] = None,
+                         centers: List[Tuple[float, float]] = ()):
+    # A stand-in station feed for local testing: GET /feed.ndjson or
+    # /feed.csv returns one fresh reading per station, streamed. The first
+    # stations sit within a few km of the given centers, the rest anywhere.
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+
+    bounds = bounds or {"lat_min": 6.5, "lat_max": 37.5, "lon_min": 68.0, "lon_max": 97.5}
+    rng = np.random.default_rng(seed)
+    lats = rng.uniform(bounds["lat_min"], bounds["lat_max"], n_stations)
+    lons = rng.uniform(bounds["lon_min"], bounds["lon_max"], n_stations)
+    n_near = min(len(centers), n_stations)
+    if n_near:
+        lats[:n_near] = [lat for lat, _ in centers[:n_near]] + rng.normal(0, 0.03, n_near)
+        lons[:n_near] = [lon for _, lon in centers[:n_near]] + rng.normal(0, 0.03, n_near)
+    base = rng.uniform(20, 250, n_stations)
+    app = FastAPI(title="Stub station feed")
+
+    def current_values():
+        now = datetime.now().astimezone()
+        values = np.clip(base * rng.normal(1.0, 0.1, n_stations), 0, 1000)
+        return now.isoformat(timespec="seconds"), values
+
+    @app.get("/feed.ndjson")
+    def ndjson_feed():
+        stamp, values = current_values()
+        lines = (json.dumps({"station": f"stub-{i}", "lat": round(float(lats[i]), 5), "lon": round(float(lons[i]), 5),
+                             "pm25": round(float(values[i]), 1), "time": stamp}) + "\n" for i in range(n_stations))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+
+    @app.get("/feed.csv")
+    def csv_feed():
+        stamp, values = current_values()
+        rows = ["station,lat,lon,pm25_value,timestamp\n"] + [
+            f"stub-{i},{lats[i]:.5f},{lons[i]:.5f},{values[i]:.1f},{stamp}\n" for i in range(n_stations)
+        ]
+        return StreamingResponse(iter(rows), media_type="text/csv")
+
+    return app
@@ -1,63 +1,122 @@
 import os
+import json
+import math
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Optional, List
+from collections import OrderedDict
 from contextlib import asynccontextmanager
+import asyncio
 
 import numpy as np
 import pandas as pd
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from pydantic import BaseModel, Field
+
+from alerts import AlertEngine, AlertRule, FileSink, WebhookSink, create_webhook_stub_app
+from aqi_push import AQIBroadcaster
+from gazetteer import CITIES, GAZETTEER, LOCATION_ALIASES, resolve_city, search_cities
+from geospatial_data import INDIA_BBOX, city_bbox, get_available_layers, get_layer_data as fetch_layer, get_layer_features, get_layer_info, layer_provider
+from heatmap import band_features, encode_grid, heatmap_axes
+from history_store import HistoryStore
+from live_feed import LatestReadings, LiveFeedService, create_stub_feed_app
+from layer_store import LayerStore, etag_matches
+from merra2_ingest import merra2_feature_mean, open_merra2
+from model_refresher import ModelRefresher
+from model_store import LATEST_FILE, load_model_artifact, save_model_artifact
+from nlp_engine import get_response_message, parse_query
+from response_cache import ResponseCache
+from spatial_index import SpatialIndex
+from vector_tiles import MAX_ZOOM, MVT_MEDIA_TYPE, QueryTileIndex, TileCache, TileIndex
+from warmup import exercise_endpoints, import_heavy_modules, print_import_report, warmup_phase, warmup_report
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MERRA2_DIR = os.path.join(BASE_DIR, 'merra2_data')
 CPCB_FILE = os.path.join(MERRA2_DIR, 'cpcb_ground_latest.csv')
-
-CITIES = {
-    "delhi": {"lat": 28.6139, "lon": 77.2090, "display_name": "Delhi"},
-    "new delhi": {"lat": 28.6139, "lon": 77.2090, "display_name": "New Delhi"},
-    "mumbai": {"lat": 19.0760, "lon": 72.8777, "display_name": "Mumbai"},
-    "kolkata": {"lat": 22.5726, "lon": 88.3639, "display_name": "Kolkata"},
-    "chennai": {"lat": 13.0827, "lon": 80.2707, "display_name": "Chennai"},
-    "bengaluru": {"lat": 12.9716, "lon": 77.5946, "display_name": "Bengaluru"},
-    "bangalore": {"lat": 12.9716, "lon": 77.5946, "display_name": "Bangalore"},
-    "hyderabad": {"lat": 17.3850, "lon": 78.4867, "display_name": "Hyderabad"},
-    "pune": {"lat": 18.5204, "lon": 73.8567, "display_name": "Pune"},
-    "ahmedabad": {"lat": 23.0225, "lon": 72.5714, "display_name": "Ahmedabad"},
-    "jaipur": {"lat": 26.9124, "lon": 75.7873, "display_name": "Jaipur"},
-    "lucknow": {"lat": 26.8467, "lon": 80.9462, "display_name": "Lucknow"},
-    "kanpur": {"lat": 26.4499, "lon": 80.3319, "display_name": "Kanpur"},
-    "nagpur": {"lat": 21.1458, "lon": 79.0882, "display_name": "Nagpur"},
-    "patna": {"lat": 25.5941, "lon": 85.1376, "display_name": "Patna"},
-    "indore": {"lat": 22.7196, "lon": 75.8577, "display_name": "Indore"},
-    "bhopal": {"lat": 23.2599, "lon": 77.4126, "display_name": "Bhopal"},
-    "visakhapatnam": {"lat": 17.6868, "lon": 83.2185, "display_name": "Visakhapatnam"},
-    "vadodara": {"lat": 22.3072, "lon": 73.1812, "display_name": "Vadodara"},
-    "ludhiana": {"lat": 30.9010, "lon": 75.8573, "display_name": "Ludhiana"},
-    "agra": {"lat": 27.1767, "lon": 78.0081, "display_name": "Agra"},
-    "varanasi": {"lat": 25.3176, "lon": 82.9739, "display_name": "Varanasi"},
-    "surat": {"lat": 21.1702, "lon": 72.8311, "display_name": "Surat"},
-    "chandigarh": {"lat": 30.7333, "lon": 76.7794, "display_name": "Chandigarh"},
-    "gurgaon": {"lat": 28.4595, "lon": 77.0266, "display_name": "Gurgaon"},
-    "gurugram": {"lat": 28.4595, "lon": 77.0266, "display_name": "Gurugram"},
-    "noida": {"lat": 28.5355, "lon": 77.3910, "display_name": "Noida"},
-    "ghaziabad": {"lat": 28.6692, "lon": 77.4538, "display_name": "Ghaziabad"},
-    "faridabad": {"lat": 28.4089, "lon": 77.3178, "display_name": "Faridabad"},
-    "amritsar": {"lat": 31.6340, "lon": 74.8723, "display_name": "Amritsar"},
-    "ranchi": {"lat": 23.3441, "lon": 85.3096, "display_name": "Ranchi"},
-    "coimbatore": {"lat": 11.0168, "lon": 76.9558, "display_name": "Coimbatore"},
-    "guwahati": {"lat": 26.1445, "lon": 91.7362, "display_name": "Guwahati"},
-    "bhubaneswar": {"lat": 20.2961, "lon": 85.8245, "display_name": "Bhubaneswar"},
-    "thiruvananthapuram": {"lat": 8.5241, "lon": 76.9366, "display_name": "Thiruvananthapuram"},
-    "kochi": {"lat": 9.9312, "lon": 76.2673, "display_name": "Kochi"},
-    "mysuru": {"lat": 12.2958, "lon": 76.6394, "display_name": "Mysuru"},
-    "mysore": {"lat": 12.2958, "lon": 76.6394, "display_name": "Mysore"},
-    "jodhpur": {"lat": 26.2389, "lon": 73.0243, "display_name": "Jodhpur"},
-    "raipur": {"lat": 21.2514, "lon": 81.6296, "display_name": "Raipur"},
-    "dehradun": {"lat": 30.3165, "lon": 78.0322, "display_name": "Dehradun"},
-    "shimla": {"lat": 31.1048, "lon": 77.1734, "display_name": "Shimla"},
-    "srinagar": {"lat": 34.0837, "lon": 74.7973, "display_name": "Srinagar"},
-}
+MODEL_DIR = os.path.join(BASE_DIR, 'models')
+TILE_CACHE_DIR = os.environ.get("AQ_TILE_CACHE_DIR", os.path.join(BASE_DIR, 'tile_cache'))
+HISTORY_DIR = os.environ.get("AQ_HISTORY_DIR", os.path.join(BASE_DIR, 'history'))
+MODEL_VERSION = os.environ.get("AQ_MODEL_VERSION")
+RELOAD_INTERVAL = float(os.environ.get("AQ_RELOAD_INTERVAL", "60"))
+MERRA2_WINDOW = os.environ.get("AQ_MERRA2_WINDOW", "daily")
+WARMUP = os.environ.get("AQ_WARMUP", "1") == "1"
+LIVE_FEEDS = [url.strip() for url in os.environ.get("AQ_LIVE_FEEDS", "").split(",") if url.strip()]
+LIVE_POLL_INTERVAL = float(os.environ.get("AQ_LIVE_POLL_INTERVAL", "60"))
+LIVE_QUEUE_SIZE = int(os.environ.get("AQ_LIVE_QUEUE_SIZE", "10000"))
+PUSH_INTERVAL = float(os.environ.get("AQ_PUSH_INTERVAL", "15"))
+PUSH_HEARTBEAT = 15
+MAX_SUBSCRIBED_CITIES = 100
+ALERTS_DIR = os.environ.get("AQ_ALERTS_DIR", os.path.join(BASE_DIR, 'alerts'))
+ALERT_INTERVAL = float(os.environ.get("AQ_ALERT_INTERVAL", "60"))
+ALERT_WEBHOOK = os.environ.get("AQ_ALERT_WEBHOOK")
+# Hosts a rule's own webhook_url may point at; without any, only AQ_ALERT_WEBHOOK is used.
+ALERT_WEBHOOK_HOSTS = [host.strip() for host in os.environ.get("AQ_ALERT_WEBHOOK_HOSTS", "").split(",") if host.strip()]
+
+INDIA_BOUNDS = {"lat_min": 6.5, "lat_max": 37.5, "lon_min": 68.0, "lon_max": 97.5}
+USE_PREDICTION_GRID = os.environ.get("AQ_PREDICTION_GRID", "1") == "1"
+GRID_RESOLUTION = float(os.environ.get("AQ_GRID_RESOLUTION", "0.1"))
+BATCH_CHUNK_SIZE = 5000
+MAX_BATCH_POINTS = int(os.environ.get("AQ_MAX_BATCH_POINTS", "500000"))
+NLP_BATCH_LIMIT = 1000
+# Open transcript streams remembered per /ws/nlp connection.
+NLP_STREAMS_PER_CONNECTION = 64
+MAX_TILE_FEATURES = 20000
+CACHE_TTLS = {"predict": 300, "forecast": 1800, "layer": 3600}
+AQI_BREAKS = [30, 60, 90, 120, 250]
+HISTORY_DEFAULT_DAYS = 7
+HISTORY_MAX_DAYS = 3660
+# Station residuals (reading minus model) are spread by inverse distance
+# squared over the NOWCAST_K nearest stations within NOWCAST_RADIUS_KM. The
+# model itself counts as one more station NOWCAST_MODEL_KM away, so the
+# correction fades out away from stations instead of stopping at the radius.
+NOWCAST_K = 8
+NOWCAST_RADIUS_KM = 50.0
+NOWCAST_MODEL_KM = 10.0
+NOWCAST_MIN_KM = 0.5
+# Live readings within LIVE_RADIUS_KM and younger than LIVE_MAX_AGE_S are
+# blended in the same way, with the model counted at LIVE_MODEL_KM.
+LIVE_RADIUS_KM = 25.0
+LIVE_MAX_AGE_S = 3 * 3600
+LIVE_MODEL_KM = 5.0
+
+WARMUP_REQUESTS = [
+    ("GET", "/", "", None),
+    ("GET", "/api/cities", "", None),
+    ("GET", "/api/cities/search", "q=del", None),
+    ("GET", "/api/predict/Delhi", "", None),
+    ("GET", "/api/forecast/Delhi", "", None),
+    ("GET", "/api/forecasts", "cities=Delhi,Mumbai", None),
+    ("GET", "/api/predict-coords", "lat=28.61&lon=77.21", None),
+    ("POST", "/api/predict-batch", "", [{"lat": 28.61, "lon": 77.21}]),
+    ("POST", "/api/nlp/query", "", {"query": "air quality in Delhi"}),
+    ("POST", "/api/nlp/batch", "", {"queries": ["show flood risk in Mumbai", "go to Chennai"]}),
+    ("GET", "/api/layers", "", None),
+    ("GET", "/api/layers/flood", "city=Mumbai", None),
+    ("GET", "/api/layers/pollution", "", None),
+    ("GET", "/api/layers/pollution", "city=Delhi&format=grid", None),
+    ("GET", "/api/tiles/flood/5/22/14.mvt", "", None),
+    ("GET", "/api/tiles/pollution/5/22/13.mvt", "", None),
+    ("GET", "/api/history/Delhi", "agg=daily", None),
+    ("GET", "/api/places/nearest", "lat=28.61&lon=77.21", None),
+    ("POST", "/api/places/nearest", "", [{"lat": 28.61, "lon": 77.21}]),
+    ("GET", "/api/places/within", "lat=28.61&lon=77.21", None),
+    ("GET", "/api/cache/stats", "", None),
+    ("GET", "/api/live/stats", "", None),
+    ("GET", "/api/subscribe/stats", "", None),
+    ("GET", "/api/alerts/stats", "", None),
+]
+
+response_cache = ResponseCache(maxsize=int(os.environ.get("AQ_CACHE_SIZE", "2048")))
+layer_store = LayerStore(maxsize=int(os.environ.get("AQ_LAYER_STORE_SIZE", "512")))
+tile_cache = TileCache(TILE_CACHE_DIR)
+tile_indexes = {}
+tile_index_lock = threading.Lock()
+live_readings = LatestReadings()
 
 def get_unique_cities():
     seen_coords = set()
@@ -67,13 +126,26 @@ def get_unique_cities():
         if coord_key not in seen_coords:
             seen_coords.add(coord_key)
             unique.append({
-                "name": data["display_name"],
+                "name": GAZETTEER.lookup(key)["display_name"],
                 "lat": data["lat"],
                 "lon": data["lon"]
             })
     return sorted(unique, key=lambda x: x["name"])
 
 UNIQUE_CITIES = get_unique_cities()
+history_store = HistoryStore(HISTORY_DIR, UNIQUE_CITIES)
+
+def record_live_readings(readings: list):
+    history_store.append(pd.DataFrame({
+        "station": [r.station for r in readings],
+        "lat": [r.lat for r in readings],
+        "lon": [r.lon for r in readings],
+        "pm25_value": [r.pm25 for r in readings],
+        "timestamp": [datetime.fromtimestamp(r.time) for r in readings]
+    }))
+
+live_service = LiveFeedService(LIVE_FEEDS, live_readings, INDIA_BOUNDS, LIVE_POLL_INTERVAL,
+                               LIVE_QUEUE_SIZE, on_batch=record_live_readings)
 
 class City(BaseModel):
     name: str
@@ -88,6 +160,9 @@ class PollutionData(BaseModel):
     aqi_category: str
     aqi_color: str
     health_advice: str
+    model_version: Optional[str] = None
+    source: str = "model"  # "model" or "model+live"
+    live_stations: int = 0
 
 class ForecastDay(BaseModel):
     date: str
@@ -103,14 +178,72 @@ class ForecastResponse(BaseModel):
     lat: float
     lon: float
     forecast: List[ForecastDay]
+    model_version: Optional[str] = None
 
 model_state = {
     "model": None,
     "feature_cols": None,
     "daily_mean": None,
     "merra_vars": None,
+    "grid": None,
+    "nowcast": None,
+    "features": None,
+    "target": None,
+    "version": None,
     "loaded": False
 }
+model_lock = threading.Lock()
+
+place_indexes = {"city": SpatialIndex([]), "station": SpatialIndex([]), "all": SpatialIndex([])}
+
+def snapshot_model_state() -> dict:
+    with model_lock:
+        return dict(model_state)
+
+def activate_model(loaded: dict, grid: dict = None):
+    nowcast = build_nowcast({**loaded, "grid": grid})
+    with model_lock:
+        model_state.update({
+            "model": loaded["model"],
+            "feature_cols": loaded["feature_cols"],
+            "daily_mean": loaded["daily_mean"],
+            "merra_vars": loaded["merra_vars"],
+            "features": loaded["features"],
+            "target": loaded["target"],
+            "version": loaded["version"],
+            "grid": grid,
+            "nowcast": nowcast,
+            "loaded": True
+        })
+    refresh_place_indexes(loaded)
+    response_cache.clear()
+
+def refresh_place_indexes(state: dict = None):
+    cities = [{"name": c["name"], "lat": c["lat"], "lon": c["lon"], "kind": "city"} for c in UNIQUE_CITIES]
+    seen_coords = {(c["lat"], c["lon"]) for c in cities}
+    for data in LOCATION_ALIASES.values():
+        if (data["lat"], data["lon"]) not in seen_coords:
+            seen_coords.add((data["lat"], data["lon"]))
+            cities.append({"name": data["name"], "lat": data["lat"], "lon": data["lon"], "kind": "city"})
+
+    stations = []
+    if state is not None and state.get("features") is not None:
+        cols = state["feature_cols"]
+        station_lats = np.asarray(state["features"][:, cols.index('lat')], dtype=float)
+        station_lons = np.asarray(state["features"][:, cols.index('lon')], dtype=float)
+        # The CSV's station ids, as the history store keys them; the row
+        # number only for snapshots (or older artifacts) without them.
+        station_ids = state.get("stations") or [None] * len(station_lats)
+        for i, (lat, lon, pm25) in enumerate(zip(station_lats.tolist(), station_lons.tolist(),
+                                                  np.asarray(state["target"], dtype=float).tolist())):
+            stations.append({"name": station_ids[i] or f"CPCB station {i + 1}", "lat": lat, "lon": lon,
+                             "kind": "station", "pm25": round(pm25, 1)})
+
+    place_indexes.update({
+        "city": SpatialIndex(cities),
+        "station": SpatialIndex(stations),
+        "all": SpatialIndex(cities + stations)
+    })
 
 def get_seasonal_factor(date: datetime, lat: float) -> float:
     month = date.month
@@ -129,10 +262,14 @@ def get_seasonal_factor(date: datetime, lat: float) -> float:
         return 0.9
     return 1.0
 
-def get_weather_trend_factor(days_ahead: int, seed: int) -> float:
-    np.random.seed(seed)
-    base_trend = np.sin(days_ahead * 0.3) * 0.15
-    noise = np.random.normal(0, 0.05)
+def get_trend_generator(lat: float, lon: float, date: datetime) -> np.random.Generator:
+    entropy = [int(round((lat + 90) * 10000)), int(round((lon + 180) * 10000)), date.toordinal()]
+    return np.random.default_rng(np.random.SeedSequence(entropy))
+
+def get_weather_trend_factors(lat: float, lon: float, start_date: datetime, days: int) -> np.ndarray:
+    rng = get_trend_generator(lat, lon, start_date)
+    base_trend = np.sin(np.arange(days) * 0.3) * 0.15
+    noise = rng.normal(0, 0.05, size=days)
     return 1.0 + base_trend + noise
 
 def get_aqi_category(pm25: float) -> tuple[str, str]:
@@ -163,66 +300,81 @@ def get_health_advice(pm25: float) -> str:
     else:
         return "Health emergency! Avoid all outdoor activities. Stay indoors with air purification."
 
-def load_model():
+def base_feature_columns(lats: np.ndarray, lons: np.ndarray) -> dict:
+    return {
+        'lat': lats, 'lon': lons,
+        'lat_norm': (lats - 6.5) / 31, 'lon_norm': (lons - 68) / 29.5,
+        'dist_delhi': np.sqrt((lats - 28.6139)**2 + (lons - 77.209)**2),
+        'indo_gangetic': ((24 < lats) & (lats < 31) & (74 < lons) & (lons < 88)).astype(int),
+        'coastal': ((lats < 15) | ((lons < 74) & (lats < 25))).astype(int)
+    }
+
+def nearest_grid_indices(coords: np.ndarray, points: np.ndarray) -> np.ndarray:
+    coords = np.asarray(coords, dtype=float)
+    if len(coords) == 1:
+        return np.zeros(len(points), dtype=int)
+
+    order = np.argsort(coords, kind='stable')
+    sorted_coords = coords[order]
+    right = np.clip(np.searchsorted(sorted_coords, points), 1, len(sorted_coords) - 1)
+    left = right - 1
+
+    # Ties go to the larger coordinate, matching xarray's .sel(method='nearest').
+    use_left = np.abs(points - sorted_coords[left]) < np.abs(sorted_coords[right] - points)
+    return order[np.where(use_left, left, right)]
+
+def extract_merra_features(daily_mean, merra_vars: List[str], lats: np.ndarray, lons: np.ndarray) -> dict:
+    lat_idx = nearest_grid_indices(daily_mean['lat'].values, lats)
+    lon_idx = nearest_grid_indices(daily_mean['lon'].values, lons)
+
+    columns = {}
+    for var in merra_vars:
+        data = daily_mean[var]
+        if set(data.dims) != {'lat', 'lon'}:
+            continue
+        columns[var] = np.asarray(data.transpose('lat', 'lon').values, dtype=float)[lat_idx, lon_idx]
+    return columns
+
+def build_station_features(stations_df: pd.DataFrame, daily_mean, merra_vars: List[str]) -> pd.DataFrame:
+    lats = stations_df['lat'].to_numpy(dtype=float)
+    lons = stations_df['lon'].to_numpy(dtype=float)
+
+    columns = base_feature_columns(lats, lons)
+    df = pd.DataFrame({
+        'lat': lats, 'lon': lons, 'pm25_value': stations_df['pm25_value'].to_numpy(),
+        **{name: values for name, values in columns.items() if name not in ('lat', 'lon')}
+    })
+
+    if daily_mean is not None:
+        for var, values in extract_merra_features(daily_mean, merra_vars, lats, lons).items():
+            # Variables with no valid reading at any station never became features.
+            if not np.isnan(values).all():
+                df[var] = values
+
+    return df
+
+def train_model() -> Optional[dict]:
     try:
         from sklearn.ensemble import RandomForestRegressor
         import xarray as xr
     except ImportError:
-        model_state["loaded"] = True
-        return
+        return None
 
     try:
         stations_df = pd.read_csv(CPCB_FILE)
     except FileNotFoundError:
-        model_state["loaded"] = True
-        return
+        return None
 
-    merra2_ds = None
     daily_mean = None
-    merra_vars = []
-
-    for root, dirs, files in os.walk(MERRA2_DIR):
-        for f in files:
-            if f.endswith('.nc4'):
-                try:
-                    merra2_ds = xr.open_dataset(os.path.join(root, f))
-                    break
-                except:
-                    pass
-        if merra2_ds is not None:
-            break
+    merra2_ds, merra_vars = open_merra2(MERRA2_DIR, INDIA_BOUNDS)
 
     if merra2_ds is not None:
-        daily_mean = merra2_ds.mean(dim='time')
-        merra_vars = list(daily_mean.data_vars)[:10]
-
-    records = []
-    for _, row in stations_df.iterrows():
-        lat, lon = row['lat'], row['lon']
-        feat = {
-            'lat': lat, 'lon': lon, 'pm25_value': row['pm25_value'],
-            'lat_norm': (lat - 6.5) / 31, 'lon_norm': (lon - 68) / 29.5,
-            'dist_delhi': np.sqrt((lat - 28.6139)**2 + (lon - 77.209)**2),
-            'indo_gangetic': int((24 < lat < 31) and (74 < lon < 88)),
-            'coastal': int((lat < 15) or ((lon < 74) and (lat < 25)))
-        }
+        daily_mean = merra2_feature_mean(merra2_ds, MERRA2_WINDOW)
 
-        if daily_mean is not None:
-            try:
-                point = daily_mean.sel(lat=lat, lon=lon, method='nearest')
-                for var in merra_vars:
-                    try:
-                        val = float(point[var].values)
-                        if not np.isnan(val):
-                            feat[var] = val
-                    except:
-                        pass
-            except:
-                pass
-
-        records.append(feat)
-
-    df = pd.DataFrame(records)
+    df = build_station_features(stations_df, daily_mean, merra_vars)
+    stations = None
+    if 'station' in stations_df.columns:
+        stations = [str(s) if pd.notna(s) else None for s in stations_df['station']]
     feature_cols = [c for c in df.columns if c not in ['pm25_value']]
 
     X = df[feature_cols].fillna(0).values
@@ -231,17 +383,189 @@ def load_model():
     model = RandomForestRegressor(n_estimators=100, max_depth=10, random_state=42)
     model.fit(X, y)
 
-    model_state["model"] = model
-    model_state["feature_cols"] = feature_cols
-    model_state["daily_mean"] = daily_mean
-    model_state["merra_vars"] = merra_vars
-    model_state["loaded"] = True
+    return {
+        "version": datetime.now().strftime("%Y%m%d%H%M%S") + "-live",
+        "model": model,
+        "feature_cols": feature_cols,
+        "daily_mean": daily_mean,
+        "merra_vars": merra_vars,
+        "features": X,
+        "target": y,
+        "stations": stations
+    }
+
+def train_and_save() -> Optional[str]:
+    trained = train_model()
+    if trained is None:
+        return None
+
+    return save_model_artifact(
+        MODEL_DIR, trained["model"], trained["feature_cols"], trained["merra_vars"],
+        trained["features"], trained["target"], trained["daily_mean"], trained["stations"]
+    )
+
+def load_model() -> Optional[threading.Thread]:
+    try:
+        loaded = load_model_artifact(MODEL_DIR, MODEL_VERSION)
+    except ImportError:
+        loaded = None
+
+    if loaded is None:
+        loaded = train_model()
+
+    if loaded is None:
+        model_state["loaded"] = True
+        refresh_place_indexes()
+        return None
+
+    activate_model(loaded)
+
+    if USE_PREDICTION_GRID:
+        return schedule_grid_refresh()
+    return None
+
+def get_watched_paths() -> List[str]:
+    paths = [CPCB_FILE, MERRA2_DIR]
+    if MODEL_VERSION is None:
+        paths.append(os.path.join(MODEL_DIR, LATEST_FILE))
+    return paths
+
+def ingest_ground_snapshot():
+    try:
+        written = history_store.append_csv(CPCB_FILE)
+    except FileNotFoundError:
+        return
+    except (KeyError, ValueError) as e:
+        print(f"Could not add {CPCB_FILE} to history: {e}")
+        return
+    if written:
+        print(f"Added {written} ground readings to history")
 
-def predict_pollution(lat: float, lon: float, date: datetime = None) -> float:
+def reload_model(changed: List[str]):
+    if CPCB_FILE in changed:
+        ingest_ground_snapshot()
+
+    if MODEL_VERSION is not None:
+        # A pinned version is never replaced by a retrained model.
+        print(f"Model pinned to {MODEL_VERSION}; not retraining for changes to {', '.join(changed)}")
+        return
+
+    if os.path.join(MODEL_DIR, LATEST_FILE) in changed:
+        loaded = load_model_artifact(MODEL_DIR, MODEL_VERSION)
+    else:
+        loaded = train_model()
+
+    if loaded is None:
+        return
+
+    grid = None
+    if USE_PREDICTION_GRID:
+        grid = build_prediction_grid({**loaded, "grid": None})
+
+    activate_model(loaded, grid)
+    print(f"Model {loaded['version']} activated")
+
+def build_feature_matrix(lats: np.ndarray, lons: np.ndarray, state: dict = None) -> np.ndarray:
+    if state is None:
+        state = snapshot_model_state()
+
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+
+    columns = base_feature_columns(lats, lons)
+
+    daily_mean = state["daily_mean"]
+    if daily_mean is not None:
+        for var, values in extract_merra_features(daily_mean, state["merra_vars"], lats, lons).items():
+            columns[var] = np.nan_to_num(values, nan=0.0)
+
+    zeros = np.zeros(len(lats))
+    return np.column_stack([columns.get(c, zeros) for c in state["feature_cols"]])
+
+def build_prediction_grid(state: dict) -> dict:
+    step = GRID_RESOLUTION
+    n_lat = int(round((INDIA_BOUNDS["lat_max"] - INDIA_BOUNDS["lat_min"]) / step)) + 1
+    n_lon = int(round((INDIA_BOUNDS["lon_max"] - INDIA_BOUNDS["lon_min"]) / step)) + 1
+    grid_lats = INDIA_BOUNDS["lat_min"] + step * np.arange(n_lat)
+    grid_lons = INDIA_BOUNDS["lon_min"] + step * np.arange(n_lon)
+
+    lat_mesh, lon_mesh = np.meshgrid(grid_lats, grid_lons, indexing='ij')
+    X = build_feature_matrix(lat_mesh.ravel(), lon_mesh.ravel(), state)
+    values = state["model"].predict(X).reshape(n_lat, n_lon).astype(np.float32)
+
+    return {
+        "lat_min": INDIA_BOUNDS["lat_min"],
+        "lon_min": INDIA_BOUNDS["lon_min"],
+        "step": step,
+        "values": values
+    }
+
+def refresh_prediction_grid():
+    state = snapshot_model_state()
+    if state["model"] is None:
+        return
+
+    grid = build_prediction_grid(state)
+    # Residuals are taken against the base the grid now gives.
+    nowcast = build_nowcast({**state, "grid": grid})
+
+    # A newer model may have been activated while we were building.
+    with model_lock:
+        if model_state["model"] is not state["model"]:
+            return
+        model_state["grid"] = grid
+        model_state["nowcast"] = nowcast
+    response_cache.clear()
+
+def schedule_grid_refresh() -> threading.Thread:
+    thread = threading.Thread(target=refresh_prediction_grid, name="prediction-grid", daemon=True)
+    thread.start()
+    return thread
+
+def grid_contains(grid: dict, lat: float, lon: float) -> bool:
+    n_lat, n_lon = grid["values"].shape
+    return (grid["lat_min"] <= lat <= grid["lat_min"] + grid["step"] * (n_lat - 1) and
+            grid["lon_min"] <= lon <= grid["lon_min"] + grid["step"] * (n_lon - 1))
+
+def interpolate_grid(grid: dict, lats, lons) -> np.ndarray:
+    values = grid["values"]
+    n_lat, n_lon = values.shape
+
+    fy = np.clip((np.asarray(lats, dtype=float) - grid["lat_min"]) / grid["step"], 0, n_lat - 1)
+    fx = np.clip((np.asarray(lons, dtype=float) - grid["lon_min"]) / grid["step"], 0, n_lon - 1)
+    y0 = np.minimum(fy.astype(int), n_lat - 2)
+    x0 = np.minimum(fx.astype(int), n_lon - 2)
+    dy = fy - y0
+    dx = fx - x0
+
+    return (values[y0, x0] * (1 - dy) * (1 - dx) +
+            values[y0 + 1, x0] * dy * (1 - dx) +
+            values[y0, x0 + 1] * (1 - dy) * dx +
+            values[y0 + 1, x0 + 1] * dy * dx)
+
+def interpolate_grid_point(grid: dict, lat: float, lon: float) -> float:
+    values = grid["values"]
+    n_lat, n_lon = values.shape
+
+    fy = (lat - grid["lat_min"]) / grid["step"]
+    fx = (lon - grid["lon_min"]) / grid["step"]
+    y0 = min(int(fy), n_lat - 2)
+    x0 = min(int(fx), n_lon - 2)
+    dy = fy - y0
+    dx = fx - x0
+
+    return float(values[y0, x0] * (1 - dy) * (1 - dx) +
+                 values[y0 + 1, x0] * dy * (1 - dx) +
+                 values[y0, x0 + 1] * (1 - dy) * dx +
+                 values[y0 + 1, x0 + 1] * dy * dx)
+
+def predict_pollution(lat: float, lon: float, date: datetime = None, state: dict = None) -> float:
     if date is None:
         date = datetime.now()
+    if state is None:
+        state = snapshot_model_state()
 
-    if model_state["model"] is None:
+    if state["model"] is None:
         dist_delhi = np.sqrt((lat - 28.6139)**2 + (lon - 77.209)**2)
         indo_gangetic = (24 < lat < 31) and (74 < lon < 88)
         coastal = (lat < 15) or ((lon < 74) and (lat < 25))
@@ -257,85 +581,240 @@ def predict_pollution(lat: float, lon: float, date: datetime = None) -> float:
         else:
             base = 85
     else:
-        feat = {
-            'lat': lat, 'lon': lon,
-            'lat_norm': (lat - 6.5) / 31, 'lon_norm': (lon - 68) / 29.5,
-            'dist_delhi': np.sqrt((lat - 28.6139)**2 + (lon - 77.209)**2),
-            'indo_gangetic': int((24 < lat < 31) and (74 < lon < 88)),
-            'coastal': int((lat < 15) or ((lon < 74) and (lat < 25)))
-        }
-
-        if model_state["daily_mean"] is not None:
-            try:
-                point = model_state["daily_mean"].sel(lat=lat, lon=lon, method='nearest')
-                for var in model_state["merra_vars"]:
-                    try:
-                        val = float(point[var].values)
-                        if not np.isnan(val):
-                            feat[var] = val
-                    except:
-                        pass
-            except:
-                pass
-
-        X = np.array([[feat.get(c, 0) for c in model_state["feature_cols"]]])
-        base = model_state["model"].predict(X)[0]
+        if state["grid"] is not None and grid_contains(state["grid"], lat, lon):
+            base = interpolate_grid_point(state["grid"], lat, lon)
+        else:
+            X = build_feature_matrix([lat], [lon], state)
+            base = state["model"].predict(X)[0]
+        if state.get("nowcast") is not None:
+            base += float(nowcast_correction(np.array([lat]), np.array([lon]), state["nowcast"])[0])
 
     seasonal = get_seasonal_factor(date, lat)
     pm25 = base * seasonal
 
     return max(10, min(350, pm25))
 
-def predict_forecast(lat: float, lon: float, days: int = 7) -> List[dict]:
-    today = datetime.now()
-    forecast = []
+def get_seasonal_factors(months, lats) -> np.ndarray:
+    months = np.asarray(months)
+    north = np.asarray(lats) > 24
+    peak_winter = np.isin(months, [11, 12, 1])
+    early_winter = np.isin(months, [10, 2])
+
+    return np.select(
+        [peak_winter & north, peak_winter, early_winter & north, early_winter,
+         np.isin(months, [6, 7, 8, 9]), np.isin(months, [3, 4, 5])],
+        [1.35, 1.1, 1.2, 1.05, 0.7, 0.9],
+        default=1.0
+    )
 
-    seed = int(abs(lat * 100 + lon * 100))
+def regional_estimates(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    dist_delhi = np.sqrt((lats - 28.6139)**2 + (lons - 77.209)**2)
+    indo_gangetic = (24 < lats) & (lats < 31) & (74 < lons) & (lons < 88)
+    coastal = (lats < 15) | ((lons < 74) & (lats < 25))
 
-    prev_pm25 = None
-    for i in range(days):
-        date = today + timedelta(days=i)
+    return np.select(
+        [indo_gangetic, dist_delhi < 3, coastal, lats < 20],
+        [150.0, 170.0, 40.0, 50.0],
+        default=85.0
+    )
 
-        base_pm25 = predict_pollution(lat, lon, date)
+def predict_base_batch(lats: np.ndarray, lons: np.ndarray, state: dict = None) -> np.ndarray:
+    if state is None:
+        state = snapshot_model_state()
 
-        trend_factor = get_weather_trend_factor(i, seed + date.day)
-        pm25 = base_pm25 * trend_factor
-        pm25 = max(10, min(350, pm25))
+    if state["model"] is None:
+        return regional_estimates(lats, lons)
 
-        if prev_pm25 is None:
-            trend = "stable"
-        elif pm25 > prev_pm25 * 1.05:
-            trend = "rising"
-        elif pm25 < prev_pm25 * 0.95:
-            trend = "falling"
-        else:
-            trend = "stable"
+    base = np.empty(len(lats))
+    grid = state["grid"]
+    if grid is not None:
+        n_lat, n_lon = grid["values"].shape
+        on_grid = ((lats >= grid["lat_min"]) & (lats <= grid["lat_min"] + grid["step"] * (n_lat - 1)) &
+                   (lons >= grid["lon_min"]) & (lons <= grid["lon_min"] + grid["step"] * (n_lon - 1)))
+    else:
+        on_grid = np.zeros(len(lats), dtype=bool)
+
+    if on_grid.any():
+        base[on_grid] = interpolate_grid(grid, lats[on_grid], lons[on_grid])
+    if not on_grid.all():
+        off_grid = ~on_grid
+        base[off_grid] = state["model"].predict(build_feature_matrix(lats[off_grid], lons[off_grid], state))
+
+    if state.get("nowcast") is not None:
+        base += nowcast_correction(lats, lons, state["nowcast"])
+    return base
+
+def idw_residuals(dist: np.ndarray, residuals: np.ndarray, radius_km: float, model_km: float) -> np.ndarray:
+    # dist and residuals are (points, stations); the model enters as a zero
+    # residual at model_km, which shrinks the correction far from stations.
+    weights = np.where(dist <= radius_km, 1 / np.maximum(dist, NOWCAST_MIN_KM) ** 2, 0.0)
+    return (weights * residuals).sum(axis=1) / (weights.sum(axis=1) + 1 / model_km ** 2)
+
+def build_nowcast(state: dict) -> Optional[dict]:
+    if state.get("model") is None or state.get("features") is None or not len(state["target"]):
+        return None
+    cols = state["feature_cols"]
+    lats = np.asarray(state["features"][:, cols.index('lat')], dtype=float)
+    lons = np.asarray(state["features"][:, cols.index('lon')], dtype=float)
+    base = predict_base_batch(lats, lons, {**state, "nowcast": None})
+    return {
+        "index": SpatialIndex([{"lat": lat, "lon": lon} for lat, lon in zip(lats.tolist(), lons.tolist())]),
+        "residuals": np.asarray(state["target"], dtype=float) - base
+    }
 
-        confidence = max(0.5, 1.0 - (i * 0.07))
+def nowcast_correction(lats: np.ndarray, lons: np.ndarray, nowcast: dict) -> np.ndarray:
+    dist, idx = nowcast["index"].nearest_within(lats, lons, NOWCAST_K, NOWCAST_RADIUS_KM)
+    # Missing neighbours have index len(residuals) and zero weight.
+    residuals = np.append(nowcast["residuals"], 0.0)
+    return idw_residuals(dist, residuals[idx], NOWCAST_RADIUS_KM, NOWCAST_MODEL_KM)
 
-        aqi_category, aqi_color = get_aqi_category(pm25)
+def predict_pollution_batch(lats, lons, date: datetime = None, state: dict = None) -> np.ndarray:
+    if date is None:
+        date = datetime.now()
 
-        forecast.append({
-            "date": date.strftime("%Y-%m-%d"),
-            "day_name": "Today" if i == 0 else ("Tomorrow" if i == 1 else date.strftime("%a")),
-            "pm25": round(pm25, 1),
-            "aqi_category": aqi_category,
-            "aqi_color": aqi_color,
-            "trend": trend,
-            "confidence": round(confidence, 2)
-        })
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+
+    pm25 = predict_base_batch(lats, lons, state) * get_seasonal_factors(date.month, lats)
+
+    return np.clip(pm25, 10, 350)
+
+def blend_live_readings(model_pm25: float, nearby: list) -> float:
+    if not nearby:
+        return model_pm25
+    dist = np.array([[d for _, d in nearby]])
+    residuals = np.array([[r.pm25 - model_pm25 for r, _ in nearby]])
+    return model_pm25 + float(idw_residuals(dist, residuals, LIVE_RADIUS_KM, LIVE_MODEL_KM)[0])
+
+def get_aqi_bands() -> List[dict]:
+    bands = []
+    lower = 0
+    for upper in AQI_BREAKS + [None]:
+        aqi_category, aqi_color = get_aqi_category(AQI_BREAKS[-1] + 1 if upper is None else upper)
+        bands.append({"aqi_category": aqi_category, "aqi_color": aqi_color, "pm25_min": lower, "pm25_max": upper})
+        lower = upper
+    return bands
+
+def clip_to_india(bbox: tuple) -> Optional[tuple]:
+    min_lon, min_lat = max(bbox[0], INDIA_BOUNDS["lon_min"]), max(bbox[1], INDIA_BOUNDS["lat_min"])
+    max_lon, max_lat = min(bbox[2], INDIA_BOUNDS["lon_max"]), min(bbox[3], INDIA_BOUNDS["lat_max"])
+    if min_lon > max_lon or min_lat > max_lat:
+        return None
+    return min_lon, min_lat, max_lon, max_lat
+
+def get_heatmap_axes(bbox: tuple) -> tuple:
+    return heatmap_axes(bbox, (INDIA_BOUNDS["lat_min"], INDIA_BOUNDS["lon_min"]), GRID_RESOLUTION)
+
+def evaluate_heatmap(lats: np.ndarray, lons: np.ndarray, date: datetime = None, state: dict = None) -> np.ndarray:
+    # The whole grid is scored in one batch; on the prediction grid's lattice
+    # that is a lookup per cell rather than a model call.
+    lat_mesh, lon_mesh = np.meshgrid(lats, lons, indexing='ij')
+    return predict_pollution_batch(lat_mesh.ravel(), lon_mesh.ravel(), date, state).reshape(len(lats), len(lons))
+
+def get_heatmap_version(state: dict, date: datetime) -> str:
+    # Readings change with the model and, through the seasonal factor, the date.
+    return f"{state['version'] or 'regional'}-{date.strftime('%Y%m%d')}"
+
+def build_heatmap_features(bbox: tuple, date: datetime = None, state: dict = None, merge: bool = True) -> List[dict]:
+    lats, lons, step = get_heatmap_axes(bbox)
+    values = evaluate_heatmap(lats, lons, date, state)
+    return band_features(values, lats, lons, step, AQI_BREAKS, get_aqi_bands(), merge)
+
+def predict_forecast_batch(lats, lons, days: int = 7, state: dict = None) -> List[List[dict]]:
+    today = datetime.now()
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+
+    dates = [today + timedelta(days=i) for i in range(days)]
+    months = np.array([d.month for d in dates])
+
+    base = predict_base_batch(lats, lons, state)
+    daily = np.clip(base[:, None] * get_seasonal_factors(months[None, :], lats[:, None]), 10, 350)
+
+    trend_factors = np.array([
+        get_weather_trend_factors(lat, lon, today, days) for lat, lon in zip(lats.tolist(), lons.tolist())
+    ]).reshape(len(lats), days)
+    pm25 = np.clip(daily * trend_factors, 10, 350)
+
+    prev = np.concatenate([pm25[:, :1], pm25[:, :-1]], axis=1)
+    trends = np.select([pm25 > prev * 1.05, pm25 < prev * 0.95], ["rising", "falling"], default="stable")
+    trends[:, 0] = "stable"
+
+    confidences = np.maximum(0.5, 1.0 - np.arange(days) * 0.07)
+    date_labels = [d.strftime("%Y-%m-%d") for d in dates]
+    day_names = ["Today" if i == 0 else ("Tomorrow" if i == 1 else d.strftime("%a")) for i, d in enumerate(dates)]
+
+    forecasts = []
+    for row, trend_row in zip(pm25.tolist(), trends.tolist()):
+        forecast = []
+        for i, value in enumerate(row):
+            aqi_category, aqi_color = get_aqi_category(value)
+            forecast.append({
+                "date": date_labels[i],
+                "day_name": day_names[i],
+                "pm25": round(value, 1),
+                "aqi_category": aqi_category,
+                "aqi_color": aqi_color,
+                "trend": trend_row[i],
+                "confidence": round(float(confidences[i]), 2)
+            })
+        forecasts.append(forecast)
+
+    return forecasts
 
-        prev_pm25 = pm25
+def predict_forecast(lat: float, lon: float, days: int = 7, state: dict = None) -> List[dict]:
+    return predict_forecast_batch([lat], [lon], days, state)[0]
 
-    return forecast
+async def warm_up(app: FastAPI, grid_thread: Optional[threading.Thread] = None):
+    with warmup_phase("indexes"):
+        if grid_thread is not None:
+            grid_thread.join()
+        parse_query("air quality in Delhi")
+        search_cities("del")
+
+    # The grid is in place by now, so responses cached here stay valid.
+    with warmup_phase("endpoints"):
+        await exercise_endpoints(app, WARMUP_REQUESTS)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    start = time.perf_counter()
+    if WARMUP:
+        with warmup_phase("imports"):
+            import_heavy_modules()
+
     print("Loading ML model...")
-    load_model()
-    print("Model loaded!" if model_state["model"] else "Using regional estimates")
+    with warmup_phase("model"):
+        grid_thread = load_model()
+    print(f"Model {model_state['version']} loaded!" if model_state["model"] else "Using regional estimates")
+
+    with warmup_phase("history"):
+        ingest_ground_snapshot()
+
+    if WARMUP:
+        await warm_up(app, grid_thread)
+    warmup_report["total_s"] = round(time.perf_counter() - start, 4)
+    print(f"Startup finished in {warmup_report['total_s']:.2f}s")
+
+    refresher = None
+    if RELOAD_INTERVAL > 0:
+        refresher = ModelRefresher(get_watched_paths(), reload_model, RELOAD_INTERVAL)
+        refresher.start()
+
+    if LIVE_FEEDS:
+        live_service.start()
+        print(f"Polling {len(LIVE_FEEDS)} live feed(s) every {LIVE_POLL_INTERVAL:g}s")
+    aqi_broadcaster.start()
+    alert_engine.start(evaluate_alerts, ALERT_INTERVAL)
+
     yield
 
+    await alert_engine.stop()
+    await aqi_broadcaster.stop()
+    await live_service.stop()
+    if refresher is not None:
+        refresher.stop()
+
 app = FastAPI(
     title="Air Pollution Forecast API",
     description="ML-powered air pollution predictions and forecasts for Indian cities",
@@ -343,6 +822,13 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+@app.middleware("http")
+async def add_model_version_header(request: Request, call_next):
+    response = await call_next(request)
+    if model_state["version"]:
+        response.headers["X-Model-Version"] = model_state["version"]
+    return response
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -359,69 +845,180 @@ def root():
 def get_cities():
     return UNIQUE_CITIES
 
-@app.get("/api/predict/{city_name}", response_model=PollutionData)
-def get_prediction(city_name: str):
-    city_lower = city_name.lower().strip()
+def cached_json_response(request: Request, key: tuple, ttl: int, compute) -> Response:
+    entry = response_cache.get_or_compute(key, ttl, compute)
+    headers = {"ETag": entry.etag, "Cache-Control": f"public, max-age={entry.max_age()}"}
+
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+def stored_layer_response(request: Request, entry) -> Response:
+    encoding = entry.select_encoding(request.headers.get("accept-encoding", ""))
+    headers = {
+        **entry.headers,
+        "ETag": entry.etags[encoding],
+        "Cache-Control": f"public, max-age={CACHE_TTLS['layer']}",
+        "Vary": "Accept-Encoding"
+    }
 
-    if city_lower in CITIES:
-        city_data = CITIES[city_lower]
-    else:
-        matched = None
-        for key, data in CITIES.items():
-            if city_lower in key or key in city_lower:
-                matched = data
-                break
-        if matched is None:
-            raise HTTPException(status_code=404, detail=f"City '{city_name}' not found")
-        city_data = matched
-
-    lat, lon = city_data["lat"], city_data["lon"]
-    pm25 = predict_pollution(lat, lon)
-    aqi_category, aqi_color = get_aqi_category(pm25)
-    health_advice = get_health_advice(pm25)
+    if etag_matches(request.headers.get("if-none-match"), entry.etags[encoding]):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=entry.variants[encoding], media_type=entry.media_type, headers=headers)
 
+@app.get("/api/cities/search")
+def search_city_names(q: str, k: int = Query(default=10, ge=1, le=20)):
+    return search_cities(q, k)
+
+def build_pollution_data(city_data: dict, pm25: float, state: dict, nearby: list) -> PollutionData:
+    aqi_category, aqi_color = get_aqi_category(pm25)
     return PollutionData(
         city=city_data["display_name"],
-        lat=lat,
-        lon=lon,
+        lat=city_data["lat"],
+        lon=city_data["lon"],
         pm25=round(pm25, 1),
         aqi_category=aqi_category,
         aqi_color=aqi_color,
-        health_advice=health_advice
+        health_advice=get_health_advice(pm25),
+        model_version=state["version"],
+        source="model+live" if nearby else "model",
+        live_stations=len(nearby)
     )
 
-@app.get("/api/forecast/{city_name}", response_model=ForecastResponse)
-def get_forecast(city_name: str, days: int = Query(default=7, ge=1, le=14)):
-    city_lower = city_name.lower().strip()
+def compute_city_updates(city_names: List[str]) -> dict:
+    # Every subscribed city in one model call; runs on the broadcaster's thread.
+    matched = [resolve_city(name) for name in city_names]
+    state = snapshot_model_state()
+    values = predict_pollution_batch([c["lat"] for c in matched], [c["lon"] for c in matched], state=state)
+
+    updates = {}
+    for name, city_data, value in zip(city_names, matched, values.tolist()):
+        nearby = live_readings.nearby(city_data["lat"], city_data["lon"], LIVE_RADIUS_KM, LIVE_MAX_AGE_S)
+        updates[name] = {
+            **build_pollution_data(city_data, blend_live_readings(value, nearby), state, nearby).model_dump(),
+            "time": datetime.now().isoformat(timespec="seconds")
+        }
+    return updates
+
+aqi_broadcaster = AQIBroadcaster(compute_city_updates, PUSH_INTERVAL)
+
+alert_engine = AlertEngine(UNIQUE_CITIES, ALERTS_DIR, get_aqi_category)
+alert_engine.sinks["file"] = FileSink(os.path.join(ALERTS_DIR, "alerts.jsonl"))
+alert_engine.sinks["webhook"] = WebhookSink(ALERT_WEBHOOK, ALERT_WEBHOOK_HOSTS)
+
+def evaluate_alerts() -> list:
+    # Only cities some rule watches are computed: current values in one
+    # batch, and one forecast batch out to the furthest horizon needed.
+    # Horizon h alerts on the worst of the next h forecast days.
+    watched = alert_engine.watched()
+    if not watched:
+        return []
+    names = sorted(watched)
+    current = compute_city_updates(names)
+
+    ahead = [name for name in names if watched[name][-1] > 0]
+    forecasts = {}
+    if ahead:
+        matched = [resolve_city(name) for name in ahead]
+        days = max(watched[name][-1] for name in ahead) + 1
+        batch = predict_forecast_batch([c["lat"] for c in matched], [c["lon"] for c in matched], days=days,
+                                       state=snapshot_model_state())
+        forecasts = dict(zip(ahead, batch))
+
+    alerts = []
+    for name in names:
+        for horizon in watched[name]:
+            if horizon == 0:
+                value = current[name]["pm25"]
+            else:
+                value = max(day["pm25"] for day in forecasts[name][1:horizon + 1])
+            alerts.extend(alert_engine.update(name, horizon, value))
+    return alerts
+
+def resolve_subscription(names) -> tuple[List[str], List[str]]:
+    matched, missing = [], []
+    for name in names:
+        city_data = resolve_city(str(name)) if str(name).strip() else None
+        if city_data is None:
+            missing.append(str(name))
+        elif city_data["display_name"] not in matched:
+            matched.append(city_data["display_name"])
+    return matched, missing
 
-    if city_lower in CITIES:
-        city_data = CITIES[city_lower]
-    else:
-        matched = None
-        for key, data in CITIES.items():
-            if city_lower in key or key in city_lower:
-                matched = data
-                break
-        if matched is None:
-            raise HTTPException(status_code=404, detail=f"City '{city_name}' not found")
-        city_data = matched
-
-    lat, lon = city_data["lat"], city_data["lon"]
-    forecast = predict_forecast(lat, lon, days)
-
-    return ForecastResponse(
-        city=city_data["display_name"],
-        lat=lat,
-        lon=lon,
-        forecast=forecast
-    )
+@app.get("/api/predict/{city_name}", response_model=PollutionData)
+def get_prediction(city_name: str, request: Request):
+    city_data = resolve_city(city_name)
+    if city_data is None:
+        raise HTTPException(status_code=404, detail=f"City '{city_name}' not found")
+
+    nearby = live_readings.nearby(city_data["lat"], city_data["lon"], LIVE_RADIUS_KM, LIVE_MAX_AGE_S)
+
+    def compute():
+        state = snapshot_model_state()
+        pm25 = blend_live_readings(predict_pollution(city_data["lat"], city_data["lon"], state=state), nearby)
+        return build_pollution_data(city_data, pm25, state, nearby).model_dump()
+
+    # A new live reading nearby changes the key, so it is never served stale.
+    key = ("predict", city_data["display_name"], tuple((r.station, r.time) for r, _ in nearby))
+    return cached_json_response(request, key, CACHE_TTLS["predict"], compute)
+
+@app.get("/api/forecast/{city_name}", response_model=ForecastResponse)
+def get_forecast(city_name: str, request: Request, days: int = Query(default=7, ge=1, le=14)):
+    city_data = resolve_city(city_name)
+    if city_data is None:
+        raise HTTPException(status_code=404, detail=f"City '{city_name}' not found")
+
+    def compute():
+        state = snapshot_model_state()
+        lat, lon = city_data["lat"], city_data["lon"]
+        forecast = predict_forecast(lat, lon, days, state)
+
+        return ForecastResponse(
+            city=city_data["display_name"],
+            lat=lat,
+            lon=lon,
+            forecast=forecast,
+            model_version=state["version"]
+        ).model_dump()
+
+    key = ("forecast", city_data["display_name"], days, datetime.now().strftime("%Y-%m-%d"))
+    return cached_json_response(request, key, CACHE_TTLS["forecast"], compute)
+
+@app.get("/api/forecasts", response_model=List[ForecastResponse])
+def get_forecasts(cities: str, days: int = Query(default=7, ge=1, le=14)):
+    names = [name for name in cities.split(",") if name.strip()]
+    matched = [resolve_city(name) for name in names]
+
+    missing = [name for name, city_data in zip(names, matched) if city_data is None]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Cities not found: {', '.join(missing)}")
+
+    state = snapshot_model_state()
+    lats = [city_data["lat"] for city_data in matched]
+    lons = [city_data["lon"] for city_data in matched]
+    forecasts = predict_forecast_batch(lats, lons, days, state)
+
+    return [
+        ForecastResponse(
+            city=city_data["display_name"],
+            lat=city_data["lat"],
+            lon=city_data["lon"],
+            forecast=forecast,
+            model_version=state["version"]
+        )
+        for city_data, forecast in zip(matched, forecasts)
+    ]
 
 @app.get("/api/predict-coords")
 def get_prediction_by_coords(lat: float, lon: float):
-    if not (6.5 <= lat <= 37.5 and 68 <= lon <= 97.5):
+    if not (INDIA_BOUNDS["lat_min"] <= lat <= INDIA_BOUNDS["lat_max"] and
+            INDIA_BOUNDS["lon_min"] <= lon <= INDIA_BOUNDS["lon_max"]):
         raise HTTPException(status_code=400, detail="Coordinates outside India bounds")
 
-    pm25 = predict_pollution(lat, lon)
+    state = snapshot_model_state()
+    pm25 = predict_pollution(lat, lon, state=state)
     aqi_category, aqi_color = get_aqi_category(pm25)
     health_advice = get_health_advice(pm25)
 
@@ -431,9 +1028,147 @@ def get_prediction_by_coords(lat: float, lon: float):
         "pm25": round(pm25, 1),
         "aqi_category": aqi_category,
         "aqi_color": aqi_color,
-        "health_advice": health_advice
+        "health_advice": health_advice,
+        "nearest_city": next(iter(place_indexes["city"].nearest_places(lat, lon, 1)), None),
+        "model_version": state["version"]
     }
 
+def parse_batch_points(items: list) -> tuple[np.ndarray, np.ndarray, list]:
+    lats = np.empty(len(items))
+    lons = np.empty(len(items))
+    ids = []
+    for i, item in enumerate(items):
+        try:
+            lats[i] = float(item["lat"])
+            lons[i] = float(item["lon"])
+        except (TypeError, KeyError, ValueError):
+            raise HTTPException(status_code=400, detail=f"Point {i} must be an object with numeric 'lat' and 'lon'")
+        if not (math.isfinite(lats[i]) and math.isfinite(lons[i])):
+            raise HTTPException(status_code=400, detail=f"Point {i} must have finite 'lat' and 'lon'")
+        ids.append(item.get("id"))
+    return lats, lons, ids
+
+def decode_batch_points(body: bytes) -> tuple[np.ndarray, np.ndarray, list]:
+    try:
+        items = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array of points")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array of points")
+    if len(items) > MAX_BATCH_POINTS:
+        raise too_many_points()
+    return parse_batch_points(items)
+
+def check_coordinates(lat: float, lon: float):
+    if not (math.isfinite(lat) and math.isfinite(lon)):
+        raise HTTPException(status_code=400, detail="lat and lon must be finite numbers")
+
+def score_batch(lats: np.ndarray, lons: np.ndarray, ids: list) -> List[dict]:
+    in_bounds = ((lats >= INDIA_BOUNDS["lat_min"]) & (lats <= INDIA_BOUNDS["lat_max"]) &
+                 (lons >= INDIA_BOUNDS["lon_min"]) & (lons <= INDIA_BOUNDS["lon_max"]))
+
+    pm25 = np.full(len(lats), np.nan)
+    if in_bounds.any():
+        pm25[in_bounds] = predict_pollution_batch(lats[in_bounds], lons[in_bounds], state=snapshot_model_state())
+
+    results = []
+    for i in range(len(lats)):
+        result = {"lat": float(lats[i]), "lon": float(lons[i])}
+        if ids[i] is not None:
+            result["id"] = ids[i]
+
+        if in_bounds[i]:
+            value = float(pm25[i])
+            aqi_category, aqi_color = get_aqi_category(value)
+            result.update({
+                "pm25": round(value, 1),
+                "aqi_category": aqi_category,
+                "aqi_color": aqi_color,
+                "health_advice": get_health_advice(value)
+            })
+        else:
+            result["error"] = "Coordinates outside India bounds"
+
+        results.append(result)
+    return results
+
+def too_many_points() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"At most {MAX_BATCH_POINTS} points per request")
+
+async def read_ndjson_batches(request: Request):
+    # Yields parsed points BATCH_CHUNK_SIZE at a time as the body arrives.
+    buffer = b""
+    items = []
+    count = 0
+
+    def parse(lines):
+        nonlocal count
+        try:
+            parsed = [json.loads(line) for line in lines if line.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Each NDJSON line must be a JSON point object")
+        count += len(parsed)
+        if count > MAX_BATCH_POINTS:
+            raise too_many_points()
+        return parsed
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        items.extend(parse(lines))
+        while len(items) >= BATCH_CHUNK_SIZE:
+            batch, items = items[:BATCH_CHUNK_SIZE], items[BATCH_CHUNK_SIZE:]
+            yield batch
+
+    items.extend(parse([buffer]))
+    if items:
+        yield items
+
+class DuplexStreamingResponse(StreamingResponse):
+    # The body iterator reads the request while the response streams, so
+    # the disconnect listener Starlette runs for ASGI < 2.4 servers must not
+    # compete with it for receive(). A disconnect still surfaces from the
+    # request stream or from send(), as it does on ASGI 2.4 servers.
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+async def score_ndjson_batch(request: Request) -> StreamingResponse:
+    # Errors in the first chunk are plain 400/413 responses. Once results
+    # have been sent, an error ends the stream with an {"error": ...} line.
+    # A client that hangs up mid-stream just ends the response.
+    batches = read_ndjson_batches(request)
+    first = await anext(batches, None)
+    if first is not None:
+        first = await run_in_threadpool(parse_batch_points, first)
+
+    async def output():
+        batch = first
+        try:
+            while batch is not None:
+                results = await run_in_threadpool(score_batch, *batch)
+                yield "".join(json.dumps(r) + "\n" for r in results)
+                batch = await anext(batches, None)
+                if batch is not None:
+                    batch = await run_in_threadpool(parse_batch_points, batch)
+        except HTTPException as e:
+            yield json.dumps({"error": e.detail, "status": e.status_code}) + "\n"
+        except ClientDisconnect:
+            return
+
+    return DuplexStreamingResponse(output(), media_type="application/x-ndjson")
+
+@app.post("/api/predict-batch")
+async def get_prediction_batch(request: Request):
+    content_type = request.headers.get("content-type", "")
+
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        return await score_ndjson_batch(request)
+
+    # Decoding a large body takes as long as scoring it, so both run off the
+    # event loop.
+    body = await request.body()
+    return await run_in_threadpool(lambda: score_batch(*decode_batch_points(body)))
+
 class NLPQueryRequest(BaseModel):
     query: str
 
@@ -443,43 +1178,461 @@ class NLPQueryResponse(BaseModel):
     layer: Optional[str]
     message: str
     confidence: float
+    mentions: List[dict] = []
+    pollution: Optional[PollutionData] = None
+
+class NLPBatchRequest(BaseModel):
+    queries: List[str] = Field(max_length=NLP_BATCH_LIMIT)
+
+def answer_nlp_queries(queries: List[str]) -> List[NLPQueryResponse]:
+    parsed_queries = [parse_query(query) for query in queries]
+
+    # Every location mentioned in the batch is scored in one model call, so
+    # the assistant gets the current PM2.5 with the parsed intent.
+    locations = {p.location["name"]: p.location for p in parsed_queries if p.location}
+    readings = {}
+    if locations:
+        state = snapshot_model_state()
+        lats = np.array([location["lat"] for location in locations.values()])
+        lons = np.array([location["lon"] for location in locations.values()])
+        for location, value in zip(locations.values(), predict_pollution_batch(lats, lons, state=state).tolist()):
+            # Blended with live stations exactly as /api/predict does.
+            nearby = live_readings.nearby(location["lat"], location["lon"], LIVE_RADIUS_KM, LIVE_MAX_AGE_S)
+            place = {"display_name": location["name"], "lat": location["lat"], "lon": location["lon"]}
+            readings[location["name"]] = build_pollution_data(place, blend_live_readings(value, nearby), state, nearby)
+
+    return [
+        NLPQueryResponse(
+            intent=parsed.intent,
+            location=parsed.location,
+            layer=parsed.layer,
+            message=get_response_message(parsed),
+            confidence=parsed.confidence,
+            mentions=parsed.mentions,
+            pollution=readings.get(parsed.location["name"]) if parsed.location else None
+        )
+        for parsed in parsed_queries
+    ]
 
 @app.post("/api/nlp/query", response_model=NLPQueryResponse)
 def process_nlp_query(request: NLPQueryRequest):
-    from nlp_engine import parse_query, get_response_message
-    
-    parsed = parse_query(request.query)
-    message = get_response_message(parsed)
-    
-    return NLPQueryResponse(
-        intent=parsed.intent,
-        location=parsed.location,
-        layer=parsed.layer,
-        message=message,
-        confidence=parsed.confidence
-    )
+    return answer_nlp_queries([request.query])[0]
+
+@app.post("/api/nlp/batch", response_model=List[NLPQueryResponse])
+def process_nlp_batch(request: NLPBatchRequest):
+    return answer_nlp_queries(request.queries)
+
+@app.websocket("/ws/nlp")
+async def stream_nlp_queries(websocket: WebSocket):
+    await websocket.accept()
+    last_sent = OrderedDict()
+
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                payload = json.loads(message)
+            except ValueError:
+                payload = message
+            if isinstance(payload, str):
+                payload = {"text": payload}
+            if not isinstance(payload, dict) or not isinstance(payload.get("text"), str):
+                await websocket.send_json({"error": "Send a transcript string or an object with 'text', 'id' and 'final'"})
+                continue
+
+            stream_id = payload.get("id")
+            final = bool(payload.get("final", False))
+            response = (await run_in_threadpool(answer_nlp_queries, [payload["text"]]))[0]
+
+            # Partial hypotheses only produce a message when the parse changes.
+            signature = (response.intent, response.location and response.location["name"], response.layer)
+            if not final and last_sent.get(str(stream_id)) == signature:
+                continue
+            if final:
+                last_sent.pop(str(stream_id), None)
+            else:
+                last_sent[str(stream_id)] = signature
+                last_sent.move_to_end(str(stream_id))
+                # Streams that never sent a final message age out.
+                while len(last_sent) > NLP_STREAMS_PER_CONNECTION:
+                    last_sent.popitem(last=False)
+
+            await websocket.send_json({"id": stream_id, "final": final, **response.model_dump()})
+    except WebSocketDisconnect:
+        pass
+
+@app.get("/api/subscribe")
+async def subscribe_aqi(cities: str, request: Request):
+    names, missing = resolve_subscription(name for name in cities.split(",") if name.strip())
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Cities not found: {', '.join(missing)}")
+    if not names or len(names) > MAX_SUBSCRIBED_CITIES:
+        raise HTTPException(status_code=400, detail=f"Subscribe to between 1 and {MAX_SUBSCRIBED_CITIES} cities")
+
+    subscription = aqi_broadcaster.subscribe(names)
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                updates = await subscription.next(PUSH_HEARTBEAT)
+                if not updates:
+                    yield ": keep-alive\n\n"
+                for update in updates:
+                    yield f"event: aqi\ndata: {json.dumps(update)}\n\n"
+        finally:
+            aqi_broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/ws/aqi")
+async def stream_aqi(websocket: WebSocket):
+    # Clients send {"subscribe": [...]} or {"unsubscribe": [...]} at any time
+    # and receive {"type": "aqi", ...} whenever a subscribed city changes.
+    await websocket.accept()
+    subscription = aqi_broadcaster.subscribe(())
+
+    async def push():
+        while True:
+            for update in await subscription.next(PUSH_HEARTBEAT):
+                await websocket.send_json({"type": "aqi", **update})
+
+    pusher = asyncio.create_task(push())
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                message = None
+            if isinstance(message, dict):
+                message = {k: [v] if isinstance(v, str) else v for k, v in message.items()}
+            if (not isinstance(message, dict) or not any(k in message for k in ("subscribe", "unsubscribe")) or
+                    not all(isinstance(message.get(k) or [], list) for k in ("subscribe", "unsubscribe"))):
+                await websocket.send_json({"error": "Send {\"subscribe\": [cities]} or {\"unsubscribe\": [cities]}"})
+                continue
+
+            names, missing = resolve_subscription(message.get("subscribe") or [])
+            if missing:
+                await websocket.send_json({"error": f"Cities not found: {', '.join(missing)}"})
+            if len(subscription.cities | set(names)) > MAX_SUBSCRIBED_CITIES:
+                await websocket.send_json({"error": f"At most {MAX_SUBSCRIBED_CITIES} cities per connection"})
+                continue
+            aqi_broadcaster.add_cities(subscription, names)
+            aqi_broadcaster.remove_cities(subscription, resolve_subscription(message.get("unsubscribe") or [])[0])
+            await websocket.send_json({"type": "subscribed", "cities": sorted(subscription.cities)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        pusher.cancel()
+        aqi_broadcaster.unsubscribe(subscription)
+
+@app.get("/api/subscribe/stats")
+def get_subscription_stats():
+    return aqi_broadcaster.stats()
+
+class AlertRuleRequest(BaseModel):
+    subscriber: str = Field(min_length=1)
+    city: Optional[str] = None
+    polygon: Optional[List[List[float]]] = None  # ring of [lon, lat]
+    threshold: Optional[float] = None  # alert when PM2.5 rises above this
+    category: Optional[str] = None  # or when it enters this AQI category
+    hysteresis: float = Field(default=10.0, ge=0)
+    horizon_days: int = Field(default=0, ge=0, le=7)  # 0: current value, else forecast days ahead
+    sink: str = "file"
+    webhook_url: Optional[str] = None
+
+def build_alert_rule(request: AlertRuleRequest) -> AlertRule:
+    if (request.threshold is None) == (request.category is None):
+        raise HTTPException(status_code=400, detail="Give either a threshold or a category")
+    threshold = request.threshold
+    if request.category is not None:
+        bands = {band["aqi_category"].lower(): band for band in get_aqi_bands()}
+        band = bands.get(request.category.strip().lower())
+        if band is None:
+            raise HTTPException(status_code=400, detail=f"Unknown category; use one of: {', '.join(b['aqi_category'] for b in bands.values())}")
+        threshold = band["pm25_min"]
+
+    city = None
+    if request.city is not None:
+        city_data = resolve_city(request.city)
+        if city_data is None:
+            raise HTTPException(status_code=404, detail=f"City '{request.city}' not found")
+        city = city_data["display_name"]
+    if request.polygon is not None and (len(request.polygon) < 3 or any(len(p) != 2 for p in request.polygon)):
+        raise HTTPException(status_code=400, detail="polygon must be at least three [lon, lat] points")
+
+    return AlertRule(subscriber=request.subscriber, threshold=threshold, hysteresis=request.hysteresis,
+                     horizon_days=request.horizon_days, city=city, polygon=request.polygon,
+                     sink=request.sink, webhook_url=request.webhook_url)
+
+@app.post("/api/alerts/rules")
+def create_alert_rule(request: AlertRuleRequest):
+    # Runs in the threadpool: adding a rule appends to the rules log.
+    try:
+        rule, alerts = alert_engine.add_rule(build_alert_rule(request))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if alerts:
+        alert_engine.deliver(alerts)
+    return {**rule.to_dict(), "alerts": alerts}
+
+@app.get("/api/alerts/rules")
+def get_alert_rules(subscriber: str):
+    return [rule.to_dict() for rule in alert_engine.rules_for(subscriber)]
+
+@app.delete("/api/alerts/rules/{rule_id}")
+def delete_alert_rule(rule_id: int):
+    if not alert_engine.remove_rule(rule_id):
+        raise HTTPException(status_code=404, detail=f"Alert rule {rule_id} not found")
+    return {"deleted": rule_id}
+
+@app.get("/api/alerts/stats")
+def get_alert_stats():
+    return alert_engine.stats()
 
 @app.get("/api/layers")
 def get_layers():
-    from geospatial_data import get_available_layers
     return get_available_layers()
 
+def parse_bbox(bbox: str) -> tuple:
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be 'min_lon,min_lat,max_lon,max_lat'")
+    if not all(math.isfinite(v) for v in (min_lon, min_lat, max_lon, max_lat)):
+        raise HTTPException(status_code=400, detail="bbox values must be finite numbers")
+    if min_lon > max_lon or min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="bbox minimums must not exceed its maximums")
+    return min_lon, min_lat, max_lon, max_lat
+
+def get_pollution_layer(request: Request, layer_info: dict, city: Optional[str], bbox: Optional[tuple],
+                        format: str) -> Response:
+    if bbox is None:
+        bbox = city_bbox(city) if city else INDIA_BBOX
+    bbox = clip_to_india(bbox)
+    if bbox is None:
+        raise HTTPException(status_code=400, detail="bbox does not overlap India")
+
+    state = snapshot_model_state()
+    today = datetime.now()
+    key = ("pollution", bbox, format, get_heatmap_version(state, today))
+
+    if format == "grid":
+        lats, lons, step = get_heatmap_axes(bbox)
+        # Cell centres of the first and last rows and columns; see encode_grid.
+        headers = {
+            "X-Grid-Shape": f"{len(lats)},{len(lons)}",
+            "X-Grid-Bbox": f"{lons[0]},{lats[0]},{lons[-1]},{lats[-1]}",
+            "X-Grid-Step": str(round(step, 6)),
+            "Access-Control-Expose-Headers": "X-Grid-Shape, X-Grid-Bbox, X-Grid-Step, ETag"
+        }
+        entry = layer_store.get_or_build(
+            key, lambda: encode_grid(evaluate_heatmap(lats, lons, today, state)),
+            "application/octet-stream", headers
+        )
+    else:
+        def compute():
+            return {
+                "layer": layer_info,
+                "data": {
+                    "type": "FeatureCollection",
+                    "features": build_heatmap_features(bbox, today, state)
+                }
+            }
+
+        entry = layer_store.get_or_build(key, compute)
+    return stored_layer_response(request, entry)
+
 @app.get("/api/layers/{layer_id}")
-def get_layer_data(layer_id: str, city: Optional[str] = None):
-    from geospatial_data import get_layer_data as fetch_layer, get_layer_info
-    
+def get_layer_data(layer_id: str, request: Request, city: Optional[str] = None,
+                   lat: Optional[float] = None, lon: Optional[float] = None,
+                   bbox: Optional[str] = None,
+                   format: str = Query(default="geojson", pattern="^(geojson|grid)$")):
     layer_info = get_layer_info(layer_id)
     if not layer_info:
         raise HTTPException(status_code=404, detail=f"Layer '{layer_id}' not found")
     
-    geojson = fetch_layer(layer_id, city)
-    
+    if bbox is not None:
+        bbox = parse_bbox(bbox)
+    elif city is None and lat is not None and lon is not None:
+        check_coordinates(lat, lon)
+        nearest = place_indexes["city"].nearest_places(lat, lon, 1)
+        city = nearest[0]["name"] if nearest else None
+
+    if layer_id == "pollution":
+        return get_pollution_layer(request, layer_info, city, bbox, format)
+    if format == "grid":
+        raise HTTPException(status_code=400, detail="Only the pollution layer is available as a grid")
+
+    def compute():
+        geojson = fetch_layer(layer_id, city, bbox)
+
+        return {
+            "layer": layer_info,
+            "data": geojson
+        }
+
+    # File-backed layers carry their file version so edits are picked up.
+    key = (layer_id, city, bbox, layer_provider.version(layer_id))
+    return stored_layer_response(request, layer_store.get_or_build(key, compute))
+
+def get_layer_version(layer_id: str) -> Optional[str]:
+    if layer_id == "pollution":
+        return get_heatmap_version(snapshot_model_state(), datetime.now())
+    return layer_provider.version(layer_id)
+
+def get_tile_index(layer_id: str):
+    version = get_layer_version(layer_id)
+    index = tile_indexes.get(layer_id)
+    if index is not None and (version is None or index.version == version):
+        return index
+
+    with tile_index_lock:
+        index = tile_indexes.get(layer_id)
+        if index is not None and (version is None or index.version == version):
+            return index
+
+        if layer_id == "pollution":
+            # One polygon per band rectangle, so each tile only clips its own.
+            index = TileIndex(layer_id, build_heatmap_features(INDIA_BBOX, merge=False), version)
+        elif version is not None:
+            index = QueryTileIndex(
+                layer_id, version,
+                lambda bbox, min_size: layer_provider.query(layer_id, bbox, MAX_TILE_FEATURES, min_size)["features"]
+            )
+        else:
+            index = TileIndex(layer_id, get_layer_features(layer_id))
+        tile_cache.prune(index)
+        tile_indexes[layer_id] = index
+    return index
+
+@app.get("/api/tiles/{layer_id}/{z}/{x}/{y}.mvt")
+def get_vector_tile(layer_id: str, z: int, x: int, y: int, request: Request):
+    if not get_layer_info(layer_id):
+        raise HTTPException(status_code=404, detail=f"Layer '{layer_id}' not found")
+    if not (0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail=f"Tile {z}/{x}/{y} is outside the tile pyramid")
+
+    index = get_tile_index(layer_id)
+    headers = {
+        "ETag": f'"{index.version}-{z}-{x}-{y}"',
+        "Cache-Control": f"public, max-age={CACHE_TTLS['layer']}"
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    tile = tile_cache.get_or_render(index, z, x, y)
+    if not tile:
+        return Response(status_code=204, headers=headers)
+    return Response(content=tile, media_type=MVT_MEDIA_TYPE, headers=headers)
+
+@app.get("/api/places/nearest")
+def get_nearest_places(lat: float, lon: float, k: int = Query(default=1, ge=1, le=50),
+                       kind: str = Query(default="city", pattern="^(city|station|all)$")):
+    check_coordinates(lat, lon)
+    return place_indexes[kind].nearest_places(lat, lon, k)
+
+def nearest_places_batch(body: bytes, k: int, kind: str) -> List[List[dict]]:
+    lats, lons, _ = decode_batch_points(body)
+    index = place_indexes[kind]
+    dist, idx = index.nearest(lats, lons, k)
+
+    return [
+        [{**index.places[i], "distance_km": round(d, 3)} for d, i in zip(row_dist, row_idx)]
+        for row_dist, row_idx in zip(dist.tolist(), idx.tolist())
+    ]
+
+@app.post("/api/places/nearest")
+async def get_nearest_places_batch(request: Request, k: int = Query(default=1, ge=1, le=50),
+                                   kind: str = Query(default="city", pattern="^(city|station|all)$")):
+    # Decoding and the tree query run off the event loop, as for predict-batch.
+    return await run_in_threadpool(nearest_places_batch, await request.body(), k, kind)
+
+@app.get("/api/places/within")
+def get_places_within(lat: float, lon: float, radius_km: float = Query(default=25, gt=0, le=500),
+                      kind: str = Query(default="station", pattern="^(city|station|all)$")):
+    check_coordinates(lat, lon)
+    return place_indexes[kind].places_within(lat, lon, radius_km)
+
+def parse_history_time(value: str, end_of_day: bool = False) -> datetime:
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"'{value}' is not an ISO date or datetime")
+    # The store keeps naive local times; an explicit offset is converted to them.
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    # A bare date as the end of a range covers that whole day.
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1, seconds=-1)
+    return parsed
+
+@app.get("/api/history/{city_name}")
+def get_history(city_name: str, from_: Optional[str] = Query(default=None, alias="from"),
+                to: Optional[str] = None, agg: str = Query(default="hourly", pattern="^(hourly|daily)$")):
+    city_data = resolve_city(city_name)
+    if city_data is None:
+        raise HTTPException(status_code=404, detail=f"City '{city_name}' not found")
+    city = history_store.city_at(city_data["lat"], city_data["lon"])
+
+    end = parse_history_time(to, end_of_day=True) if to else datetime.now()
+    start = parse_history_time(from_) if from_ else end - timedelta(days=HISTORY_DEFAULT_DAYS)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if (end - start).days > HISTORY_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"History ranges are limited to {HISTORY_MAX_DAYS} days")
+
     return {
-        "layer": layer_info,
-        "data": geojson
+        "city": city_data["display_name"],
+        "agg": agg,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "stations": history_store.city_stations(city) if city else 0,
+        "points": history_store.query(city, start, end, agg) if city else []
     }
 
+@app.get("/api/cache/stats")
+def get_cache_stats():
+    return {**response_cache.stats(), "layers": layer_store.stats(), "history": history_store.stats()}
+
+@app.get("/api/live/stats")
+def get_live_stats():
+    return live_service.stats()
+
+@app.get("/api/startup")
+def get_startup_report():
+    return warmup_report
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    import sys
+
+    if sys.argv[1:2] == ["train"]:
+        version = train_and_save()
+        if version is None:
+            sys.exit("Training failed: scikit-learn/xarray missing or no CPCB ground data found")
+        print(f"Saved model artifact {version} to {MODEL_DIR}")
+    elif sys.argv[1:2] == ["import-report"]:
+        print_import_report("main")
+    elif sys.argv[1:2] == ["ingest-history"]:
+        # python main.py ingest-history FILE.csv [...]: backfill snapshots;
+        # rows use their timestamp column, or the file's mtime without one.
+        for path in sys.argv[2:] or [CPCB_FILE]:
+            print(f"{path}: {history_store.append_csv(path)} readings added")
+    elif sys.argv[1:2] == ["stub-feed"]:
+        # python main.py stub-feed [PORT] [STATIONS]: a local feed to point
+        # AQ_LIVE_FEEDS at, e.g. http://127.0.0.1:8099/feed.ndjson
+        import uvicorn
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else 8099
+        n_stations = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+        centers = [(c["lat"], c["lon"]) for c in UNIQUE_CITIES]
+        uvicorn.run(create_stub_feed_app(n_stations, bounds=INDIA_BOUNDS, centers=centers), host="127.0.0.1", port=port)
+    elif sys.argv[1:2] == ["webhook-stub"]:
+        # python main.py webhook-stub [PORT]: receives alerts for
+        # AQ_ALERT_WEBHOOK=http://127.0.0.1:8098/alerts
+        import uvicorn
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else 8098
+        uvicorn.run(create_webhook_stub_app(), host="127.0.0.1", port=port)
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=8000)
 
@@ -0,0 +1,110 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import os
+
+
+AGGREGATION_WINDOWS = ("daily", "weekly", "seasonal", "all")
+
+SEASONS = {
+    12: "DJF", 1: "DJF", 2: "DJF",
+    3: "MAM", 4: "MAM", 5: "MAM",
+    6: "JJA", 7: "JJA", 8: "JJA",
+    9: "SON", 10: "SON", 11: "SON",
+}
+
+# Keep one MERRA-2 cell (0.5 x 0.625 degrees) of margin around the bounds so
+# nearest-neighbour lookups at the border still find their true neighbour.
+BOUNDS_MARGIN = 1.0
+
+TIME_CHUNK = 24
+
+
+def find_granules(directory: str) -> List[str]:
+    granules = []
+    for root, dirs, files in os.walk(directory):
+        for f in files:
+            if f.endswith('.nc4'):
+                granules.append(os.path.join(root, f))
+    return sorted(granules)
+
+
+def _readable_granules(paths: List[str]) -> List[str]:
+    import xarray as xr
+
+    readable = []
+    for path in paths:
+        try:
+            xr.open_dataset(path).close()
+            readable.append(path)
+        except Exception:
+            print(f"Skipping unreadable MERRA-2 granule {path}")
+    return readable
+
+
+def _subset(ds, bounds: Dict[str, float], variables: List[str]):
+    return ds[variables].sel(
+        lat=slice(bounds["lat_min"] - BOUNDS_MARGIN, bounds["lat_max"] + BOUNDS_MARGIN),
+        lon=slice(bounds["lon_min"] - BOUNDS_MARGIN, bounds["lon_max"] + BOUNDS_MARGIN),
+    )
+
+
+def open_merra2(directory: str, bounds: Dict[str, float], max_vars: int = 10) -> Tuple[Optional[object], List[str]]:
+    import xarray as xr
+
+    granules = _readable_granules(find_granules(directory))
+    if not granules:
+        return None, []
+
+    with xr.open_dataset(granules[0]) as first:
+        variables = list(first.data_vars)[:max_vars]
+
+    try:
+        import dask  # noqa: F401
+    except ImportError:
+        # Without dask each granule is cut down to the bounding box before
+        # it is loaded, which keeps memory proportional to the region only.
+        parts = []
+        for path in granules:
+            with xr.open_dataset(path) as ds:
+                parts.append(_subset(ds, bounds, variables).load())
+        return xr.concat(parts, dim='time').sortby('time'), variables
+
+    ds = xr.open_mfdataset(
+        granules,
+        combine='by_coords',
+        chunks={'time': TIME_CHUNK},
+        data_vars='minimal',
+        coords='minimal',
+        compat='override',
+        parallel=True,
+    )
+    return _subset(ds, bounds, variables), variables
+
+
+def aggregate_merra2(ds, window: str):
+    if window == "daily":
+        return ds.resample(time='1D').mean()
+    elif window == "weekly":
+        return ds.resample(time='7D').mean()
+    elif window == "seasonal":
+        return ds.groupby('time.season').mean('time')
+    elif window == "all":
+        return ds.mean('time')
+    raise ValueError(f"Unknown MERRA-2 aggregation window '{window}', expected one of {AGGREGATION_WINDOWS}")
+
+
+def merra2_feature_mean(ds, window: str = "daily", date: datetime = None):
+    if window == "seasonal":
+        season = SEASONS[(date or datetime.now()).month]
+        seasonal = aggregate_merra2(ds, "seasonal")
+        if season in seasonal['season'].values:
+            reduced = seasonal.sel(season=season, drop=True)
+        else:
+            reduced = aggregate_merra2(ds, "all")
+    elif window in ("daily", "weekly"):
+        # Most recent period; only that slice of the lazy resample is computed.
+        reduced = aggregate_merra2(ds, window).isel(time=-1, drop=True)
+    else:
+        reduced = aggregate_merra2(ds, window)
+
+    return reduced.compute()
@@ -0,0 +1,69 @@
+from typing import Callable, Dict, List, Tuple
+import os
+import threading
+import traceback
+
+
+def file_signature(paths: List[str]) -> Dict[str, Tuple[float, int]]:
+    signature = {}
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                for f in files:
+                    if f.endswith('.nc4'):
+                        full_path = os.path.join(root, f)
+                        stat = os.stat(full_path)
+                        signature[full_path] = (stat.st_mtime, stat.st_size)
+        elif os.path.exists(path):
+            stat = os.stat(path)
+            signature[path] = (stat.st_mtime, stat.st_size)
+    return signature
+
+
+class ModelRefresher:
+    def __init__(self, paths: List[str], reload: Callable[[List[str]], None], interval: float = 60):
+        self.paths = paths
+        self.reload = reload
+        self.interval = interval
+        self._signature = file_signature(paths)
+        self._pending = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="model-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                traceback.print_exc()
+
+    def check(self) -> bool:
+        signature = file_signature(self.paths)
+        if signature == self._signature:
+            self._pending = None
+            return False
+
+        # Wait for one quiet interval so half-written files are not picked up.
+        if signature != self._pending:
+            self._pending = signature
+            return False
+
+        changed = sorted(
+            path for path in set(signature) | set(self._signature)
+            if signature.get(path) != self._signature.get(path)
+        )
+        self.reload(changed)
+        self._signature = signature
+        self._pending = None
+        return True
@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+MANIFEST_FILE = "manifest.json"
+LATEST_FILE = "LATEST"
+
+
+def save_model_artifact(model_dir: str, model, feature_cols: List[str], merra_vars: List[str],
+                        X: np.ndarray, y: np.ndarray, daily_mean=None, stations: List[str] = None) -> str:
+    import joblib
+    import sklearn
+
+    digest = hashlib.sha1(np.ascontiguousarray(X).tobytes() + np.ascontiguousarray(y).tobytes()).hexdigest()[:8]
+    version = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{digest}"
+    version_dir = os.path.join(model_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    joblib.dump(model, os.path.join(version_dir, "model.joblib"))
+    np.save(os.path.join(version_dir, "features.npy"), np.asarray(X, dtype=np.float64))
+    np.save(os.path.join(version_dir, "target.npy"), np.asarray(y, dtype=np.float64))
+    if daily_mean is not None:
+        daily_mean.to_netcdf(os.path.join(version_dir, "merra2_daily_mean.nc"))
+
+    manifest = {
+        "version": version,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "feature_cols": list(feature_cols),
+        "merra_vars": list(merra_vars),
+        "n_samples": int(len(y)),
+        "has_daily_mean": daily_mean is not None,
+        "stations": stations,
+        "sklearn_version": sklearn.__version__,
+    }
+    with open(os.path.join(version_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Publish the new version only once every file is on disk.
+    latest_tmp = os.path.join(model_dir, LATEST_FILE + ".tmp")
+    with open(latest_tmp, "w") as f:
+        f.write(version)
+    os.replace(latest_tmp, os.path.join(model_dir, LATEST_FILE))
+
+    return version
+
+
+def get_latest_version(model_dir: str) -> Optional[str]:
+    try:
+        with open(os.path.join(model_dir, LATEST_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_model_artifact(model_dir: str, version: str = None) -> Optional[Dict[str, Any]]:
+    version = version or get_latest_version(model_dir)
+    if version is None:
+        return None
+
+    version_dir = os.path.join(model_dir, version)
+    try:
+        with open(os.path.join(version_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    import joblib
+
+    daily_mean = None
+    if manifest["has_daily_mean"]:
+        import xarray as xr
+        with xr.open_dataset(os.path.join(version_dir, "merra2_daily_mean.nc")) as ds:
+            daily_mean = ds.load()
+
+    return {
+        "version": manifest["version"],
+        "model": joblib.load(os.path.join(version_dir, "model.joblib"), mmap_mode="r"),
+        "feature_cols": manifest["feature_cols"],
+        "merra_vars": manifest["merra_vars"],
+        "daily_mean": daily_mean,
+        "features": np.load(os.path.join(version_dir, "features.npy"), mmap_mode="r"),
+        "target": np.load(os.path.join(version_dir, "target.npy"), mmap_mode="r"),
+        "stations": manifest.get("stations"),
+    }
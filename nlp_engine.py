@@ -1,57 +1,11 @@
-from dataclasses import dataclass
-from typing import Optional, List, Dict, Any
+from collections import deque
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Tuple
 import re
 
+from gazetteer import GAZETTEER
 
-LOCATION_ALIASES = {
-    "vizag": {"name": "Visakhapatnam", "lat": 17.6868, "lon": 83.2185},
-    "visakhapatnam": {"name": "Visakhapatnam", "lat": 17.6868, "lon": 83.2185},
-    "delhi": {"name": "Delhi", "lat": 28.6139, "lon": 77.2090},
-    "new delhi": {"name": "Delhi", "lat": 28.6139, "lon": 77.2090},
-    "mumbai": {"name": "Mumbai", "lat": 19.0760, "lon": 72.8777},
-    "bombay": {"name": "Mumbai", "lat": 19.0760, "lon": 72.8777},
-    "kolkata": {"name": "Kolkata", "lat": 22.5726, "lon": 88.3639},
-    "calcutta": {"name": "Kolkata", "lat": 22.5726, "lon": 88.3639},
-    "chennai": {"name": "Chennai", "lat": 13.0827, "lon": 80.2707},
-    "madras": {"name": "Chennai", "lat": 13.0827, "lon": 80.2707},
-    "bengaluru": {"name": "Bengaluru", "lat": 12.9716, "lon": 77.5946},
-    "bangalore": {"name": "Bengaluru", "lat": 12.9716, "lon": 77.5946},
-    "hyderabad": {"name": "Hyderabad", "lat": 17.3850, "lon": 78.4867},
-    "ahmedabad": {"name": "Ahmedabad", "lat": 23.0225, "lon": 72.5714},
-    "pune": {"name": "Pune", "lat": 18.5204, "lon": 73.8567},
-    "jaipur": {"name": "Jaipur", "lat": 26.9124, "lon": 75.7873},
-    "lucknow": {"name": "Lucknow", "lat": 26.8467, "lon": 80.9462},
-    "kanpur": {"name": "Kanpur", "lat": 26.4499, "lon": 80.3319},
-    "nagpur": {"name": "Nagpur", "lat": 21.1458, "lon": 79.0882},
-    "patna": {"name": "Patna", "lat": 25.5941, "lon": 85.1376},
-    "indore": {"name": "Indore", "lat": 22.7196, "lon": 75.8577},
-    "bhopal": {"name": "Bhopal", "lat": 23.2599, "lon": 77.4126},
-    "surat": {"name": "Surat", "lat": 21.1702, "lon": 72.8311},
-    "varanasi": {"name": "Varanasi", "lat": 25.3176, "lon": 82.9739},
-    "agra": {"name": "Agra", "lat": 27.1767, "lon": 78.0081},
-    "goa": {"name": "Goa", "lat": 15.2993, "lon": 74.1240},
-    "kochi": {"name": "Kochi", "lat": 9.9312, "lon": 76.2673},
-    "cochin": {"name": "Kochi", "lat": 9.9312, "lon": 76.2673},
-    "thiruvananthapuram": {"name": "Thiruvananthapuram", "lat": 8.5241, "lon": 76.9366},
-    "trivandrum": {"name": "Thiruvananthapuram", "lat": 8.5241, "lon": 76.9366},
-    "guwahati": {"name": "Guwahati", "lat": 26.1445, "lon": 91.7362},
-    "chandigarh": {"name": "Chandigarh", "lat": 30.7333, "lon": 76.7794},
-    "shimla": {"name": "Shimla", "lat": 31.1048, "lon": 77.1734},
-    "dehradun": {"name": "Dehradun", "lat": 30.3165, "lon": 78.0322},
-    "srinagar": {"name": "Srinagar", "lat": 34.0837, "lon": 74.7973},
-    "amritsar": {"name": "Amritsar", "lat": 31.6340, "lon": 74.8723},
-    "ranchi": {"name": "Ranchi", "lat": 23.3441, "lon": 85.3096},
-    "bhubaneswar": {"name": "Bhubaneswar", "lat": 20.2961, "lon": 85.8245},
-    "raipur": {"name": "Raipur", "lat": 21.2514, "lon": 81.6296},
-    "coimbatore": {"name": "Coimbatore", "lat": 11.0168, "lon": 76.9558},
-    "mysore": {"name": "Mysuru", "lat": 12.2958, "lon": 76.6394},
-    "mysuru": {"name": "Mysuru", "lat": 12.2958, "lon": 76.6394},
-    "noida": {"name": "Noida", "lat": 28.5355, "lon": 77.3910},
-    "gurgaon": {"name": "Gurugram", "lat": 28.4595, "lon": 77.0266},
-    "gurugram": {"name": "Gurugram", "lat": 28.4595, "lon": 77.0266},
-    "faridabad": {"name": "Faridabad", "lat": 28.4089, "lon": 77.3178},
-    "ghaziabad": {"name": "Ghaziabad", "lat": 28.6692, "lon": 77.4538},
-}
 
 LAYER_KEYWORDS = {
     "flood": ["flood", "flooding", "flood risk", "flood zone", "inundation", "water level"],
@@ -84,6 +38,24 @@ INTENT_PATTERNS = {
     "reset": [r"reset", r"clear", r"start over", r"default view"],
 }
 
+PARSE_CACHE_SIZE = 4096
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+|\S")
+
+
+def compile_intent_grammar(intent_patterns: Dict[str, List[str]]) -> List[Tuple[str, re.Pattern]]:
+    # Kept as an ordered list rather than one big alternation: a single
+    # regex can only keep the priority order behind a lazy ".*?" prefix,
+    # which stops re from scanning ahead for each pattern's literal prefix.
+    return [
+        (intent_name, re.compile(pattern))
+        for intent_name, patterns in intent_patterns.items()
+        for pattern in patterns
+    ]
+
+
+INTENT_GRAMMAR = compile_intent_grammar(INTENT_PATTERNS)
+
 
 @dataclass
 class ParsedQuery:
@@ -92,67 +64,193 @@ class ParsedQuery:
     layer: Optional[str]
     raw_query: str
     confidence: float
+    mentions: List[Dict[str, Any]] = field(default_factory=list)
+
+
+@dataclass
+class Mention:
+    kind: str
+    value: Any
+    text: str
+    start: int
+    end: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "value": self.value["name"] if self.kind == "location" else self.value,
+            "text": self.text,
+            "start": self.start,
+            "end": self.end,
+        }
+
+
+class KeywordAutomaton:
+    # Aho-Corasick over word tokens rather than characters: keywords only
+    # ever match whole words, so "pune" never matches inside a longer word,
+    # and the automaton takes one step per word of the query.
+    def __init__(self, keywords: Dict[str, Tuple[str, Any]]):
+        self.keywords = list(keywords.items())
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.outputs: List[List[Tuple[int, int]]] = [[]]
+
+        for keyword_id, (keyword, _) in enumerate(self.keywords):
+            words = TOKEN_PATTERN.findall(keyword)
+            state = 0
+            for word in words:
+                if word not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                    self.goto[state][word] = len(self.goto) - 1
+                state = self.goto[state][word]
+            self.outputs[state].append((keyword_id, len(words)))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and word not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(word, 0)
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+
+    def find_all(self, text: str) -> List[Mention]:
+        # Tokens are lowered one by one, so spans stay offsets into text
+        # even where lower() changes a length ("İ" lowers to two characters).
+        tokens = list(TOKEN_PATTERN.finditer(text))
+        mentions = []
+        state = 0
+
+        for i, token in enumerate(tokens):
+            word = token.group().lower()
+            while state and word not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(word, 0)
+
+            for keyword_id, n_words in self.outputs[state]:
+                kind, value = self.keywords[keyword_id][1]
+                start, end = tokens[i - n_words + 1].start(), token.end()
+                mentions.append(Mention(kind, value, text[start:end], start, end))
+
+        return mentions
+
+    def find(self, text: str) -> List[Mention]:
+        selected = []
+        last_end = 0
+        for mention in sorted(self.find_all(text), key=lambda m: (m.start, m.start - m.end)):
+            if mention.start >= last_end:
+                selected.append(mention)
+                last_end = mention.end
+        return selected
+
+
+def build_mention_automaton() -> KeywordAutomaton:
+    keywords = {}
+    for layer_id, layer_keywords in LAYER_KEYWORDS.items():
+        for keyword in layer_keywords:
+            keywords.setdefault(keyword, ("layer", layer_id))
+    # Every gazetteer name, aliases included, so NLP finds the same places
+    # /api/predict resolves and reports them under the same display name.
+    for key, entry in GAZETTEER.entries.items():
+        location = {"name": entry["display_name"], "lat": entry["lat"], "lon": entry["lon"]}
+        keywords.setdefault(key, ("location", location))
+    return KeywordAutomaton(keywords)
+
+
+MENTION_AUTOMATON = build_mention_automaton()
+
+
+def find_mentions(text: str) -> List[Mention]:
+    return MENTION_AUTOMATON.find(text)
 
 
 def extract_location(text: str) -> Optional[Dict[str, Any]]:
-    text_lower = text.lower().strip()
-    
-    for alias, data in LOCATION_ALIASES.items():
-        if alias in text_lower:
-            return data
-    
+    for mention in find_mentions(text):
+        if mention.kind == "location":
+            return mention.value
     return None
 
 
 def extract_layer(text: str) -> Optional[str]:
-    text_lower = text.lower()
-    
-    for layer_id, keywords in LAYER_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in text_lower:
-                return layer_id
-    
+    for mention in find_mentions(text):
+        if mention.kind == "layer":
+            return mention.value
+    return None
+
+
+def first_mention(mentions: List[Mention], kind: str) -> Any:
+    for mention in mentions:
+        if mention.kind == kind:
+            return mention.value
     return None
 
 
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def map_mentions_to_query(mentions: List[Dict[str, Any]], query: str) -> List[Dict[str, Any]]:
+    # Spans from the normalized query are shifted back onto the raw query so
+    # clients can highlight the text the user typed. raw_index[i] is the raw
+    # character that normalized character i came from; collapsed whitespace
+    # and characters that lower() expands both shift the offsets.
+    raw_index = []
+    for word in re.finditer(r"\S+", query):
+        if raw_index:
+            raw_index.append(word.start() - 1)
+        for position in range(word.start(), word.end()):
+            raw_index.extend([position] * len(query[position].lower()))
+
+    mapped = []
+    for mention in mentions:
+        start, end = raw_index[mention["start"]], raw_index[mention["end"] - 1] + 1
+        mapped.append({**mention, "text": query[start:end], "start": start, "end": end})
+    return mapped
+
+
 def parse_query(query: str) -> ParsedQuery:
-    query_lower = query.lower().strip()
-    
-    for intent_name, patterns in INTENT_PATTERNS.items():
-        for pattern in patterns:
-            match = re.search(pattern, query_lower)
-            if match:
-                location = extract_location(query)
-                layer = extract_layer(query)
-                
-                if intent_name == "navigate" and not location:
-                    groups = match.groups()
-                    if groups:
-                        location = extract_location(groups[0])
-                
-                if intent_name == "show_layer":
-                    groups = match.groups()
-                    if groups:
-                        if not layer and groups[0]:
-                            layer = extract_layer(groups[0])
-                        if not location and len(groups) > 1 and groups[1]:
-                            location = extract_location(groups[1])
-                
-                if not layer and ("pollution" in query_lower or "air" in query_lower or "pm" in query_lower):
-                    layer = "pollution"
-                
-                confidence = 0.9 if (location or layer) else 0.6
-                
-                return ParsedQuery(
-                    intent=intent_name,
-                    location=location,
-                    layer=layer,
-                    raw_query=query,
-                    confidence=confidence
-                )
-    
-    location = extract_location(query)
-    layer = extract_layer(query)
+    normalized = normalize_query(query)
+    parsed = parse_normalized_query(normalized)
+
+    mentions = parsed.mentions
+    if not mentions or query == normalized:
+        mentions = list(mentions)
+    elif len(query) == len(normalized) == len(query.lower()):
+        # Only case (or the kind of whitespace) differs; offsets line up.
+        mentions = [{**m, "text": query[m["start"]:m["end"]]} for m in mentions]
+    else:
+        mentions = map_mentions_to_query(mentions, query)
+    return replace(parsed, raw_query=query, mentions=mentions)
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_normalized_query(query: str) -> ParsedQuery:
+    # One automaton pass over the whole query. Any mention inside a regex
+    # group is also a mention of the full query, so groups need no rescan.
+    mentions = find_mentions(query)
+    location = first_mention(mentions, "location")
+    layer = first_mention(mentions, "layer")
+    mention_spans = [m.to_dict() for m in mentions]
+
+    for intent_name, pattern in INTENT_GRAMMAR:
+        if pattern.search(query):
+            if not layer and ("pollution" in query or "air" in query or "pm" in query):
+                layer = "pollution"
+            
+            confidence = 0.9 if (location or layer) else 0.6
+            
+            return ParsedQuery(
+                intent=intent_name,
+                location=location,
+                layer=layer,
+                raw_query=query,
+                confidence=confidence,
+                mentions=mention_spans
+            )
     
     if location or layer:
         return ParsedQuery(
@@ -160,7 +258,8 @@ def parse_query(query: str) -> ParsedQuery:
             location=location,
             layer=layer,
             raw_query=query,
-            confidence=0.7
+            confidence=0.7,
+            mentions=mention_spans
         )
     
     return ParsedQuery(
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable
+import hashlib
+import json
+import threading
+import time
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    expires_at: float
+
+    def max_age(self) -> int:
+        return max(0, int(self.expires_at - time.time()))
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int = 2048):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, key: Hashable, counter: str):
+        namespace = key[0] if isinstance(key, tuple) else str(key)
+        counters = self._counters.setdefault(namespace, {"hits": 0, "misses": 0, "evictions": 0})
+        counters[counter] += 1
+
+    def get(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self._count(key, "misses")
+                return None
+
+            self._entries.move_to_end(key)
+            self._count(key, "hits")
+            return entry
+
+    def set(self, key: Hashable, payload: Any, ttl: float) -> CachedResponse:
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        entry = CachedResponse(
+            body=body,
+            etag='"' + hashlib.sha1(body).hexdigest() + '"',
+            expires_at=time.time() + ttl
+        )
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                evicted, _ = self._entries.popitem(last=False)
+                self._count(evicted, "evictions")
+        return entry
+
+    def get_or_compute(self, key: Hashable, ttl: float, compute: Callable[[], Any]) -> CachedResponse:
+        entry = self.get(key)
+        if entry is None:
+            entry = self.set(key, compute(), ttl)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "endpoints": {name: dict(counters) for name, counters in self._counters.items()}
+            }
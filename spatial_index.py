@@ -0,0 +1,175 @@
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def unit_vectors(lats, lons) -> np.ndarray:
+    lats, lons = np.radians(lats), np.radians(lons)
+    return np.column_stack([np.cos(lats) * np.cos(lons), np.cos(lats) * np.sin(lons), np.sin(lats)])
+
+
+class SpatialIndex:
+    def __init__(self, places: List[Dict[str, Any]]):
+        self.places = places
+        self.lats = np.array([p["lat"] for p in places], dtype=float)
+        self.lons = np.array([p["lon"] for p in places], dtype=float)
+        self._tree = None
+        self._kdtree = None
+
+        if places:
+            try:
+                from sklearn.neighbors import BallTree
+                self._tree = BallTree(np.radians(np.column_stack([self.lats, self.lons])), metric='haversine')
+            except ImportError:
+                pass
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def _query_points(self, lats, lons) -> np.ndarray:
+        return np.radians(np.column_stack([np.atleast_1d(lats), np.atleast_1d(lons)]).astype(float))
+
+    def nearest(self, lats, lons, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        lats = np.atleast_1d(np.asarray(lats, dtype=float))
+        lons = np.atleast_1d(np.asarray(lons, dtype=float))
+        k = min(k, len(self.places))
+        if k == 0:
+            return np.empty((len(lats), 0)), np.empty((len(lats), 0), dtype=int)
+
+        if self._tree is not None:
+            dist, idx = self._tree.query(self._query_points(lats, lons), k=k)
+            return dist * EARTH_RADIUS_KM, idx
+
+        dist = haversine_km(lats[:, None], lons[:, None], self.lats[None, :], self.lons[None, :])
+        idx = np.argsort(dist, axis=1)[:, :k]
+        return np.take_along_axis(dist, idx, axis=1), idx
+
+    def nearest_within(self, lats, lons, k: int, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        # Like nearest(), but neighbours beyond radius_km come back with an
+        # infinite distance and index len(self). Straight-line distance
+        # between unit vectors orders points the same way great-circle
+        # distance does, and a KD-tree with an upper bound skips queries
+        # far from every place, which makes large batches much cheaper.
+        lats = np.atleast_1d(np.asarray(lats, dtype=float))
+        lons = np.atleast_1d(np.asarray(lons, dtype=float))
+        k = min(k, len(self.places))
+        if k == 0:
+            return np.empty((len(lats), 0)), np.empty((len(lats), 0), dtype=int)
+
+        if self._kdtree is None:
+            try:
+                from scipy.spatial import cKDTree
+            except ImportError:
+                dist, idx = self.nearest(lats, lons, k)
+                far = dist > radius_km
+                return np.where(far, np.inf, dist), np.where(far, len(self.places), idx)
+            self._kdtree = cKDTree(unit_vectors(self.lats, self.lons))
+
+        bound = 2 * np.sin(radius_km / EARTH_RADIUS_KM / 2)
+        chord, idx = self._kdtree.query(unit_vectors(lats, lons), k=k, distance_upper_bound=bound)
+        chord, idx = chord.reshape(len(lats), k), idx.reshape(len(lats), k)
+        dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.where(np.isinf(chord), 0, chord) / 2, 0, 1))
+        return np.where(np.isinf(chord), np.inf, dist), idx
+
+    def within_radius(self, lats, lons, radius_km: float) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        lats = np.atleast_1d(np.asarray(lats, dtype=float))
+        lons = np.atleast_1d(np.asarray(lons, dtype=float))
+        if not self.places:
+            empty = [np.empty(0, dtype=int) for _ in lats]
+            return [np.empty(0) for _ in lats], empty
+
+        if self._tree is not None:
+            idx, dist = self._tree.query_radius(
+                self._query_points(lats, lons), r=radius_km / EARTH_RADIUS_KM,
+                return_distance=True, sort_results=True
+            )
+            return [d * EARTH_RADIUS_KM for d in dist], list(idx)
+
+        dist = haversine_km(lats[:, None], lons[:, None], self.lats[None, :], self.lons[None, :])
+        all_dist, all_idx = [], []
+        for row in dist:
+            idx = np.flatnonzero(row <= radius_km)
+            idx = idx[np.argsort(row[idx])]
+            all_dist.append(row[idx])
+            all_idx.append(idx)
+        return all_dist, all_idx
+
+    def _describe(self, i: int, distance_km: float) -> Dict[str, Any]:
+        return {**self.places[i], "distance_km": round(float(distance_km), 3)}
+
+    def nearest_places(self, lat: float, lon: float, k: int = 1) -> List[Dict[str, Any]]:
+        dist, idx = self.nearest([lat], [lon], k)
+        return [self._describe(i, d) for d, i in zip(dist[0], idx[0])]
+
+    def places_within(self, lat: float, lon: float, radius_km: float) -> List[Dict[str, Any]]:
+        dist, idx = self.within_radius([lat], [lon], radius_km)
+        return [self._describe(i, d) for d, i in zip(dist[0], idx[0])]
+
+
+class BoxIndex:
+    # Static packed R-tree over bounding boxes (minx, miny, maxx, maxy).
+    # Leaves are ordered Sort-Tile-Recursive style and every level groups
+    # node_size consecutive entries, so the tree is just one bbox array per
+    # level and a query descends it with vectorized intersection tests.
+    def __init__(self, boxes, node_size: int = 16):
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        self.node_size = node_size
+        self.ids = self._str_order(boxes)
+        self.levels = [boxes[self.ids]]
+
+        while len(self.levels[-1]) > node_size:
+            child = self.levels[-1]
+            starts = np.arange(0, len(child), node_size)
+            self.levels.append(np.column_stack([
+                np.minimum.reduceat(child[:, 0], starts),
+                np.minimum.reduceat(child[:, 1], starts),
+                np.maximum.reduceat(child[:, 2], starts),
+                np.maximum.reduceat(child[:, 3], starts),
+            ]))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _str_order(self, boxes: np.ndarray) -> np.ndarray:
+        n = len(boxes)
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+
+        centers_x = (boxes[:, 0] + boxes[:, 2]) / 2
+        centers_y = (boxes[:, 1] + boxes[:, 3]) / 2
+        n_slices = int(np.ceil(np.sqrt(np.ceil(n / self.node_size))))
+        slice_size = self.node_size * n_slices
+
+        by_x = np.argsort(centers_x, kind="stable")
+        slices = [by_x[i:i + slice_size] for i in range(0, n, slice_size)]
+        return np.concatenate([s[np.argsort(centers_y[s], kind="stable")] for s in slices])
+
+    def query(self, bbox, min_size: float = 0.0) -> np.ndarray:
+        minx, miny, maxx, maxy = bbox
+        if len(self.ids) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        nodes = np.arange(len(self.levels[-1]))
+        for level in range(len(self.levels) - 1, -1, -1):
+            boxes = self.levels[level][nodes]
+            hit = (boxes[:, 0] <= maxx) & (boxes[:, 2] >= minx) & (boxes[:, 1] <= maxy) & (boxes[:, 3] >= miny)
+            nodes = nodes[hit]
+            if level == 0:
+                if min_size > 0:
+                    boxes = boxes[hit]
+                    size = np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])
+                    # Points have no extent and are never dropped.
+                    nodes = nodes[(size >= min_size) | (size == 0)]
+                return np.sort(self.ids[nodes])
+
+            children = (nodes[:, None] * self.node_size + np.arange(self.node_size)).ravel()
+            nodes = children[children < len(self.levels[level - 1])]
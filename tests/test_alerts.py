@@ -0,0 +1,109 @@
+import pytest
+
+from alerts import AlertEngine, AlertRule, WebhookSink
+
+CITIES = [
+    {"name": "Delhi", "lat": 28.61, "lon": 77.21},
+    {"name": "Noida", "lat": 28.54, "lon": 77.39},
+    {"name": "Mumbai", "lat": 19.08, "lon": 72.88},
+]
+
+
+class ListSink:
+    def __init__(self, fail=False):
+        self.received = []
+        self.fail = fail
+
+    def __call__(self, alerts):
+        if self.fail:
+            return alerts
+        self.received.extend(alerts)
+        return []
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = AlertEngine(CITIES, str(tmp_path))
+    engine.sinks["file"] = ListSink()
+    return engine
+
+
+def test_cross_up_cross_down_and_rearm(engine):
+    engine.add_rule(AlertRule(subscriber="a", city="Mumbai", threshold=120, hysteresis=10))
+    values = [100, 125, 130, 115, 121, 109, 121, 119, 125]
+    fired = [len(engine.update("Mumbai", 0, v)) for v in values]
+    # Fires on the way up, stays quiet above and within the band, re-arms below 110.
+    assert fired == [0, 1, 0, 0, 0, 0, 1, 0, 0]
+    assert engine.metrics["rearmed"] == 1
+
+
+def test_only_crossed_thresholds_are_checked(engine):
+    for threshold in range(10, 300, 10):
+        engine.add_rule(AlertRule(subscriber="a", city="Delhi", threshold=threshold, hysteresis=5))
+    engine.update("Delhi", 0, 95)
+    checked = engine.metrics["entries_checked"]
+    alerts = engine.update("Delhi", 0, 125)
+    assert sorted(a["threshold"] for a in alerts) == [100, 110, 120]
+    assert engine.metrics["entries_checked"] - checked == 3
+
+
+def test_new_rule_already_above_fires_at_once(engine):
+    engine.add_rule(AlertRule(subscriber="a", city="Delhi", threshold=200))
+    engine.update("Delhi", 0, 150)
+    _, alerts = engine.add_rule(AlertRule(subscriber="b", city="Delhi", threshold=100))
+    assert [a["subscriber"] for a in alerts] == ["b"]
+
+
+def test_polygon_rule_covers_cities_inside(engine):
+    rule, _ = engine.add_rule(AlertRule(subscriber="a", threshold=50, horizon_days=3,
+                                        polygon=[[76, 28], [78, 28], [78, 29.5], [76, 29.5]]))
+    assert rule.cities == ["Delhi", "Noida"]
+    assert engine.watched() == {"Delhi": [3], "Noida": [3]}
+    with pytest.raises(ValueError):
+        engine.add_rule(AlertRule(subscriber="a", threshold=50, polygon=[[0, 0], [1, 0], [1, 1]]))
+
+
+def test_failed_delivery_rearms_and_retries(engine):
+    engine.sinks["file"] = ListSink(fail=True)
+    engine.add_rule(AlertRule(subscriber="a", city="Delhi", threshold=100))
+    engine.deliver(engine.update("Delhi", 0, 150))
+    assert engine.metrics["delivery_errors"] == 1
+    assert not engine.fired
+
+    engine.sinks["file"] = ListSink()
+    engine.update("Delhi", 0, 160)
+    retried = engine.retry_undelivered()
+    assert [a["pm25"] for a in retried] == [160]
+    engine.deliver(retried)
+    assert engine.metrics["delivered"] == 1
+    assert not engine.retry_undelivered()
+
+
+def test_rules_survive_reload(engine, tmp_path):
+    first, _ = engine.add_rule(AlertRule(subscriber="a", city="Delhi", threshold=100))
+    second, _ = engine.add_rule(AlertRule(subscriber="a", city="Mumbai", threshold=200))
+    engine.remove_rule(first.id)
+
+    reloaded = AlertEngine(CITIES, str(tmp_path))
+    assert list(reloaded.rules) == [second.id]
+    reloaded.sinks["file"] = ListSink()
+    third, _ = reloaded.add_rule(AlertRule(subscriber="a", city="Noida", threshold=100))
+    assert third.id > second.id
+
+
+def test_webhook_rules_need_an_allowed_url(engine):
+    engine.sinks["webhook"] = WebhookSink(allowed_hosts=["hooks.example.org"])
+    with pytest.raises(ValueError, match="no default webhook"):
+        engine.add_rule(AlertRule(subscriber="a", city="Delhi", threshold=100, sink="webhook"))
+    for url in ("http://169.254.169.254/latest", "file:///etc/passwd", "ftp://hooks.example.org/x"):
+        with pytest.raises(ValueError, match="allowed host"):
+            engine.add_rule(AlertRule(subscriber="a", city="Delhi", threshold=100, sink="webhook", webhook_url=url))
+    rule, _ = engine.add_rule(AlertRule(subscriber="a", city="Delhi", threshold=100, sink="webhook",
+                                        webhook_url="https://hooks.example.org/aq"))
+    assert rule.id is not None
+
+
+def test_webhook_without_url_does_not_block_others():
+    sink = WebhookSink()
+    alerts = [{"entry_id": 1, "webhook_url": None}, {"entry_id": 2, "webhook_url": "http://10.0.0.1/x"}]
+    assert sink(alerts) == alerts
@@ -0,0 +1,49 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from gazetteer import resolve_city, search_cities
+from nlp_engine import parse_query
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("Delhi", "Delhi"), ("new delhi", "Delhi"), ("gurgaon", "Gurugram"),
+    ("bangalore", "Bengaluru"), ("air quality in ludhiana", "Ludhiana"), ("dehli", "Delhi"),
+])
+def test_resolve_returns_canonical_names(name, expected):
+    assert resolve_city(name)["display_name"] == expected
+
+
+@pytest.mark.parametrize("name", ["a", "d", "del", "temple", ""])
+def test_resolve_does_not_complete_prefixes(name):
+    assert resolve_city(name) is None
+
+
+def test_prefixes_still_autocomplete():
+    assert "Delhi" in [entry["display_name"] for entry in search_cities("del")]
+
+
+def test_predict_rejects_single_letters(client):
+    assert client.get("/api/predict/a").status_code == 404
+    assert client.get("/api/predict/d").status_code == 404
+
+
+@pytest.mark.parametrize("query, city", [
+    ("air quality in ludhiana", "ludhiana"), ("in vadodara", "vadodara"), ("go to jodhpur", "jodhpur"),
+    ("aqi in new delhi", "new delhi"), ("gurgaon pollution", "gurgaon"), ("bangalore", "bangalore"),
+])
+def test_nlp_and_predict_agree_on_locations(client, query, city):
+    location = parse_query(query).location
+    assert location is not None
+    assert client.get(f"/api/predict/{city}").json()["city"] == location["name"]
+
+
+def test_city_list_uses_canonical_names(client):
+    names = {city["name"] for city in client.get("/api/cities").json()}
+    assert {"Delhi", "Gurugram", "Bengaluru"} <= names
+    assert not {"New Delhi", "Gurgaon", "Bangalore"} & names
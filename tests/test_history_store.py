@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from history_store import HistoryStore
+
+CITIES = [
+    {"name": "Delhi", "lat": 28.61, "lon": 77.21},
+    {"name": "Mumbai", "lat": 19.08, "lon": 72.88},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path), CITIES)
+
+
+def readings(hour, values):
+    return pd.DataFrame({
+        "station": ["d1", "d2", "m1"],
+        "lat": [28.60, 28.65, 19.10],
+        "lon": [77.20, 77.25, 72.90],
+        "pm25_value": values,
+        "timestamp": [datetime(2024, 1, 1, hour, 15)] * 3,
+    })
+
+
+def test_hourly_and_daily_rollups(store):
+    store.append(readings(0, [100, 200, 50]))
+    store.append(readings(1, [120, 140, 60]))
+
+    hourly = store.query("Delhi", datetime(2024, 1, 1), datetime(2024, 1, 1, 23, 59))
+    assert [(p["time"], p["pm25"], p["pm25_min"], p["pm25_max"], p["count"]) for p in hourly] == [
+        ("2024-01-01T00:00:00", 150.0, 100.0, 200.0, 2),
+        ("2024-01-01T01:00:00", 130.0, 120.0, 140.0, 2),
+    ]
+    daily = store.query("Mumbai", datetime(2024, 1, 1), datetime(2024, 1, 1, 23, 59), "daily")
+    assert [(p["pm25"], p["count"]) for p in daily] == [(55.0, 2)]
+
+
+def test_reingest_is_skipped(store):
+    assert store.append(readings(0, [100, 200, 50])) == 3
+    assert store.append(readings(0, [100, 200, 50])) == 0
+    assert store.stats()["records"] == 3
+    # A new reading for the same day invalidates the cached rollup.
+    store.query("Delhi", datetime(2024, 1, 1), datetime(2024, 1, 1, 23, 59))
+    store.append(readings(2, [300, 300, 50]))
+    points = store.query("Delhi", datetime(2024, 1, 1), datetime(2024, 1, 1, 23, 59))
+    assert [p["pm25"] for p in points] == [150.0, 300.0]
+
+
+def test_snapshot_without_station_column(store):
+    frame = pd.DataFrame({"lat": [28.60, 28.65], "lon": [77.20, 77.25], "pm25_value": [80, 90]})
+    assert store.append(frame, datetime(2024, 1, 1, 5)) == 2
+    assert store.append(frame, datetime(2024, 1, 1, 5)) == 0
+    assert sorted(store.station_ids) == ["28.6000,77.2000", "28.6500,77.2500"]
+    assert store.city_stations("Delhi") == 2
+
+
+def test_reopened_store_keeps_stations(store, tmp_path):
+    store.append(readings(0, [100, 200, 50]))
+    reopened = HistoryStore(str(tmp_path), CITIES)
+    assert reopened.append(readings(0, [100, 200, 50])) == 0
+    assert [p["count"] for p in reopened.query("Delhi", datetime(2024, 1, 1), datetime(2024, 1, 1, 23))] == [2]
+
+
+def test_history_endpoint_accepts_utc_offsets():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    client = TestClient(main.app)
+    response = client.get("/api/history/delhi", params={"from": "2020-01-01T00:00:00+05:30", "to": "2020-01-02"})
+    assert response.status_code == 200
+    expected = datetime.fromisoformat("2020-01-01T00:00:00+05:30").astimezone().replace(tzinfo=None)
+    assert response.json()["from"] == expected.isoformat()
+
+    response = client.get("/api/history/delhi", params={"from": "2020-01-03T00:00:00Z", "to": "2020-01-02"})
+    assert response.status_code == 400
@@ -0,0 +1,92 @@
+import json
+import os
+
+import pytest
+
+import layer_provider
+from layer_provider import LayerProvider, geometry_bounds
+
+
+def point(name, lon, lat):
+    return {"type": "Feature", "properties": {"name": name}, "geometry": {"type": "Point", "coordinates": [lon, lat]}}
+
+
+FEATURES = [
+    point("delhi", 77.21, 28.61),
+    point("mumbai", 72.88, 19.08),
+    {"type": "Feature", "properties": {"name": "yamuna"},
+     "geometry": {"type": "LineString", "coordinates": [[77.0, 28.0], [77.3, 28.9], [77.6, 29.5]]}},
+    {"type": "Feature", "properties": {"name": "ncr", "note": "दिल्ली"},
+     "geometry": {"type": "Polygon", "coordinates": [[[76.8, 28.3], [77.5, 28.3], [77.5, 28.9], [76.8, 28.9], [76.8, 28.3]]]}},
+    {"type": "Feature", "properties": {"name": "tiny"},
+     "geometry": {"type": "Polygon", "coordinates": [[[77.1, 28.5], [77.1001, 28.5], [77.1001, 28.5001], [77.1, 28.5]]]}},
+    {"type": "Feature", "properties": {"name": "nowhere"}, "geometry": None},
+]
+
+DELHI_BBOX = (77.0, 28.4, 77.4, 28.8)
+
+
+def names(collection):
+    return sorted(feature["properties"]["name"] for feature in collection["features"])
+
+
+def brute_force(bbox):
+    matches = []
+    for feature in FEATURES:
+        bounds = geometry_bounds(feature["geometry"])
+        if bounds and bounds[0] <= bbox[2] and bounds[2] >= bbox[0] and bounds[1] <= bbox[3] and bounds[3] >= bbox[1]:
+            matches.append(feature["properties"]["name"])
+    return sorted(matches)
+
+
+def write_layer(path, features):
+    with open(path, "w", encoding="utf-8") as f:
+        if str(path).endswith(".geojson"):
+            json.dump({"type": "FeatureCollection", "name": "roads", "features": features}, f, ensure_ascii=False, indent=1)
+        else:
+            f.writelines(json.dumps(feature, ensure_ascii=False) + "\n" for feature in features)
+
+
+@pytest.fixture(params=["geojson", "geojsonl"])
+def provider(request, tmp_path, monkeypatch):
+    # A small read chunk makes the FeatureCollection scanner refill mid-feature.
+    monkeypatch.setattr(layer_provider, "READ_CHUNK", 37)
+    write_layer(tmp_path / f"roads.{request.param}", FEATURES)
+    return LayerProvider(str(tmp_path))
+
+
+@pytest.mark.parametrize("bbox", [DELHI_BBOX, (72.0, 18.0, 74.0, 20.0), (60.0, 5.0, 100.0, 40.0), (0.0, 0.0, 1.0, 1.0)])
+def test_bbox_query_matches_brute_force(provider, bbox):
+    assert names(provider.query("roads", bbox)) == brute_force(bbox)
+
+
+def test_features_round_trip(provider):
+    features = provider.query("roads", DELHI_BBOX)["features"]
+    ncr = next(feature for feature in features if feature["properties"]["name"] == "ncr")
+    assert ncr == FEATURES[3]
+
+
+def test_limit_and_min_size(provider):
+    collection = provider.query("roads", DELHI_BBOX, limit=2)
+    assert len(collection["features"]) == 2 and collection["truncated"]
+    assert "truncated" not in provider.query("roads", DELHI_BBOX)
+
+    # Features smaller than min_size are skipped; points never are.
+    assert names(provider.query("roads", DELHI_BBOX, min_size=0.01)) == ["delhi", "ncr", "yamuna"]
+
+
+def test_unknown_layer(provider):
+    assert not provider.has_layer("rivers")
+    assert provider.query("rivers", DELHI_BBOX) is None
+    assert provider.version("rivers") is None
+
+
+def test_edited_file_is_reindexed(provider):
+    path, _ = provider.find_file("roads")
+    version = provider.version("roads")
+    assert names(provider.query("roads", DELHI_BBOX)) == ["delhi", "ncr", "tiny", "yamuna"]
+
+    write_layer(path, FEATURES[:1])
+    os.utime(path, (0, 0))
+    assert provider.version("roads") != version
+    assert names(provider.query("roads", DELHI_BBOX)) == ["delhi"]
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from live_feed import LatestReadings, LiveFeedService, Reading, validate_reading
+
+BOUNDS = {"lat_min": 6.5, "lat_max": 37.5, "lon_min": 68.0, "lon_max": 97.5}
+NOW = 1_700_000_000.0
+
+
+def test_valid_reading():
+    reading = validate_reading({"station": " DL1 ", "lat": "28.6", "lon": 77.2, "pm25": "85.5",
+                                "time": "2023-11-14T22:13:20Z"}, "feed", BOUNDS, NOW)
+    assert (reading.station, reading.lat, reading.lon, reading.pm25, reading.time) == ("DL1", 28.6, 77.2, 85.5, NOW)
+
+
+def test_alternate_columns_and_missing_time():
+    reading = validate_reading({"id": 7, "lat": 28.6, "lon": 77.2, "pm25_value": 40, "timestamp": ""},
+                               "feed", BOUNDS, NOW)
+    assert reading.station == "7"
+    assert reading.time == NOW
+
+
+@pytest.mark.parametrize("record", [
+    {"lat": 28.6, "lon": 77.2, "pm25": 50},
+    {"station": "x", "lat": 51.5, "lon": -0.1, "pm25": 50},
+    {"station": "x", "lat": 28.6, "lon": 77.2, "pm25": -1},
+    {"station": "x", "lat": 28.6, "lon": 77.2, "pm25": 5000},
+    {"station": "x", "lat": 28.6, "lon": 77.2, "pm25": 50, "time": NOW + 3600},
+    {"station": "x", "lat": "north", "lon": 77.2, "pm25": 50},
+])
+def test_invalid_readings_are_rejected(record):
+    with pytest.raises((ValueError, KeyError, TypeError)):
+        validate_reading(record, "feed", BOUNDS, NOW)
+
+
+def test_latest_readings_keep_newest_per_station():
+    table = LatestReadings()
+    now = time.time()
+    new = Reading("a", 28.61, 77.21, 90, now, "f", now)
+    old = Reading("a", 28.61, 77.21, 10, now - 60, "f", now)
+    assert table.update([new, old]) == 1
+    assert [r.pm25 for r, _ in table.nearby(28.6, 77.2, 25, 3600)] == [90]
+    assert table.nearby(19.0, 72.8, 25, 3600) == []
+
+
+def test_slow_consumer_applies_backpressure():
+    lines = "".join(json.dumps({"station": f"s{i}", "lat": 28.6, "lon": 77.2, "pm25": 50}) + "\n" for i in range(50))
+    lines += "not json\n"
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, text=lines,
+                                                                   headers={"content-type": "application/x-ndjson"}))
+
+    async def run():
+        table = LatestReadings()
+        service = LiveFeedService(["http://feed/a.ndjson"], table, BOUNDS, queue_size=5)
+        service.queue = asyncio.Queue(maxsize=5)
+        service._client = httpx.AsyncClient(transport=transport)
+        consumer = asyncio.create_task(service._consume())
+        count = await service.poll("http://feed/a.ndjson")
+        await service.queue.join()
+        consumer.cancel()
+        await service._client.aclose()
+        return service, table, count
+
+    service, table, count = asyncio.run(run())
+    stats = service.stats()
+    assert count == 50 and len(table) == 50
+    assert stats["rejected"] == 1
+    assert stats["queue_max_depth"] <= 5
+    assert stats["backpressure_waits"] > 0
+    assert stats["feeds"]["http://feed/a.ndjson"]["last_error"] is None
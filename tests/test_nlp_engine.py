@@ -0,0 +1,46 @@
+import pytest
+
+from nlp_engine import KeywordAutomaton, find_mentions, parse_query
+
+
+def found(automaton, text):
+    return [(m.text, m.value) for m in automaton.find(text)]
+
+
+def test_keywords_match_whole_words_only():
+    assert [(m.text, m.kind) for m in find_mentions("the temple in pune")] == [("pune", "location")]
+    assert [(m.text, m.kind) for m in find_mentions("temp in pune")] == [("temp", "layer"), ("pune", "location")]
+    assert find_mentions("punekar temples") == []
+
+
+def test_longest_match_wins():
+    mentions = find_mentions("air pollution in new delhi")
+    assert [(m.text, m.kind) for m in mentions] == [("air pollution", "layer"), ("new delhi", "location")]
+    assert mentions[1].value["name"] == "Delhi"
+
+
+def test_overlapping_keywords():
+    automaton = KeywordAutomaton({"a b": ("k", 1), "b c": ("k", 2), "c": ("k", 3), "b c d e": ("k", 4), "d": ("k", 5)})
+    # Every occurrence is reported, including ones reached by failure links.
+    assert sorted((m.start, m.end) for m in automaton.find_all("a b c d x")) == [(0, 3), (2, 5), (4, 5), (6, 7)]
+    # find() keeps the leftmost, then longest, non-overlapping matches.
+    assert found(automaton, "a b c d x") == [("a b", 1), ("c", 3), ("d", 5)]
+    assert found(automaton, "x b c d e") == [("b c d e", 4)]
+    assert found(automaton, "b, c") == [("c", 3)]
+
+
+@pytest.mark.parametrize("query, texts", [
+    ("İİ air quality in Delhi", ["air quality", "Delhi"]),
+    ("İİ   air quality   in  Delhi ", ["air quality", "Delhi"]),
+    ("  AIR Quality in\tNEW   DELHI", ["AIR Quality", "NEW   DELHI"]),
+    ("ΟΔΟΣ air quality in Delhi", ["air quality", "Delhi"]),
+])
+def test_mention_spans_point_into_the_raw_query(query, texts):
+    mentions = parse_query(query).mentions
+    assert [m["text"] for m in mentions] == texts
+    assert [query[m["start"]:m["end"]] for m in mentions] == texts
+
+
+def test_find_mentions_on_text_that_lower_expands():
+    text = "İİ air quality in Delhi"
+    assert [(m.text, m.start) for m in find_mentions(text)] == [("air quality", 3), ("Delhi", 18)]
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+import main
+from live_feed import Reading
+from spatial_index import SpatialIndex
+
+
+def test_idw_residuals_weights_and_radius():
+    dist = np.array([[1.0, 2.0], [100.0, 200.0]])
+    residuals = np.array([[10.0, -10.0], [50.0, 50.0]])
+    corrected = main.idw_residuals(dist, residuals, radius_km=50, model_km=10)
+    # The closer station dominates; the model pulls toward zero.
+    expected = (10 / 1 - 10 / 4) / (1 + 1 / 4 + 1 / 100)
+    assert corrected[0] == pytest.approx(expected)
+    assert corrected[1] == 0.0
+
+
+def test_correction_matches_station_and_fades_out():
+    stations = [{"lat": 28.6, "lon": 77.2}, {"lat": 19.1, "lon": 72.9}]
+    nowcast = {"index": SpatialIndex(stations), "residuals": np.array([40.0, -20.0])}
+    lats = np.array([28.6, 28.65, 25.0])
+    lons = np.array([77.2, 77.2, 75.0])
+    correction = main.nowcast_correction(lats, lons, nowcast)
+    assert correction[0] == pytest.approx(40.0, rel=0.01)
+    assert 0 < correction[1] < correction[0]
+    assert correction[2] == 0.0
+
+
+def test_live_blend_moves_toward_nearby_stations():
+    now = 1_700_000_000.0
+    assert main.blend_live_readings(100.0, []) == 100.0
+    close = (Reading("a", 28.6, 77.2, 200.0, now, "f", now), 0.5)
+    far = (Reading("b", 28.8, 77.2, 200.0, now, "f", now), 20.0)
+    assert 190 < main.blend_live_readings(100.0, [close]) < 200
+    assert 100 < main.blend_live_readings(100.0, [far]) < main.blend_live_readings(100.0, [close])
@@ -0,0 +1,40 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def client():
+    # No lifespan, so build the city index startup would.
+    main.refresh_place_indexes()
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("path", [
+    "/api/places/nearest?lat=nan&lon=77.2",
+    "/api/places/nearest?lat=28.6&lon=inf",
+    "/api/places/within?lat=nan&lon=77.2",
+    "/api/layers/flood?lat=nan&lon=77.2",
+    "/api/layers/pollution?bbox=nan,nan,nan,nan",
+    "/api/layers/flood?bbox=70,20,inf,30",
+])
+def test_non_finite_coordinates_are_rejected(client, path):
+    assert client.get(path).status_code == 400
+
+
+def test_batch_nearest(client):
+    response = client.post("/api/places/nearest?k=2", json=[{"lat": 28.61, "lon": 77.21}, {"lat": 19.08, "lon": 72.88}])
+    assert response.status_code == 200
+    rows = response.json()
+    assert [len(row) for row in rows] == [2, 2]
+    assert rows[0][0]["name"] == "Delhi" and rows[1][0]["name"] == "Mumbai"
+
+
+def test_batch_nearest_rejects_bad_points(client, monkeypatch):
+    bad = client.post("/api/places/nearest", content='[{"lat": NaN, "lon": 77.2}]',
+                      headers={"content-type": "application/json"})
+    assert bad.status_code == 400
+
+    monkeypatch.setattr(main, "MAX_BATCH_POINTS", 2)
+    assert client.post("/api/places/nearest", json=[{"lat": 28.6, "lon": 77.2}] * 3).status_code == 413
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+NDJSON = {"content-type": "application/x-ndjson"}
+
+
+@pytest.fixture
+def client():
+    # No lifespan: the model is not loaded and regional estimates are used.
+    return TestClient(main.app)
+
+
+def ndjson(points):
+    return "".join(json.dumps(p) + "\n" for p in points)
+
+
+def test_ndjson_results_match_json_array(client, monkeypatch):
+    monkeypatch.setattr(main, "BATCH_CHUNK_SIZE", 3)
+    points = [{"lat": 28.61 + i * 0.01, "lon": 77.21, "id": i} for i in range(7)] + [{"lat": 51.5, "lon": -0.1}]
+
+    streamed = client.post("/api/predict-batch", content=ndjson(points), headers=NDJSON)
+    assert streamed.status_code == 200
+    lines = [json.loads(line) for line in streamed.text.splitlines()]
+    assert lines == client.post("/api/predict-batch", json=points).json()
+    assert [line.get("id") for line in lines] == list(range(7)) + [None]
+    assert lines[-1]["error"] == "Coordinates outside India bounds"
+
+
+def test_ndjson_last_line_without_newline(client):
+    body = ndjson([{"lat": 28.61, "lon": 77.21}]) + json.dumps({"lat": 19.08, "lon": 72.88})
+    assert len(client.post("/api/predict-batch", content=body, headers=NDJSON).text.splitlines()) == 2
+
+
+def test_bad_first_chunk_is_a_400(client):
+    response = client.post("/api/predict-batch", content='{"lat": 1, "lon": 2}\nnot json\n', headers=NDJSON)
+    assert response.status_code == 400
+    response = client.post("/api/predict-batch", content='{"lat": "x", "lon": 2}\n', headers=NDJSON)
+    assert response.status_code == 400
+
+
+def test_error_after_streaming_started_ends_stream(client, monkeypatch):
+    monkeypatch.setattr(main, "BATCH_CHUNK_SIZE", 2)
+    # The second batch holds a point without a numeric lat.
+    body = ndjson([{"lat": 28.61, "lon": 77.21}] * 2 + [{"lat": "x", "lon": 77.21}])
+    response = client.post("/api/predict-batch", content=body, headers=NDJSON)
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 3
+    assert lines[-1]["status"] == 400
+
+
+def test_point_limit(client, monkeypatch):
+    monkeypatch.setattr(main, "MAX_BATCH_POINTS", 5)
+    points = [{"lat": 28.61, "lon": 77.21}] * 6
+    assert client.post("/api/predict-batch", json=points).status_code == 413
+    assert client.post("/api/predict-batch", content=ndjson(points), headers=NDJSON).status_code == 413
+    assert client.post("/api/predict-batch", json=points[:5]).status_code == 200
+
+
+def test_client_disconnect_ends_stream_quietly(monkeypatch):
+    import asyncio
+
+    from starlette.requests import Request
+
+    monkeypatch.setattr(main, "BATCH_CHUNK_SIZE", 2)
+    messages = [
+        {"type": "http.request", "body": ndjson([{"lat": 28.61, "lon": 77.21}] * 2).encode(), "more_body": True},
+        {"type": "http.disconnect"},
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    async def run():
+        request = Request({"type": "http", "method": "POST", "headers": []}, receive)
+        response = await main.score_ndjson_batch(request)
+        return [chunk async for chunk in response.body_iterator]
+
+    chunks = asyncio.run(run())
+    assert len(chunks) == 1
+    assert len(chunks[0].splitlines()) == 2
@@ -0,0 +1,162 @@
+import struct
+
+import numpy as np
+
+from vector_tiles import EXTENT, TileIndex, project
+
+
+def read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return result, pos
+
+
+def read_fields(data):
+    # (field number, value) pairs of one protobuf message.
+    pos = 0
+    while pos < len(data):
+        key, pos = read_varint(data, pos)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = read_varint(data, pos)
+        elif wire_type == 1:
+            value, pos = data[pos:pos + 8], pos + 8
+        elif wire_type == 2:
+            length, pos = read_varint(data, pos)
+            value, pos = data[pos:pos + length], pos + length
+        else:
+            raise ValueError(f"unexpected wire type {wire_type}")
+        yield number, value
+
+
+def read_packed(data):
+    values, pos = [], 0
+    while pos < len(data):
+        value, pos = read_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def decode_value(data):
+    number, value = next(read_fields(data))
+    if number == 1:
+        return value.decode()
+    if number == 3:
+        return struct.unpack("<d", value)[0]
+    if number == 6:
+        return unzigzag(value)
+    if number == 7:
+        return bool(value)
+    raise ValueError(f"unexpected value field {number}")
+
+
+def decode_geometry(commands):
+    parts, cursor, i = [], [0, 0], 0
+    while i < len(commands):
+        command, count = commands[i] & 7, commands[i] >> 3
+        i += 1
+        if command == 7:
+            parts[-1].append(parts[-1][0])
+            continue
+        if command == 1:
+            parts.append([])
+        for _ in range(count):
+            cursor = [cursor[0] + unzigzag(commands[i]), cursor[1] + unzigzag(commands[i + 1])]
+            parts[-1].append(tuple(cursor))
+            i += 2
+    return parts
+
+
+def decode_tile(data):
+    layers = {}
+    for number, layer_data in read_fields(data):
+        assert number == 3
+        layer = {"features": [], "keys": [], "values": []}
+        for field, value in read_fields(layer_data):
+            if field == 1:
+                layer["name"] = value.decode()
+            elif field == 2:
+                layer["features"].append(dict(read_fields(value)))
+            elif field == 3:
+                layer["keys"].append(value.decode())
+            elif field == 4:
+                layer["values"].append(decode_value(value))
+            elif field == 5:
+                layer["extent"] = value
+            elif field == 15:
+                layer["version"] = value
+
+        features = []
+        for feature in layer["features"]:
+            tags = read_packed(feature.get(2, b""))
+            features.append({
+                "id": feature.get(1),
+                "type": feature[3],
+                "properties": {layer["keys"][k]: layer["values"][v] for k, v in zip(tags[::2], tags[1::2])},
+                "parts": decode_geometry(read_packed(feature[4])),
+            })
+        layers[layer["name"]] = {**layer, "features": features}
+    return layers
+
+
+def tile_points(coords):
+    # Expected tile coordinates at zoom 0.
+    return [tuple(p) for p in np.round(project(coords) * EXTENT).astype(int).tolist()]
+
+
+FEATURES = [
+    {"type": "Feature", "geometry": {"type": "Point", "coordinates": [0, 0]},
+     "properties": {"name": "centre", "count": -3, "pm25": 41.5, "flagged": True, "missing": None}},
+    {"type": "Feature", "geometry": {"type": "LineString", "coordinates": [[-90, 30], [0, 30], [90, 60]]},
+     "properties": {"name": "route"}},
+    {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [[[-90, -10], [90, -10], [90, -60], [-90, -60], [-90, -10]]]},
+     "properties": {"name": "zone", "count": 7}},
+]
+
+
+def test_tile_round_trip():
+    layer = decode_tile(TileIndex("demo", FEATURES).render(0, 0, 0))["demo"]
+    assert layer["version"] == 2 and layer["extent"] == EXTENT
+
+    point, line, polygon = layer["features"]
+    assert [f["type"] for f in (point, line, polygon)] == [1, 2, 3]
+    assert [f["id"] for f in (point, line, polygon)] == [1, 2, 3]
+
+    assert point["properties"] == {"name": "centre", "count": -3, "pm25": 41.5, "flagged": True}
+    assert line["properties"] == {"name": "route"}
+    assert polygon["properties"] == {"name": "zone", "count": 7}
+
+    assert point["parts"] == [[(EXTENT // 2, EXTENT // 2)]]
+    assert line["parts"] == [tile_points([[-90, 30], [0, 30], [90, 60]])]
+
+    ring = polygon["parts"][0]
+    assert ring[0] == ring[-1]
+    assert set(ring) == set(tile_points([[-90, -10], [90, -10], [90, -60], [-90, -60]]))
+    # Exterior rings wind with positive area in tile space.
+    x, y = np.array(ring, dtype=float).T
+    assert np.sum(x[:-1] * y[1:] - x[1:] * y[:-1]) > 0
+
+
+def test_tile_clips_to_its_own_area():
+    # At zoom 1 the point at (0, 0) sits on the corner of all four tiles;
+    # the line only reaches the northern ones.
+    north_west = decode_tile(TileIndex("demo", FEATURES).render(1, 0, 0))["demo"]
+    assert {f["properties"]["name"] for f in north_west["features"]} == {"centre", "route"}
+
+    south_east = decode_tile(TileIndex("demo", FEATURES).render(1, 1, 1))["demo"]
+    assert {f["properties"]["name"] for f in south_east["features"]} == {"centre", "zone"}
+    for x, y in (p for part in south_east["features"][1]["parts"] for p in part):
+        assert -64 <= x <= EXTENT + 64 and -64 <= y <= EXTENT + 64
+
+
+def test_empty_tile():
+    assert TileIndex("demo", FEATURES[:1]).render(3, 0, 0) == b""
@@ -0,0 +1,415 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import hashlib
+import json
+import math
+import os
+import shutil
+import struct
+import threading
+
+import numpy as np
+
+
+EXTENT = 4096
+# Geometry is kept this far (in tile units) past each edge so strokes and
+# fills do not seam where neighbouring tiles meet.
+BUFFER = 64
+# Douglas-Peucker tolerance in tile units. Tile units shrink with every
+# zoom level, so the same tolerance simplifies harder when zoomed out.
+SIMPLIFY_TOLERANCE = 1.0
+MAX_ZOOM = 20
+MAX_LATITUDE = 85.0511287798
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+POINT, LINESTRING, POLYGON = 1, 2, 3
+MOVE_TO, LINE_TO, CLOSE_PATH = 1, 2, 7
+
+
+def project(coords) -> np.ndarray:
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    lat = np.radians(np.clip(coords[:, 1], -MAX_LATITUDE, MAX_LATITUDE))
+    x = coords[:, 0] / 360 + 0.5
+    y = 0.5 - np.log(np.tan(np.pi / 4 + lat / 2)) / (2 * np.pi)
+    return np.column_stack([x, y])
+
+
+def tile_bbox(z: int, x: int, y: int, margin: float = 0.0) -> Tuple[float, float, float, float]:
+    scale = 2 ** z
+
+    def lon(tx):
+        return tx / scale * 360 - 180
+
+    def lat(ty):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / scale))))
+
+    return lon(x - margin), lat(y + 1 + margin), lon(x + 1 + margin), lat(y - margin)
+
+
+def normalize_geometry(geometry: Dict[str, Any]) -> Optional[Tuple[int, list]]:
+    kind = geometry.get("type")
+    coords = geometry.get("coordinates")
+
+    if kind == "Point":
+        return POINT, [project([coords])]
+    if kind == "MultiPoint":
+        return POINT, [project(coords)]
+    if kind == "LineString":
+        return LINESTRING, [project(coords)]
+    if kind == "MultiLineString":
+        return LINESTRING, [project(line) for line in coords]
+    if kind == "Polygon":
+        return POLYGON, [[project(ring) for ring in coords]]
+    if kind == "MultiPolygon":
+        return POLYGON, [[project(ring) for ring in polygon] for polygon in coords]
+    return None
+
+
+def _flatten(geom_type: int, parts: list) -> List[np.ndarray]:
+    if geom_type == POLYGON:
+        return [ring for polygon in parts for ring in polygon]
+    return parts
+
+
+def clip_line(points: np.ndarray, lo: float, hi: float) -> List[np.ndarray]:
+    pieces = []
+    current = []
+
+    for a, b in zip(points[:-1], points[1:]):
+        # Liang-Barsky against the square [lo, hi] x [lo, hi].
+        t0, t1 = 0.0, 1.0
+        d = b - a
+        visible = True
+        for p, q in ((-d[0], a[0] - lo), (d[0], hi - a[0]), (-d[1], a[1] - lo), (d[1], hi - a[1])):
+            if p == 0:
+                if q < 0:
+                    visible = False
+                    break
+            else:
+                t = q / p
+                if p < 0:
+                    t0 = max(t0, t)
+                else:
+                    t1 = min(t1, t)
+        if not visible or t0 > t1:
+            if len(current) > 1:
+                pieces.append(np.array(current))
+            current = []
+            continue
+
+        start, end = a + t0 * d, a + t1 * d
+        if not current:
+            current = [start]
+        current.append(end)
+        if t1 < 1.0:
+            pieces.append(np.array(current))
+            current = []
+
+    if len(current) > 1:
+        pieces.append(np.array(current))
+    return pieces
+
+
+def clip_ring(ring: np.ndarray, lo: float, hi: float) -> np.ndarray:
+    # Sutherland-Hodgman, one edge of the square at a time.
+    points = ring[:-1] if len(ring) > 1 and np.array_equal(ring[0], ring[-1]) else ring
+    for axis, bound, keep_below in ((0, lo, False), (0, hi, True), (1, lo, False), (1, hi, True)):
+        if len(points) == 0:
+            break
+        inside = points[:, axis] <= bound if keep_below else points[:, axis] >= bound
+        clipped = []
+        for i in range(len(points)):
+            current, previous = points[i], points[i - 1]
+            if inside[i]:
+                if not inside[i - 1]:
+                    t = (bound - previous[axis]) / (current[axis] - previous[axis])
+                    clipped.append(previous + t * (current - previous))
+                clipped.append(current)
+            elif inside[i - 1]:
+                t = (bound - previous[axis]) / (current[axis] - previous[axis])
+                clipped.append(previous + t * (current - previous))
+        points = np.array(clipped).reshape(-1, 2)
+
+    if len(points) == 0:
+        return points
+    return np.vstack([points, points[:1]])
+
+
+def simplify(points: np.ndarray, tolerance: float) -> np.ndarray:
+    if len(points) < 3 or tolerance <= 0:
+        return points
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a, b = points[start], points[end]
+        inner = points[start + 1:end] - a
+        d = b - a
+        length = math.hypot(d[0], d[1])
+        if length == 0:
+            distances = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            distances = np.abs(d[0] * inner[:, 1] - d[1] * inner[:, 0]) / length
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return points[keep]
+
+
+def quantize(points: np.ndarray) -> np.ndarray:
+    points = np.round(points).astype(np.int64)
+    if len(points) > 1:
+        changed = np.any(points[1:] != points[:-1], axis=1)
+        points = points[np.concatenate([[True], changed])]
+    return points
+
+
+def ring_area(ring: np.ndarray) -> float:
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * float(np.sum(x[:-1] * y[1:] - x[1:] * y[:-1]))
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _field(number: int, wire_type: int) -> bytes:
+    return _varint((number << 3) | wire_type)
+
+
+def _message(number: int, payload: bytes) -> bytes:
+    return _field(number, 2) + _varint(len(payload)) + payload
+
+
+def _packed(number: int, values: List[int]) -> bytes:
+    return _message(number, b"".join(_varint(v) for v in values))
+
+
+def encode_value(value: Any) -> bytes:
+    if isinstance(value, bool):
+        return _field(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        return _field(6, 0) + _varint(_zigzag(value))
+    if isinstance(value, float):
+        return _field(3, 1) + struct.pack("<d", value)
+    if not isinstance(value, str):
+        value = json.dumps(value)
+    return _message(1, value.encode())
+
+
+def encode_geometry(geom_type: int, parts: list) -> List[int]:
+    commands = []
+    cursor = np.zeros(2, dtype=np.int64)
+
+    def add_points(points):
+        nonlocal cursor
+        deltas = np.diff(np.vstack([cursor, points]), axis=0)
+        for dx, dy in deltas.tolist():
+            commands.extend((_zigzag(dx), _zigzag(dy)))
+        cursor = points[-1]
+
+    if geom_type == POINT:
+        points = np.vstack(parts)
+        commands.append(MOVE_TO | (len(points) << 3))
+        add_points(points)
+    elif geom_type == LINESTRING:
+        for line in parts:
+            commands.append(MOVE_TO | (1 << 3))
+            add_points(line[:1])
+            commands.append(LINE_TO | ((len(line) - 1) << 3))
+            add_points(line[1:])
+    else:
+        for polygon in parts:
+            for ring in polygon:
+                ring = ring[:-1]
+                commands.append(MOVE_TO | (1 << 3))
+                add_points(ring[:1])
+                commands.append(LINE_TO | ((len(ring) - 1) << 3))
+                add_points(ring[1:])
+                commands.append(CLOSE_PATH | (1 << 3))
+    return commands
+
+
+class TileIndex:
+    def __init__(self, name: str, features: List[Dict[str, Any]], version: str = None):
+        self.name = name
+        self.features = []
+        bboxes = []
+
+        for feature in features:
+            normalized = normalize_geometry(feature.get("geometry") or {})
+            if normalized is None:
+                continue
+            geom_type, parts = normalized
+            points = np.vstack(_flatten(geom_type, parts))
+            self.features.append((geom_type, parts, feature.get("properties") or {}))
+            bboxes.append([*points.min(axis=0), *points.max(axis=0)])
+
+        self.bboxes = np.array(bboxes, dtype=float).reshape(-1, 4)
+        # Disk-cached tiles are keyed by this, so they go stale with the data.
+        self.version = version or hashlib.sha1(
+            json.dumps(features, sort_keys=True, separators=(",", ":")).encode()
+        ).hexdigest()[:12]
+
+    def _tile_geometry(self, geom_type: int, parts: list, origin: np.ndarray, scale: float) -> list:
+        lo, hi = -BUFFER, EXTENT + BUFFER
+
+        if geom_type == POINT:
+            points = quantize((np.vstack(parts) - origin) * scale)
+            inside = np.all((points >= lo) & (points <= hi), axis=1)
+            return [points[inside]] if inside.any() else []
+
+        if geom_type == LINESTRING:
+            lines = []
+            for line in parts:
+                for piece in clip_line((line - origin) * scale, lo, hi):
+                    piece = quantize(simplify(piece, SIMPLIFY_TOLERANCE))
+                    if len(piece) >= 2:
+                        lines.append(piece)
+            return lines
+
+        polygons = []
+        for polygon in parts:
+            rings = []
+            for i, ring in enumerate(polygon):
+                ring = self._tile_ring((ring - origin) * scale, lo, hi, exterior=(i == 0))
+                if ring is None and i == 0:
+                    break
+                if ring is not None:
+                    rings.append(ring)
+            if rings:
+                polygons.append(rings)
+        return polygons
+
+    def _tile_ring(self, ring: np.ndarray, lo: float, hi: float, exterior: bool) -> Optional[np.ndarray]:
+        ring = clip_ring(ring, lo, hi)
+        if len(ring) < 4:
+            return None
+        ring = quantize(simplify(ring, SIMPLIFY_TOLERANCE))
+        if len(ring) < 4 or not np.array_equal(ring[0], ring[-1]):
+            return None
+        area = ring_area(ring)
+        if area == 0:
+            return None
+        # Exterior rings wind with positive area in tile space, holes negative.
+        if exterior != (area > 0):
+            ring = ring[::-1]
+        return ring
+
+    def render(self, z: int, x: int, y: int) -> bytes:
+        scale = 2 ** z
+        margin = BUFFER / EXTENT / scale
+        west, north = x / scale - margin, y / scale - margin
+        east, south = (x + 1) / scale + margin, (y + 1) / scale + margin
+
+        candidates = np.flatnonzero(
+            (self.bboxes[:, 0] <= east) & (self.bboxes[:, 2] >= west) &
+            (self.bboxes[:, 1] <= south) & (self.bboxes[:, 3] >= north)
+        )
+
+        origin = np.array([x / scale, y / scale])
+        keys, values = {}, {}
+        encoded_features = []
+
+        for i in candidates:
+            geom_type, parts, properties = self.features[i]
+            tile_parts = self._tile_geometry(geom_type, parts, origin, EXTENT * scale)
+            if not tile_parts:
+                continue
+
+            tags = []
+            for key, value in properties.items():
+                if value is None:
+                    continue
+                encoded = encode_value(value)
+                tags.append(keys.setdefault(key, len(keys)))
+                tags.append(values.setdefault(encoded, len(values)))
+
+            encoded_features.append(
+                _field(1, 0) + _varint(int(i) + 1) +
+                _packed(2, tags) +
+                _field(3, 0) + _varint(geom_type) +
+                _packed(4, encode_geometry(geom_type, tile_parts))
+            )
+
+        if not encoded_features:
+            return b""
+
+        layer = (
+            _field(15, 0) + _varint(2) +
+            _message(1, self.name.encode()) +
+            b"".join(_message(2, feature) for feature in encoded_features) +
+            b"".join(_message(3, key.encode()) for key in keys) +
+            b"".join(_message(4, value) for value in values) +
+            _field(5, 0) + _varint(EXTENT)
+        )
+        return _message(3, layer)
+
+
+class QueryTileIndex:
+    # For layers too large to index in memory: each tile pulls only the
+    # features in its own bbox, skipping those smaller than one tile unit.
+    def __init__(self, name: str, version: str, query: Callable[[tuple, float], List[Dict[str, Any]]]):
+        self.name = name
+        self.version = version
+        self.query = query
+
+    def render(self, z: int, x: int, y: int) -> bytes:
+        features = self.query(tile_bbox(z, x, y, BUFFER / EXTENT), 360 / 2 ** z / EXTENT)
+        return TileIndex(self.name, features, self.version).render(z, x, y)
+
+
+class TileCache:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def path(self, index: TileIndex, z: int, x: int, y: int) -> str:
+        return os.path.join(self.directory, index.name, index.version, str(z), str(x), f"{y}.mvt")
+
+    def get_or_render(self, index: TileIndex, z: int, x: int, y: int) -> bytes:
+        path = self.path(index, z, x, y)
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+
+        tile = index.render(z, x, y)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(tile)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not cache tile {path}: {e}")
+        return tile
+
+    def prune(self, index: TileIndex):
+        layer_dir = os.path.join(self.directory, index.name)
+        if not os.path.isdir(layer_dir):
+            return
+        with self._lock:
+            for version in os.listdir(layer_dir):
+                if version != index.version:
+                    shutil.rmtree(os.path.join(layer_dir, version), ignore_errors=True)
@@ -0,0 +1,144 @@
+from contextlib import contextmanager
+from typing import Any, Dict, List, Tuple
+import asyncio
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+HEAVY_MODULES = (
+    "numpy",
+    "pandas",
+    "sklearn.ensemble",
+    "sklearn.neighbors",
+    "joblib",
+    "xarray",
+    "netCDF4",
+    "dask",
+)
+
+warmup_report = {"imports": [], "phases": [], "requests": [], "total_s": None}
+
+
+def timed_import(name: str) -> Dict[str, Any]:
+    record = {"module": name, "seconds": 0.0, "status": "already loaded"}
+    if name not in sys.modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            record["status"] = "loaded"
+        except ImportError:
+            record["status"] = "missing"
+        record["seconds"] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def import_heavy_modules(modules=HEAVY_MODULES) -> List[Dict[str, Any]]:
+    records = [timed_import(name) for name in modules]
+    warmup_report["imports"] = records
+    return records
+
+
+@contextmanager
+def warmup_phase(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = round(time.perf_counter() - start, 4)
+        warmup_report["phases"].append({"phase": name, "seconds": seconds})
+        print(f"Startup phase {name}: {seconds:.3f}s")
+
+
+async def asgi_request(app, method: str, path: str, query: str = "", body: Any = None) -> Tuple[int, float]:
+    body_bytes = b"" if body is None else json.dumps(body).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"warmup"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 0),
+        "server": ("warmup", 80),
+    }
+    request_sent = False
+    response_done = asyncio.Event()
+    status = {}
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body_bytes, "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            response_done.set()
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    return status.get("code"), time.perf_counter() - start
+
+
+async def exercise_endpoints(app, requests: List[Tuple[str, str, str, Any]]) -> List[Dict[str, Any]]:
+    records = []
+    for method, path, query, body in requests:
+        record = {"method": method, "path": path}
+        try:
+            code, seconds = await asgi_request(app, method, path, query, body)
+            record.update({"status": code, "seconds": round(seconds, 4)})
+        except Exception as e:
+            record.update({"status": None, "error": str(e)})
+        if record["status"] is None or record["status"] >= 400:
+            print(f"Warm-up request {method} {path} failed: {record.get('error', record['status'])}")
+        records.append(record)
+
+    warmup_report["requests"] = records
+    return records
+
+
+def measure_import_times(module: str = "main", cwd: str = None) -> List[Dict[str, Any]]:
+    # Runs a fresh interpreter so every import is cold. Self times from
+    # -X importtime are summed per top-level package, which attributes each
+    # millisecond exactly once however deep the import chain is.
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd or os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+
+    totals = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        ms, modules = totals.get(package, (0.0, 0))
+        totals[package] = (ms + int(self_us) / 1000, modules + 1)
+
+    return sorted(
+        ({"package": name, "ms": round(ms, 1), "modules": modules} for name, (ms, modules) in totals.items()),
+        key=lambda r: r["ms"],
+        reverse=True,
+    )
+
+
+def print_import_report(module: str = "main", limit: int = 25):
+    records = measure_import_times(module)
+    print(f"{'package':<30} {'modules':>8} {'self (ms)':>10}")
+    for record in records[:limit]:
+        print(f"{record['package']:<30} {record['modules']:>8} {record['ms']:>10.1f}")
+    print(f"{'total':<30} {sum(r['modules'] for r in records):>8} {sum(r['ms'] for r in records):>10.1f}")